@@ -1,22 +1,213 @@
+import io
 import sys
 import os
 import json
+import hashlib
+import time
+import shutil
+import tempfile
+import threading
 from flask_cors import CORS
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Request, Response, g, request, jsonify, send_file, send_from_directory, stream_with_context
+from werkzeug.exceptions import RequestEntityTooLarge
 
 # Add project root to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 
-from engine.generator.generator import simulate
-from engine.provenance.provenance import create_provenance_pdf, hash_file
+from engine.cache.cache import LRUCache
+from engine.metrics.metrics import REGISTRY, CONTENT_TYPE
+from engine.blobs.blobs import BLOB_STORE
+from engine.jobs.jobs import JobQueue, QueueFullError
+from engine.generator.generator import simulate, iter_simulate, simulate_summary, resume_simulation, encode_snapshot, decode_snapshot, simulation_cache_key, ENGINES
+from engine.generator.ensemble import simulate_ensemble
+from engine.generator.sweep import simulate_sweep
+from engine.provenance.provenance import provenance_cache_key, write_atomic, photo_format, PDF_PROFILES
+from engine.provenance.batch import iter_render_batch, build_manifest, reports_from_logs, validate_reports
+from engine.api.cpu_pool import run_cpu, cpu_executor, render_pdf, render_ndjson_pdf
+from engine.api.encoding import json_provider_class, compress_response
+
+class EngineRequest(Request):
+    """
+    Keeps multipart file parts (photo uploads) in memory rather than
+    spooling them to temp files. Memory per request is bounded by the
+    MAX_CONTENT_LENGTH and MAX_FORM_MEMORY_SIZE settings below.
+    """
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return io.BytesIO()
+    
+    def get_json(self, *args, **kwargs):
+        # Reading the body is part of the json_parse stage
+        with STAGE_SECONDS.time(stage='json_parse'):
+            return super().get_json(*args, **kwargs)
 
 app = Flask(__name__)
+app.request_class = EngineRequest
+# Request size limits; larger bodies get a 413. File parts are held in
+# memory, so the whole body is capped, and each non-file form field (the
+# multipart payload) is capped too. NDJSON bodies are spooled to disk and
+# get their own, larger limit.
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('VERITAS_MAX_REQUEST_MB', 256)) * 1024 * 1024
+app.config['MAX_FORM_MEMORY_SIZE'] = int(os.environ.get('VERITAS_MAX_FORM_FIELD_MB', 16)) * 1024 * 1024
+NDJSON_MAX_BYTES = int(os.environ.get('VERITAS_MAX_NDJSON_MB', 4096)) * 1024 * 1024
+# JSON encoder for requests and responses: auto (orjson if installed), orjson or stdlib
+app.json = json_provider_class(os.environ.get('VERITAS_JSON_ENCODER'))(app)
 CORS(app) # Enable CORS for all routes
 
+# Instrumentation, served at GET /metrics. Recording costs a few additions
+# per event; the Prometheus text is only built when /metrics is scraped.
+REQUEST_SECONDS = REGISTRY.histogram('veritas_http_request_duration_seconds', 'Time to produce a response (for streamed bodies, until the stream starts)', ('method', 'endpoint', 'status'))
+STAGE_SECONDS = REGISTRY.histogram('veritas_stage_duration_seconds', 'Time spent in each processing stage', ('stage',))
+PHOTOS_TOTAL = REGISTRY.counter('veritas_photos_total', 'Photos placed in provenance PDFs')
+PHOTO_ERRORS_TOTAL = REGISTRY.counter('veritas_photo_errors_total', 'Photos that could not be embedded')
+PHOTO_BYTES_TOTAL = REGISTRY.counter('veritas_photo_bytes_total', 'Raw bytes of the distinct photos prepared for provenance PDFs')
+PDFS_TOTAL = REGISTRY.counter('veritas_pdfs_total', 'Provenance PDFs rendered', ('profile',))
+PDF_BYTES_TOTAL = REGISTRY.counter('veritas_pdf_bytes_total', 'Bytes of provenance PDFs rendered')
+CACHE_LOOKUPS_TOTAL = REGISTRY.counter('veritas_cache_lookups_total', 'Cache lookups by outcome', ('cache', 'result'))
+CACHE_HIT_RATIO = REGISTRY.gauge('veritas_cache_hit_ratio', 'Fraction of cache lookups that were hits', ('cache',))
+
+# Render stats keys (see save_provenance_pdf and save_cumulative_pdf) -> stage
+RENDER_STAGES = {
+    "decode_s": "photo_decode",
+    "resize_s": "photo_resize",
+    "prepare_s": "prepare",
+    "layout_s": "layout",
+    "output_s": "pdf_output",
+    "hash_s": "hash",
+    "write_s": "write",
+    "render_s": "day_render",
+    "merge_s": "merge"
+}
+
+def record_render_stats(stats):
+    """
+    Adds one render's stats to the metrics. Renders may run in pool
+    processes, so they are recorded from the stats they return.
+    """
+    for key, stage in RENDER_STAGES.items():
+        if key in stats:
+            STAGE_SECONDS.observe(stats[key], stage=stage)
+    PHOTOS_TOTAL.inc(stats.get('photos', 0))
+    PHOTO_ERRORS_TOTAL.inc(stats.get('photo_errors', 0))
+    PHOTO_BYTES_TOTAL.inc(stats.get('photo_bytes', 0))
+    PDFS_TOTAL.inc(profile=stats.get('profile', 'standard'))
+    PDF_BYTES_TOTAL.inc(stats.get('pdf_bytes', 0))
+    if 'unique_photos' in stats:
+        CACHE_LOOKUPS_TOTAL.inc(stats['photo_cache_hits'], cache='photo', result='hit')
+        CACHE_LOOKUPS_TOTAL.inc(stats['unique_photos'] - stats['photo_cache_hits'], cache='photo', result='miss')
+    if 'days' in stats:
+        CACHE_LOOKUPS_TOTAL.inc(stats['page_cache_hits'], cache='page', result='hit')
+        CACHE_LOOKUPS_TOTAL.inc(stats['days_rendered'], cache='page', result='miss')
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.before_request
+def limit_request_size():
+    # Rejected before any view reads the body. Bodies sent without a
+    # Content-Length are cut off at the same limit while being read.
+    if request.mimetype == 'application/x-ndjson':
+        request.max_content_length = NDJSON_MAX_BYTES
+    limit = request.max_content_length
+    if limit is not None and request.content_length is not None and request.content_length > limit:
+        return jsonify({"error": f"Request body exceeds {limit} bytes"}), 413
+
+@app.after_request
+def record_request_latency(response):
+    # Registered before the compression hook, so compression is included
+    started = g.pop('request_started', None)
+    if started is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, method=request.method, endpoint=request.endpoint or 'unmatched', status=response.status_code)
+    return response
+
+@app.after_request
+def compress_large_responses(response):
+    # gzip/brotli for large JSON bodies, as negotiated by Accept-Encoding
+    return compress_response(response, request.accept_encodings)
+
 # Ensure output directory exists
 OUTPUT_DIR = os.path.join(os.path.dirname(__file__), 'output')
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+MAX_SWEEP_COMBINATIONS = 10000
+
+def _deep_sizeof(obj):
+    # Bytes held by a JSON-like value (dicts, lists and scalars)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_sizeof(key) + _deep_sizeof(value) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(_deep_sizeof(item) for item in obj)
+    return size
+
+def simulation_result_bytes(result):
+    """
+    Estimated memory held by a cached simulation result: a list of logs,
+    segment summaries or ensemble entries, which are alike within one
+    result, so the first entry is measured and scaled by the count.
+    """
+    if not result:
+        return sys.getsizeof(result)
+    return sys.getsizeof(result) + len(result) * _deep_sizeof(result[0])
+
+# Memoized simulation results. Set VERITAS_SIM_CACHE_DIR to keep a disk tier across restarts.
+SIMULATION_CACHE = LRUCache(
+    max_entries=int(os.environ.get('VERITAS_SIM_CACHE_ENTRIES', 64)),
+    max_bytes=int(os.environ.get('VERITAS_SIM_CACHE_MB', 256)) * 1024 * 1024,
+    sizeof=simulation_result_bytes,
+    disk_dir=os.environ.get('VERITAS_SIM_CACHE_DIR') or None,
+    max_disk_bytes=int(os.environ.get('VERITAS_SIM_CACHE_DISK_MB', 256)) * 1024 * 1024
+)
+
+def cached_simulation(key, compute):
+    """
+    Returns (result, hit) for a simulation cache key, computing and storing
+    the result on a miss.
+    """
+    result = SIMULATION_CACHE.get(key)
+    if result is not None:
+        return result, True
+    with STAGE_SECONDS.time(stage='simulate'):
+        result = compute()
+    SIMULATION_CACHE.put(key, result)
+    return result, False
+
+# Generated PDFs by canonical request hash -> {"output_name", "sha256"}.
+# The PDFs themselves stay in OUTPUT_DIR; entries are verified before reuse.
+PDF_CACHE = LRUCache(
+    max_entries=int(os.environ.get('VERITAS_PDF_CACHE_ENTRIES', 256)),
+    disk_dir=os.environ.get('VERITAS_PDF_CACHE_DIR') or None
+)
+PDF_CACHE_COUNTS = {"hits": 0, "misses": 0, "stale": 0}
+_pdf_cache_lock = threading.Lock()
+
+def _count_pdf_cache(outcome):
+    with _pdf_cache_lock:
+        PDF_CACHE_COUNTS[outcome] += 1
+
+def reuse_cached_pdf(key, output_path):
+    """
+    Returns the SHA-256 of a previously generated PDF for this cache key,
+    copied to output_path if it was saved under another name, or None if
+    there is no entry or the stored file is missing or no longer matches
+    its recorded hash.
+    """
+    entry = PDF_CACHE.get(key)
+    if entry is None:
+        return None
+    source_path = os.path.join(OUTPUT_DIR, entry["output_name"])
+    try:
+        with open(source_path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        data = None
+    if data is None or hashlib.sha256(data).hexdigest() != entry["sha256"]:
+        _count_pdf_cache("stale")
+        return None
+    if os.path.abspath(source_path) != os.path.abspath(output_path):
+        write_atomic(output_path, data)
+    return entry["sha256"]
+
 @app.route('/output/<path:filename>')
 def serve_output(filename):
     return send_from_directory(OUTPUT_DIR, filename)
@@ -33,56 +224,598 @@ def run_simulation():
         segments = data.get('segments', [])
         days = data.get('days', 10)
         seed = data.get('seed', 42)
+        engine = data.get('engine', 'python')
+        params = {
+            "block_length_m": data.get('block_length_m', 4.5),
+            "crew_size": data.get('crew_size', 8),
+            "engine": engine
+        }
         
         if not segments:
             return jsonify({"error": "No segments provided"}), 400
+        if engine not in ENGINES:
+            return jsonify({"error": f"Unknown engine '{engine}'"}), 400
+        
+        output_format = request.args.get('format', 'json')
+        if output_format not in ('json', 'ndjson'):
+            return jsonify({"error": f"Unknown format '{output_format}'"}), 400
+        
+        mode = data.get('mode', 'logs')
+        if mode not in ('logs', 'summary'):
+            return jsonify({"error": f"Unknown mode '{mode}'"}), 400
+        
+        runs = data.get('runs')
+        if (runs is not None or mode == 'summary') and output_format == 'ndjson':
+            return jsonify({"error": "format=ndjson is only available for log output"}), 400
+        if runs is not None:
+            # Ensemble mode: aggregated completion distributions only, no raw logs
+            if not isinstance(runs, int) or runs < 1:
+                return jsonify({"error": "runs must be a positive integer"}), 400
+            key = simulation_cache_key(segments, days, seed, **params, mode='ensemble', runs=runs)
+            # Ensemble chunks share the CPU pool when it is on; otherwise
+            # the ensemble starts a pool of its own
+            pool, workers = cpu_executor()
+            ensemble, hit = cached_simulation(key, lambda: simulate_ensemble(segments, days=days, runs=runs, seed=seed, **params, workers=workers or None, executor=pool))
+            response = jsonify({
+                "ensemble": ensemble,
+                "summary": {
+                    "total_days": days,
+                    "runs": runs
+                }
+            })
+            response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+            return response
             
-        logs = simulate(segments, days=days, seed=seed)
+        return_state = bool(data.get('return_state', False))
+        if return_state and (runs is not None or output_format == 'ndjson'):
+            return jsonify({"error": "return_state is only available for json logs or summary output"}), 400
         
-        return jsonify({
+        if mode == 'summary':
+            # Per-segment final state only; no per-shift logs are built
+            if return_state:
+                with STAGE_SECONDS.time(stage='simulate'):
+                    segment_summaries, state = run_cpu(simulate_summary, segments, days=days, seed=seed, **params, return_state=True)
+                hit = False
+            else:
+                key = simulation_cache_key(segments, days, seed, **params, mode='summary')
+                segment_summaries, hit = cached_simulation(key, lambda: run_cpu(simulate_summary, segments, days=days, seed=seed, **params))
+            result = {
+                "segments": segment_summaries,
+                "summary": {
+                    "total_days": days,
+                    "total_logs": sum(s['shifts'] for s in segment_summaries)
+                }
+            }
+            if return_state:
+                result["state"] = encode_snapshot(state)
+            response = jsonify(result)
+            response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+            return response
+            
+        if output_format == 'ndjson':
+            # One log per line, produced lazily so the first bytes go out immediately
+            lines = (app.json.dumps(log) + "\n" for log in iter_simulate(segments, days=days, seed=seed, **params))
+            return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+            
+        if return_state:
+            # Snapshots carry RNG state, so stateful runs bypass the cache
+            with STAGE_SECONDS.time(stage='simulate'):
+                logs, state = run_cpu(simulate, segments, days=days, seed=seed, **params, return_state=True)
+            hit = False
+        else:
+            key = simulation_cache_key(segments, days, seed, **params, mode='logs')
+            logs, hit = cached_simulation(key, lambda: run_cpu(simulate, segments, days=days, seed=seed, **params))
+        
+        result = {
             "logs": logs,
             "summary": {
                 "total_days": days,
                 "total_logs": len(logs)
             }
-        })
+        }
+        if return_state:
+            result["state"] = encode_snapshot(state)
+        response = jsonify(result)
+        response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+        return response
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/simulate/sweep', methods=['POST'])
+def run_sweep():
+    """
+    Parameter sweep: evaluates every crew_size x block_length_m combination
+    and returns a compact table of completion metrics per combination.
+    """
+    try:
+        data = request.get_json()
+        segments = data.get('segments', [])
+        days = data.get('days', 10)
+        seed = data.get('seed', 42)
+        # Same default engine as /simulate, so rows match its summary mode
+        engine = data.get('engine', 'python')
+        crew_sizes = data.get('crew_size', [8])
+        block_lengths = data.get('block_length_m', [4.5])
+        
+        if not segments:
+            return jsonify({"error": "No segments provided"}), 400
+        if engine not in ENGINES:
+            return jsonify({"error": f"Unknown engine '{engine}'"}), 400
+        if not isinstance(crew_sizes, list) or not isinstance(block_lengths, list):
+            return jsonify({"error": "crew_size and block_length_m must be lists"}), 400
+        if len(crew_sizes) * len(block_lengths) > MAX_SWEEP_COMBINATIONS:
+            return jsonify({"error": f"At most {MAX_SWEEP_COMBINATIONS} combinations per sweep"}), 400
+        
+        try:
+            sweep_args = dict(days=days, seed=seed, crew_sizes=crew_sizes, block_lengths=block_lengths, engine=engine)
+            with STAGE_SECONDS.time(stage='sweep'):
+                if engine == 'python':
+                    # One task per combination, on the CPU pool when it is on
+                    pool, workers = cpu_executor()
+                    table = simulate_sweep(segments, **sweep_args, workers=workers or None, executor=pool)
+                else:
+                    table = run_cpu(simulate_sweep, segments, **sweep_args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        table["summary"] = {
+            "total_days": days,
+            "combinations": len(table["rows"])
+        }
+        return jsonify(table)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/simulate/cache', methods=['GET'])
+def simulation_cache_stats():
+    """
+    Hit/miss counters and size of the simulation result cache.
+    """
+    return jsonify(SIMULATION_CACHE.stats())
+
+@app.route('/simulate/resume', methods=['POST'])
+def resume_simulation_run():
+    """
+    Continues a simulation from the opaque `state` returned by /simulate
+    (with return_state) or a previous resume, for `days` more days.
+    Only the new days are computed; results match a from-scratch run.
+    """
+    try:
+        data = request.get_json()
+        token = data.get('state')
+        days = data.get('days', 10)
+        mode = data.get('mode', 'logs')
+        
+        if not token:
+            return jsonify({"error": "No state provided"}), 400
+        if mode not in ('logs', 'summary'):
+            return jsonify({"error": f"Unknown mode '{mode}'"}), 400
+        try:
+            snapshot = decode_snapshot(token)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        with STAGE_SECONDS.time(stage='simulate'):
+            results, new_snapshot = run_cpu(resume_simulation, snapshot, days=days, summary=(mode == 'summary'))
+        
+        result = {
+            "summary": {
+                "total_days": new_snapshot["day"],
+                "total_logs": sum(s['shifts'] for s in results) if mode == 'summary' else len(results)
+            },
+            "state": encode_snapshot(new_snapshot)
+        }
+        result["segments" if mode == 'summary' else "logs"] = results
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def render_provenance(shift_logs, output_name, project=None, profile=None, cumulative=False):
+    """
+    Renders (or reuses) one provenance PDF in OUTPUT_DIR.
+    Cumulative reports are assembled from per-day cached pages.
+    Returns (sha256, stage timings, cache hit).
+    """
+    # Define output path
+    output_path = os.path.join(OUTPUT_DIR, output_name)
+    
+    # Identical inputs (retries, re-opened export dialogs) reuse the stored PDF
+    key = provenance_cache_key(shift_logs, project, profile, **({"cumulative": True} if cumulative else {}))
+    stats = {}
+    file_hash = reuse_cached_pdf(key, output_path)
+    hit = file_hash is not None
+    if not hit:
+        # Create PDF on the CPU pool; the hash is computed from the rendered bytes
+        file_hash, stats = run_cpu(render_pdf, shift_logs, output_path, project=project, profile=profile, cumulative=cumulative)
+        PDF_CACHE.put(key, {"output_name": output_name, "sha256": file_hash})
+        record_render_stats(stats)
+    _count_pdf_cache("hits" if hit else "misses")
+    return file_hash, stats, hit
+
+def _run_provenance_job(payload):
+    # JobQueue handler; URLs are added when the status is read
+    file_hash, stats, _ = render_provenance(payload['shift_logs'], payload['output_name'], payload.get('project'), payload.get('profile'), payload.get('cumulative', False))
+    size = os.path.getsize(os.path.join(OUTPUT_DIR, payload['output_name']))
+    return {"output_name": payload['output_name'], "sha256": file_hash, "size_bytes": size, "timings": stats}
+
+# Background provenance rendering. Jobs are stored in SQLite so queued and
+# interrupted jobs resume after a restart. Workers start on first use.
+JOB_QUEUE = JobQueue(
+    db_path=os.environ.get('VERITAS_JOB_DB') or os.path.join(os.path.dirname(__file__), 'jobs.sqlite3'),
+    handler=_run_provenance_job,
+    workers=int(os.environ.get('VERITAS_JOB_WORKERS', 2)),
+    max_queued=int(os.environ.get('VERITAS_JOB_MAX_QUEUED', 1000))
+)
+
+def missing_blobs_error(shift_logs):
+    """
+    400 response if logs reference photo blobs (`photo_sha256`) that have
+    not been uploaded, listing them under `missing`; otherwise None.
+    """
+    try:
+        missing = BLOB_STORE.missing(log['photo_sha256'] for log in shift_logs if log.get('photo_sha256'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if missing:
+        return jsonify({"error": f"{len(missing)} photo blob(s) have not been uploaded", "missing": missing}), 400
+    return None
+
+def read_provenance_body():
+    """
+    Returns the /provenance request body as a dict. JSON bodies are returned
+    as is. multipart/form-data bodies carry that JSON in a `payload` field,
+    and logs name a file part in `photo_part`; its raw bytes are handed to
+    the renderer as `photo_data`, with no base64 step.
+    
+    Raises:
+        ValueError: If the payload is missing or names a part that was not sent.
+    """
+    if request.mimetype != 'multipart/form-data':
+        return request.get_json()
+    with STAGE_SECONDS.time(stage='multipart_parse'):
+        form = request.form
+        request.files  # parsed together with the form
+    if 'payload' not in form:
+        raise ValueError("multipart body needs a 'payload' field")
+    with STAGE_SECONDS.time(stage='json_parse'):
+        data = app.json.loads(form['payload'])
+    shift_logs = []
+    parts = {}
+    for log in data.get('shift_logs', []):
+        if 'photo_part' in log:
+            log = dict(log)
+            name = log.pop('photo_part')
+            if name not in parts:
+                if name not in request.files:
+                    raise ValueError(f"No file part named '{name}'")
+                # One bytes copy per part, shared by every log naming it;
+                # closing the part frees its buffer
+                stream = request.files[name].stream
+                parts[name] = stream.getvalue()
+                stream.close()
+            log['photo_data'] = parts[name]
+        shift_logs.append(log)
+    data['shift_logs'] = shift_logs
+    return data
+
 @app.route('/provenance', methods=['POST'])
 def generate_provenance():
     """
     Provenance PDF generation endpoint.
     Used by both field logs and simulation data for creating "Statement of Work Accomplished" documents.
+    
+    Very large reports can be sent as an application/x-ndjson body (one
+    shift log per line, optionally preceded by a {"project": {...}} line,
+    with output_name as a query parameter). They are rendered as they are
+    read, so the body is never held in memory.
+    
+    With "cumulative": true, each day starts on a new page and unchanged
+    days are reused from the per-day page cache.
     """
     try:
-        data = request.get_json()
+        if request.mimetype == 'application/x-ndjson':
+            return generate_provenance_stream()
+        
+        try:
+            data = read_provenance_body()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         shift_logs = data.get('shift_logs', [])
         output_name = data.get('output_name', 'provenance.pdf')
         project = data.get('project')
+        profile = data.get('profile', 'standard')
         
         if not shift_logs:
             return jsonify({"error": "No shift_logs provided"}), 400
+        if profile not in PDF_PROFILES:
+            return jsonify({"error": f"Unknown profile '{profile}'"}), 400
+        error = missing_blobs_error(shift_logs)
+        if error:
+            return error
             
-        # Define output path
-        output_path = os.path.join(OUTPUT_DIR, output_name)
-        
-        # Create PDF
-        create_provenance_pdf(shift_logs, output_path, project=project)
-        
-        # Calculate hash
-        file_hash = hash_file(output_path)
+        file_hash, stats, hit = render_provenance(shift_logs, output_name, project, profile, bool(data.get('cumulative', False)))
         
         # Return full URL for the file
         file_url = f"{request.host_url}output/{output_name}"
         
-        return jsonify({
+        response = jsonify({
             "pdf_path": file_url,
-            "sha256": file_hash
+            "sha256": file_hash,
+            "size_bytes": os.path.getsize(os.path.join(OUTPUT_DIR, output_name)),
+            "profile": profile,
+            "timings": stats
         })
+        response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+        return response
+    except RequestEntityTooLarge:
+        # A body or form field over the limit, found while reading it
+        return jsonify({"error": f"Request body exceeds {request.max_content_length} bytes, or a form field exceeds {request.max_form_memory_size} bytes"}), 413
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def generate_provenance_stream():
+    output_name = request.args.get('output_name', 'provenance.pdf')
+    profile = request.args.get('profile', 'standard')
+    if os.path.basename(output_name) != output_name:
+        return jsonify({"error": "output_name must be a plain file name"}), 400
+    if profile not in PDF_PROFILES:
+        return jsonify({"error": f"Unknown profile '{profile}'"}), 400
+    
+    # Spool the body to disk (bounded memory) so the render can run on the
+    # CPU pool, which reads it back line by line. Streamed bodies skip the
+    # PDF cache, which would need the whole body to hash.
+    fd, spool_path = tempfile.mkstemp(prefix="veritas_ndjson_", suffix=".ndjson")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            shutil.copyfileobj(request.stream, f, 1024 * 1024)
+        try:
+            file_hash, stats = run_cpu(render_ndjson_pdf, spool_path, os.path.join(OUTPUT_DIR, output_name), profile=profile)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+    finally:
+        os.remove(spool_path)
+    record_render_stats(stats)
+    return jsonify({
+        "pdf_path": f"{request.host_url}output/{output_name}",
+        "sha256": file_hash,
+        "size_bytes": stats["pdf_bytes"],
+        "profile": profile,
+        "timings": stats
+    })
+
+@app.route('/provenance/batch', methods=['POST'])
+def generate_provenance_batch():
+    """
+    Renders many provenance PDFs in one request across a process pool.
+    Accepts explicit `reports`, or `shift_logs` plus `group_by` fields to
+    split them into one report per group. Use ?format=ndjson to receive a
+    progress line per finished report before the manifest.
+    """
+    try:
+        data = request.get_json()
+        output_format = request.args.get('format', 'json')
+        if output_format not in ('json', 'ndjson'):
+            return jsonify({"error": f"Unknown format '{output_format}'"}), 400
+        
+        reports = data.get('reports')
+        if reports is None:
+            group_by = data.get('group_by', ['date'])
+            if not isinstance(group_by, list) or not group_by:
+                return jsonify({"error": "group_by must be a non-empty list of field names"}), 400
+            project = data.get('project')
+            reports = reports_from_logs(data.get('shift_logs', []), group_by, projects=[project] if project else None)
+            if project:
+                # An explicit project applies to every group
+                for report in reports:
+                    report['project'] = project
+        if data.get('profile'):
+            # Default for reports that do not choose their own profile
+            reports = [dict(report, profile=report.get('profile') or data['profile']) for report in reports]
+        try:
+            reports = validate_reports(reports)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        error = missing_blobs_error([log for report in reports for log in report['shift_logs']])
+        if error:
+            return error
+        
+        zip_name = data.get('zip_name') or ('provenance_batch.zip' if data.get('zip') else None)
+        if zip_name and os.path.basename(zip_name) != zip_name:
+            return jsonify({"error": "zip_name must be a plain file name"}), 400
+        zip_path = os.path.join(OUTPUT_DIR, zip_name) if zip_name else None
+        workers = data.get('workers')
+        if workers is not None and (not isinstance(workers, int) or isinstance(workers, bool) or workers < 1):
+            return jsonify({"error": "workers must be a positive integer"}), 400
+        # Under serve.py reports share the CPU pool and `workers` is ignored
+        pool, _ = cpu_executor()
+        host_url = request.host_url
+        
+        def with_url(entry):
+            if 'sha256' in entry:
+                entry['pdf_path'] = f"{host_url}output/{entry['output_name']}"
+            return entry
+        
+        def manifest_for(entries):
+            manifest = build_manifest(entries, OUTPUT_DIR, zip_path)
+            if zip_path:
+                manifest['zip'] = {"zip_path": f"{host_url}output/{zip_name}", "sha256": manifest['zip']['sha256']}
+            return manifest
+        
+        if output_format == 'ndjson':
+            def events():
+                entries = [None] * len(reports)
+                for done, entry in enumerate(iter_render_batch(reports, OUTPUT_DIR, workers, executor=pool), 1):
+                    entries[entry.pop('index')] = with_url(entry)
+                    yield app.json.dumps({"done": done, "total": len(reports), "report": entry}) + "\n"
+                yield app.json.dumps({"manifest": manifest_for(entries)}) + "\n"
+            return Response(stream_with_context(events()), mimetype='application/x-ndjson')
+        
+        entries = [None] * len(reports)
+        for entry in iter_render_batch(reports, OUTPUT_DIR, workers, executor=pool):
+            entries[entry.pop('index')] = with_url(entry)
+        return jsonify(manifest_for(entries))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/provenance/jobs', methods=['POST'])
+def submit_provenance_job():
+    """
+    Queues a provenance render and returns immediately with a job id.
+    Takes the same body as /provenance; poll /provenance/jobs/<job_id>
+    for the result.
+    """
+    try:
+        data = request.get_json()
+        shift_logs = data.get('shift_logs', [])
+        output_name = data.get('output_name', 'provenance.pdf')
+        profile = data.get('profile', 'standard')
+        
+        if not shift_logs:
+            return jsonify({"error": "No shift_logs provided"}), 400
+        if os.path.basename(output_name) != output_name:
+            return jsonify({"error": "output_name must be a plain file name"}), 400
+        if profile not in PDF_PROFILES:
+            return jsonify({"error": f"Unknown profile '{profile}'"}), 400
+        error = missing_blobs_error(shift_logs)
+        if error:
+            return error
+        
+        JOB_QUEUE.start()
+        try:
+            job_id = JOB_QUEUE.submit({"shift_logs": shift_logs, "output_name": output_name, "project": data.get('project'), "profile": profile, "cumulative": bool(data.get('cumulative', False))})
+        except QueueFullError as e:
+            return jsonify({"error": f"Job queue is full ({e}); retry later"}), 503
+        
+        return jsonify({
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": f"{request.host_url}provenance/jobs/{job_id}"
+        }), 202
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/provenance/jobs/<job_id>', methods=['GET'])
+def provenance_job_status(job_id):
+    """
+    Status of a queued provenance job: queued, running, done (with
+    pdf_path and sha256) or failed (with error).
+    """
+    try:
+        JOB_QUEUE.start()
+        job = JOB_QUEUE.get(job_id)
+        if job is None:
+            return jsonify({"error": f"Unknown job '{job_id}'"}), 404
+        
+        result = job.pop('result', None)
+        if result:
+            job["pdf_path"] = f"{request.host_url}output/{result['output_name']}"
+            job["sha256"] = result["sha256"]
+            if "size_bytes" in result:
+                job["size_bytes"] = result["size_bytes"]
+            job["timings"] = result["timings"]
+        return jsonify(job)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/provenance/cache', methods=['GET'])
+def provenance_cache_stats():
+    """
+    Hit rate of the generated-PDF cache. `stale` counts entries whose
+    stored PDF was missing or altered and had to be re-rendered.
+    """
+    with _pdf_cache_lock:
+        counts = dict(PDF_CACHE_COUNTS)
+    lookups = counts["hits"] + counts["misses"]
+    counts["hit_rate"] = round(counts["hits"] / lookups, 4) if lookups else 0.0
+    counts["entries"] = PDF_CACHE.stats()["entries"]
+    return jsonify(counts)
+
+# Largest photo blob accepted by PUT /blobs/<sha256>
+BLOB_MAX_BYTES = int(os.environ.get('VERITAS_BLOB_MAX_MB', 32)) * 1024 * 1024
+
+@app.route('/blobs/<digest>', methods=['PUT'])
+def upload_blob(digest):
+    """
+    Stores a photo (the raw request body) under its SHA-256, which must
+    match the URL. Returns 201 if it was new, 200 if already stored.
+    """
+    try:
+        if request.content_length is not None and request.content_length > BLOB_MAX_BYTES:
+            return jsonify({"error": f"Blob exceeds {BLOB_MAX_BYTES} bytes"}), 413
+        data = request.get_data(cache=False)
+        if len(data) > BLOB_MAX_BYTES:
+            return jsonify({"error": f"Blob exceeds {BLOB_MAX_BYTES} bytes"}), 413
+        try:
+            digest, created = BLOB_STORE.put(data, digest)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify({"sha256": digest, "size_bytes": len(data), "created": created}), 201 if created else 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/blobs/<digest>', methods=['GET'])
+def get_blob(digest):
+    """
+    Returns a stored photo. HEAD answers whether the blob exists without
+    sending it.
+    """
+    try:
+        path = BLOB_STORE.path(digest)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not os.path.exists(path):
+        return jsonify({"error": f"Unknown blob '{digest}'"}), 404
+    with open(path, "rb") as f:
+        mimetype = "image/png" if photo_format(f.read(8)) == "PNG" else "image/jpeg"
+    # Content never changes for a given hash
+    return send_file(path, mimetype=mimetype, etag=digest, max_age=31536000)
+
+@app.route('/blobs/missing', methods=['POST'])
+def missing_blobs():
+    """
+    Takes {"sha256": [...]} and returns the hashes the server does not
+    have yet, so a client uploads only those before rendering.
+    """
+    try:
+        digests = request.get_json().get('sha256', [])
+        if not isinstance(digests, list):
+            return jsonify({"error": "sha256 must be a list of hashes"}), 400
+        return jsonify({"missing": BLOB_STORE.missing(digests)})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@REGISTRY.on_collect
+def _collect_cache_metrics():
+    # Simulation and PDF caches live in this process; photo and page cache
+    # lookups are counted from render stats, since renders may run in the pool
+    simulation = SIMULATION_CACHE.stats()
+    CACHE_LOOKUPS_TOTAL.set(simulation["hits"], cache='simulation', result='hit')
+    CACHE_LOOKUPS_TOTAL.set(simulation["misses"], cache='simulation', result='miss')
+    with _pdf_cache_lock:
+        CACHE_LOOKUPS_TOTAL.set(PDF_CACHE_COUNTS["hits"], cache='pdf', result='hit')
+        CACHE_LOOKUPS_TOTAL.set(PDF_CACHE_COUNTS["misses"], cache='pdf', result='miss')
+    for cache in ('simulation', 'pdf', 'photo', 'page'):
+        hits = CACHE_LOOKUPS_TOTAL.value(cache=cache, result='hit')
+        lookups = hits + CACHE_LOOKUPS_TOTAL.value(cache=cache, result='miss')
+        CACHE_HIT_RATIO.set(round(hits / lookups, 4) if lookups else 0.0, cache=cache)
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Request latency histograms, stage timings, photo and PDF counters and
+    cache hit rates in the Prometheus text format.
+    """
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
 if __name__ == '__main__':
-    print("Starting Veritas Engine API on http://localhost:5000")
-    app.run(debug=True, port=5000)
+    # Development server. For production use engine/api/serve.py, which
+    # runs many request threads and moves CPU work to a process pool.
+    debug = os.environ.get('VERITAS_DEBUG') == '1'
+    print("Starting Veritas Engine API (development server) on http://localhost:5000")
+    # Resume jobs left queued or running by a previous process (in the
+    # serving process only, not the debug reloader's watcher)
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        JOB_QUEUE.start()
+    app.run(debug=debug, port=5000)
@@ -0,0 +1,98 @@
+import os
+import itertools
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from engine.provenance.provenance import save_provenance_pdf, save_provenance_pdf_stream, iter_ndjson_logs, PHOTO_CACHE
+from engine.provenance.cumulative import save_cumulative_pdf, PAGE_CACHE
+
+# CPU-bound work for the API (simulation, PDF rendering). Kept apart from
+# app.py so pool processes never import Flask or the API's caches.
+
+# Number of worker processes. 0 runs work inline on the request thread,
+# which is what the development server and the tests use; serve.py (or
+# VERITAS_CPU_WORKERS under another WSGI server) turns the pool on.
+CPU_WORKERS = int(os.environ.get("VERITAS_CPU_WORKERS", 0))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def set_cpu_workers(workers: int) -> None:
+    """
+    Resizes the pool (0 disables it). The old pool finishes its running
+    work in the background; the new one starts on first use.
+    """
+    global CPU_WORKERS, _pool
+    with _pool_lock:
+        CPU_WORKERS = workers
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+            _pool = None
+
+def _init_worker(workers: int) -> None:
+    """
+    Pool initializer. Every worker process holds its own PHOTO_CACHE and
+    PAGE_CACHE, so their memory tiers are split between the workers to
+    keep the pool's total at the configured limits.
+    """
+    for cache in (PHOTO_CACHE, PAGE_CACHE):
+        cache.max_entries = max(1, cache.max_entries // workers)
+        if cache.max_bytes is not None:
+            cache.max_bytes //= workers
+
+def cpu_executor() -> Tuple[Optional[ProcessPoolExecutor], int]:
+    """
+    The pool and its size, for work that splits itself into many tasks
+    (ensembles, python sweeps, batches) and should share the pool rather
+    than start one of its own. (None, 0) when CPU_WORKERS is 0.
+    """
+    global _pool
+    with _pool_lock:
+        if CPU_WORKERS <= 0:
+            return None, 0
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=CPU_WORKERS, initializer=_init_worker, initargs=(CPU_WORKERS,))
+        return _pool, CPU_WORKERS
+
+def run_cpu(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Runs fn(*args, **kwargs) on the process pool and waits for the result,
+    so the calling request thread only blocks on I/O. fn, its arguments and
+    its result must be picklable. Runs inline when CPU_WORKERS is 0.
+    """
+    pool, _ = cpu_executor()
+    if pool is None:
+        return fn(*args, **kwargs)
+    return pool.submit(fn, *args, **kwargs).result()
+
+def render_pdf(shift_logs: list, output_path: str, project: Optional[Dict[str, Any]] = None, profile: Optional[str] = None, cumulative: bool = False) -> Tuple[str, Dict[str, Any]]:
+    """
+    Pool task: renders one provenance PDF and returns (sha256, stats),
+    since a stats dict passed in would not come back from another process.
+    """
+    render = save_cumulative_pdf if cumulative else save_provenance_pdf
+    stats: Dict[str, Any] = {}
+    file_hash = render(shift_logs, output_path, project=project, stats=stats, profile=profile)
+    return file_hash, stats
+
+def render_ndjson_pdf(ndjson_path: str, output_path: str, profile: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    Pool task: renders a provenance PDF from an NDJSON file (an optional
+    {"project": {...}} first line, then one shift log per line) in
+    bounded memory, and returns (sha256, stats).
+
+    Raises:
+        ValueError: If the file holds no shift logs or a line is not JSON.
+    """
+    logs = iter_ndjson_logs(ndjson_path)
+    first = next(logs, None)
+    project = None
+    if first is not None and set(first) == {"project"}:
+        project = first["project"]
+        first = next(logs, None)
+    if first is None:
+        raise ValueError("No shift_logs provided")
+    stats: Dict[str, Any] = {}
+    file_hash = save_provenance_pdf_stream(itertools.chain([first], logs), output_path, project=project, stats=stats, profile=profile)
+    return file_hash, stats
@@ -0,0 +1,133 @@
+import os
+import gzip
+from typing import Any, Dict, List, Optional, Type
+from flask import Response
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional: pip install orjson
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional: pip install brotli
+    brotli = None
+
+# JSON encoding and response compression for the API. Both are pluggable:
+# the encoder is picked by VERITAS_JSON_ENCODER, and brotli is offered only
+# when the package is installed.
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson. Output matches the default
+    provider (sorted keys, compact, dates as HTTP dates) apart from
+    non-ASCII text, which is sent as UTF-8 rather than escaped, and NaN,
+    which becomes null. Unusual json.dumps/loads arguments and input
+    orjson rejects (NaN, huge integers) fall back to the json module.
+    """
+
+    def _options(self, indent: bool = False) -> int:
+        options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps_bytes(self, obj: Any, indent: bool = False) -> bytes:
+        return orjson.dumps(obj, default=self.default, option=self._options(indent))
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        indent = kwargs.get("indent")
+        if set(kwargs) - {"indent", "separators"} or indent not in (None, 2) or kwargs.get("separators", (",", ":")) != (",", ":"):
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj, indent=bool(indent)).decode("utf-8")
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        if not kwargs:
+            try:
+                return orjson.loads(s)
+            except orjson.JSONDecodeError:
+                pass  # let json report the error, or accept NaN and big integers
+        return super().loads(s, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        # Skips the str round trip of the default provider
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.dumps_bytes(obj, indent) + b"\n", mimetype=self.mimetype)
+
+JSON_ENCODERS: Dict[str, Type[JSONProvider]] = {"stdlib": DefaultJSONProvider, "orjson": OrjsonProvider}
+
+def json_provider_class(name: Optional[str] = None) -> Type[JSONProvider]:
+    """
+    JSON provider for an encoder name: "stdlib", "orjson", or "auto"
+    (the default), which uses orjson when it is installed.
+
+    Raises:
+        ValueError: If the encoder is unknown or orjson is not installed.
+    """
+    name = name or "auto"
+    if name == "auto":
+        name = "orjson" if orjson is not None else "stdlib"
+    if name not in JSON_ENCODERS:
+        raise ValueError(f"Unknown JSON encoder '{name}'; expected auto or one of {', '.join(JSON_ENCODERS)}")
+    if name == "orjson" and orjson is None:
+        raise ValueError("orjson is not installed (pip install orjson)")
+    return JSON_ENCODERS[name]
+
+# Responses smaller than this are sent as is; compressing them saves
+# less than it costs
+COMPRESS_MIN_BYTES = int(os.environ.get("VERITAS_COMPRESS_MIN_BYTES", 1024))
+GZIP_LEVEL = int(os.environ.get("VERITAS_GZIP_LEVEL", 6))
+# On API JSON, brotli quality 1 comes close to gzip level 6 in size at a
+# fifth of the CPU time; higher qualities are for static assets
+BROTLI_QUALITY = int(os.environ.get("VERITAS_BROTLI_QUALITY", 1))
+
+COMPRESSIBLE_MIMETYPES = ("application/json", "application/x-ndjson", "text/")
+
+def content_encodings() -> List[str]:
+    """
+    Encodings the server can produce, most preferred first.
+    """
+    return (["br"] if brotli is not None else []) + ["gzip"]
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        # mtime=0 keeps the output stable for equal bodies
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    return data
+
+def compress_response(response: Response, accept_encodings: Any, min_bytes: Optional[int] = None) -> Response:
+    """
+    Compresses a buffered text or JSON response with the best encoding the
+    client accepts (brotli, then gzip), if it is at least min_bytes long
+    (default COMPRESS_MIN_BYTES). Streamed responses, files and responses
+    that are already encoded pass through unchanged.
+
+    Args:
+        response: The outgoing response.
+        accept_encodings: The request's parsed Accept-Encoding header
+            (request.accept_encodings).
+        min_bytes: Size threshold in bytes.
+
+    Returns:
+        The same response, compressed in place if it qualified.
+    """
+    if not (response.mimetype or "").startswith(COMPRESSIBLE_MIMETYPES):
+        return response
+    response.vary.add("Accept-Encoding")
+    if response.direct_passthrough or response.is_streamed or "Content-Encoding" in response.headers or response.status_code in (204, 304):
+        return response
+    data = response.get_data()
+    if len(data) < (COMPRESS_MIN_BYTES if min_bytes is None else min_bytes):
+        return response
+    encoding = accept_encodings.best_match(content_encodings())
+    if encoding is None:
+        return response
+    response.set_data(compress(data, encoding))
+    response.headers["Content-Encoding"] = encoding
+    return response
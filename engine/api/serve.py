@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Production server for the Veritas Engine API
+
+Serves the Flask app with many request threads and runs CPU-bound
+simulation and PDF rendering on a pool of worker processes, so one long
+render does not stall other requests. Uses waitress (pip install waitress,
+works on Windows and Linux); without it, falls back to Werkzeug's threaded
+server with a warning.
+
+Usage:
+    python engine/api/serve.py --port 5000 --threads 16 --cpu-workers 4
+"""
+
+import argparse
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from engine.api.app import app, JOB_QUEUE
+from engine.api.cpu_pool import set_cpu_workers
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Veritas Engine API production server")
+    parser.add_argument("--host", default=os.environ.get("VERITAS_HOST", "127.0.0.1"), help="Interface to listen on (0.0.0.0 for all)")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("VERITAS_PORT", 5000)))
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("VERITAS_THREADS", 16)), help="Request threads")
+    parser.add_argument("--cpu-workers", type=int, default=int(os.environ.get("VERITAS_CPU_WORKERS") or os.cpu_count() or 1),
+                        help="Worker processes for simulation and PDF rendering (0 runs them on the request thread)")
+    args = parser.parse_args(argv)
+
+    set_cpu_workers(args.cpu_workers)
+    # Resume jobs left queued or running by a previous process
+    JOB_QUEUE.start()
+    print(f"Starting Veritas Engine API on http://{args.host}:{args.port} "
+          f"({args.threads} request threads, {args.cpu_workers} CPU workers)")
+
+    try:
+        from waitress import serve
+    except ImportError:
+        print("waitress is not installed (pip install waitress); using Werkzeug's threaded server")
+        from werkzeug.serving import run_simple
+        run_simple(args.host, args.port, app, threaded=True)
+        return 0
+    serve(app, host=args.host, port=args.port, threads=args.threads)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
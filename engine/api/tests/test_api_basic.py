@@ -1,14 +1,38 @@
 import unittest
 import sys
 import os
+import io
 import json
+import gzip
+import time
+import base64
 import shutil
+import hashlib
+import tempfile
 from flask.testing import FlaskClient
+from PIL import Image
 
 # Add project root to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
 
+import engine.api.app as app_module
 from engine.api.app import app
+from engine.jobs.jobs import JobQueue
+from engine.api import cpu_pool
+from engine.api import encoding
+from engine.api.encoding import json_provider_class, JSON_ENCODERS
+from engine.blobs.blobs import BLOB_STORE
+from engine.provenance.provenance import PHOTO_CACHE
+from engine.provenance.cumulative import PAGE_CACHE
+
+def make_photo(size, format="JPEG"):
+    # Noise, so the photo compresses like a real one and is new every call
+    buffer = io.BytesIO()
+    Image.effect_noise(size, 48).convert("RGB").save(buffer, format=format)
+    return buffer.getvalue()
+
+def data_url(raw, format="jpeg"):
+    return f"data:image/{format};base64," + base64.b64encode(raw).decode("ascii")
 
 class TestApiBasic(unittest.TestCase):
     def setUp(self):
@@ -19,6 +43,15 @@ class TestApiBasic(unittest.TestCase):
         self.test_output_dir = os.path.join(os.path.dirname(__file__), '..', 'output')
         if os.path.exists(self.test_output_dir):
             shutil.rmtree(self.test_output_dir)
+        
+        # Uploaded blobs go to a throwaway store, not engine/blobs/store
+        self.blob_dir = tempfile.TemporaryDirectory()
+        self.blob_root = BLOB_STORE.root
+        BLOB_STORE.root = self.blob_dir.name
+
+    def tearDown(self):
+        BLOB_STORE.root = self.blob_root
+        self.blob_dir.cleanup()
 
     def test_simulate_endpoint(self):
         payload = {
@@ -39,6 +72,221 @@ class TestApiBasic(unittest.TestCase):
         self.assertTrue(len(data["logs"]) > 0)
         self.assertEqual(data["logs"][0]["segment_id"], "test-seg")
 
+    def test_simulate_cache(self):
+        payload = {
+            "segments": [{"segment_id": "cache-seg", "length_m": 45, "width_m": 7}],
+            "days": 6,
+            "seed": 77
+        }
+        
+        first = self.app.post('/simulate', data=json.dumps(payload), content_type='application/json')
+        second = self.app.post('/simulate', data=json.dumps(payload), content_type='application/json')
+        
+        self.assertEqual(first.headers['X-Cache'], 'MISS')
+        self.assertEqual(second.headers['X-Cache'], 'HIT')
+        self.assertEqual(json.loads(first.data), json.loads(second.data))
+        
+        stats = json.loads(self.app.get('/simulate/cache').data)
+        self.assertGreaterEqual(stats["hits"], 1)
+        self.assertIn("hit_rate", stats)
+        
+        # The memory tier is bounded by result size, not just entry count
+        cache = app_module.SIMULATION_CACHE
+        large = dict(payload, segments=[{"segment_id": f"cache-big-{i}", "length_m": 300, "width_m": 7} for i in range(20)], days=30)
+        small_size = app_module.simulation_result_bytes(json.loads(first.data)["logs"])
+        large_size = app_module.simulation_result_bytes(json.loads(self.app.post('/simulate', json=large).data)["logs"])
+        self.assertGreater(large_size, 10 * small_size)
+        max_bytes = cache.max_bytes
+        cache.max_bytes = large_size + small_size // 2
+        try:
+            cache.clear()
+            self.app.post('/simulate', json=payload)
+            self.assertEqual(self.app.post('/simulate', json=large).headers['X-Cache'], 'MISS')
+            self.assertEqual(self.app.post('/simulate', json=payload).headers['X-Cache'], 'MISS', "The large result evicted the small one")
+        finally:
+            cache.max_bytes = max_bytes
+
+    def test_simulate_ndjson_stream(self):
+        payload = {
+            "segments": [{"segment_id": "stream-seg", "length_m": 50, "width_m": 7}],
+            "days": 5,
+            "seed": 123
+        }
+        
+        json_resp = self.app.post('/simulate',
+                                  data=json.dumps(payload),
+                                  content_type='application/json')
+        stream_resp = self.app.post('/simulate?format=ndjson',
+                                    data=json.dumps(payload),
+                                    content_type='application/json')
+        
+        self.assertEqual(stream_resp.status_code, 200)
+        self.assertEqual(stream_resp.mimetype, 'application/x-ndjson')
+        streamed = [json.loads(line) for line in stream_resp.data.decode().splitlines()]
+        self.assertEqual(streamed, json.loads(json_resp.data)["logs"])
+
+    def test_simulate_summary_mode(self):
+        payload = {
+            "segments": [{"segment_id": "sum-seg", "length_m": 50, "width_m": 7}],
+            "days": 5,
+            "seed": 123
+        }
+        logs_resp = self.app.post('/simulate',
+                                  data=json.dumps(payload),
+                                  content_type='application/json')
+        payload["mode"] = "summary"
+        summary_resp = self.app.post('/simulate',
+                                     data=json.dumps(payload),
+                                     content_type='application/json')
+        
+        self.assertEqual(summary_resp.status_code, 200)
+        data = json.loads(summary_resp.data)
+        self.assertNotIn("logs", data)
+        self.assertEqual(data["summary"], json.loads(logs_resp.data)["summary"])
+        self.assertEqual(data["segments"][0]["segment_id"], "sum-seg")
+
+    def test_simulate_resume(self):
+        segments = [{"segment_id": "resume-seg", "length_m": 200, "width_m": 7}]
+        full = json.loads(self.app.post('/simulate',
+                                        data=json.dumps({"segments": segments, "days": 20, "seed": 5}),
+                                        content_type='application/json').data)
+        
+        first = json.loads(self.app.post('/simulate',
+                                         data=json.dumps({"segments": segments, "days": 8, "seed": 5, "return_state": True}),
+                                         content_type='application/json').data)
+        self.assertIn("state", first)
+        
+        response = self.app.post('/simulate/resume',
+                                 data=json.dumps({"state": first["state"], "days": 12}),
+                                 content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        second = json.loads(response.data)
+        
+        self.assertEqual(first["logs"] + second["logs"], full["logs"])
+        self.assertEqual(second["summary"]["total_days"], 20)
+        
+        bad = self.app.post('/simulate/resume',
+                            data=json.dumps({"state": "not-a-state", "days": 1}),
+                            content_type='application/json')
+        self.assertEqual(bad.status_code, 400)
+
+    def test_simulate_ensemble(self):
+        payload = {
+            "segments": [{"segment_id": "ens-seg", "length_m": 20, "width_m": 7}],
+            "days": 30,
+            "runs": 50
+        }
+        
+        response = self.app.post('/simulate',
+                                 data=json.dumps(payload),
+                                 content_type='application/json')
+        
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        
+        self.assertNotIn("logs", data)
+        self.assertEqual(data["summary"]["runs"], 50)
+        self.assertIn("p80", data["ensemble"][0]["percentiles"])
+
+    def test_simulate_sweep(self):
+        payload = {
+            "segments": [{"segment_id": "sweep-seg", "length_m": 60, "width_m": 7}],
+            "days": 60,
+            "crew_size": [4, 8, 12],
+            "block_length_m": [3.0, 4.5]
+        }
+        
+        response = self.app.post('/simulate/sweep',
+                                 data=json.dumps(payload),
+                                 content_type='application/json')
+        
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data["summary"]["combinations"], 6)
+        self.assertIn("completion_day", data["columns"])
+        self.assertEqual(len(data["rows"]), 6)
+        self.assertEqual(data["engine"], "python")
+        
+        # Rows match /simulate summary mode, which uses the same default engine
+        summary = json.loads(self.app.post('/simulate', json={"segments": payload["segments"], "days": 60, "crew_size": 8, "block_length_m": 4.5, "mode": "summary"}).data)
+        row = next(r for r in data["rows"] if r[:2] == [8, 4.5])
+        self.assertEqual(row[2], summary["segments"][0]["completion_day"])
+        
+        for bad in ({"crew_size": ["eight"]}, {"block_length_m": [None]}, {"crew_size": [True]}):
+            response = self.app.post('/simulate/sweep', json=dict(payload, **bad))
+            self.assertEqual(response.status_code, 400)
+
+    def test_compressed_responses(self):
+        payload = json.dumps({"segments": [{"segment_id": "gzip-seg", "length_m": 400, "width_m": 7}], "days": 60, "seed": 9})
+        plain = self.app.post('/simulate', data=payload, content_type='application/json')
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertIn('Accept-Encoding', plain.headers['Vary'])
+        
+        zipped = self.app.post('/simulate', data=payload, content_type='application/json', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(zipped.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(zipped.data), plain.data)
+        self.assertLess(len(zipped.data), len(plain.data) / 4)
+        
+        if encoding.brotli is not None:
+            br = self.app.post('/simulate', data=payload, content_type='application/json', headers={'Accept-Encoding': 'gzip, deflate, br'})
+            self.assertEqual(br.headers['Content-Encoding'], 'br')
+            self.assertEqual(encoding.brotli.decompress(br.data), plain.data)
+        
+        # Below the size threshold, bodies go out as is
+        small = self.app.get('/simulate/cache', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', small.headers)
+
+    def test_json_encoders_agree(self):
+        logs = json.loads(self.app.post('/simulate', data=json.dumps({"segments": [{"segment_id": "enc-seg", "length_m": 90, "width_m": 7}], "days": 10, "seed": 4}),
+                                        content_type='application/json').data)["logs"]
+        obj = {"logs": logs, "note": "Bañados", "count": 3, "ratio": 0.1}
+        for name in JSON_ENCODERS:
+            try:
+                provider = json_provider_class(name)(app)
+            except ValueError:
+                continue  # optional encoder not installed
+            self.assertEqual(json.loads(provider.dumps(obj)), obj, name)
+            self.assertEqual(provider.loads(provider.dumps(obj)), obj, name)
+        with self.assertRaises(ValueError):
+            json_provider_class("simdjson")
+
+    def test_cpu_pool_matches_inline(self):
+        payload = {"segments": [{"segment_id": "pool-seg", "length_m": 40, "width_m": 7}], "days": 6, "seed": 321, "return_state": True}
+        prov_payload = {"shift_logs": [{"date": "2025-11-10", "segment_id": "pool-seg", "shift_output_blocks": 1.0}], "output_name": "pool.pdf"}
+        
+        sweep_payload = {"segments": payload["segments"], "days": 20, "crew_size": [4, 8], "block_length_m": [3.0, 4.5], "engine": "python"}
+        
+        inline = json.loads(self.app.post('/simulate', data=json.dumps(payload), content_type='application/json').data)
+        inline_sweep = json.loads(self.app.post('/simulate/sweep', json=sweep_payload).data)
+        cpu_pool.set_cpu_workers(2)
+        try:
+            pooled = json.loads(self.app.post('/simulate', data=json.dumps(payload), content_type='application/json').data)
+            response = self.app.post('/provenance', data=json.dumps(prov_payload), content_type='application/json')
+            # Fan-out work runs on the shared pool rather than one of its own
+            pooled_sweep = json.loads(self.app.post('/simulate/sweep', json=sweep_payload).data)
+            ensemble = self.app.post('/simulate', json={"segments": payload["segments"], "days": 20, "seed": 5, "runs": 12})
+            batch = json.loads(self.app.post('/provenance/batch', json={"reports": [prov_payload, dict(prov_payload, output_name="pool2.pdf")]}).data)
+        finally:
+            cpu_pool.set_cpu_workers(0)
+        self.assertEqual(pooled["logs"], inline["logs"])
+        self.assertEqual(pooled_sweep["rows"], inline_sweep["rows"])
+        self.assertEqual(ensemble.status_code, 200)
+        self.assertEqual(batch["failed"], 0)
+        self.assertEqual(cpu_pool.cpu_executor(), (None, 0))
+        
+        # Each worker's caches get an equal share of the configured limits
+        limits = [(cache.max_entries, cache.max_bytes) for cache in (PHOTO_CACHE, PAGE_CACHE)]
+        try:
+            cpu_pool._init_worker(4)
+            for cache, (entries, size) in zip((PHOTO_CACHE, PAGE_CACHE), limits):
+                self.assertEqual((cache.max_entries, cache.max_bytes), (entries // 4, size // 4))
+        finally:
+            for cache, (entries, size) in zip((PHOTO_CACHE, PAGE_CACHE), limits):
+                cache.max_entries, cache.max_bytes = entries, size
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("prepare_s", json.loads(response.data)["timings"])
+        self.assertTrue(os.path.exists(os.path.join(self.test_output_dir, 'pool.pdf')))
+
     def test_provenance_endpoint(self):
         # First get some logs
         sim_payload = {
@@ -68,5 +316,207 @@ class TestApiBasic(unittest.TestCase):
         self.assertEqual(len(data["sha256"]), 64)
         self.assertTrue(data["pdf_path"].endswith("test_prov.pdf"))
 
+    def test_provenance_cache(self):
+        payload = {
+            "shift_logs": [{"date": "2025-11-10", "segment_id": "cache-prov", "shift_output_blocks": 1.5}],
+            "output_name": "cache_prov.pdf"
+        }
+        
+        first = self.app.post('/provenance', data=json.dumps(payload), content_type='application/json')
+        second = self.app.post('/provenance', data=json.dumps(payload), content_type='application/json')
+        self.assertEqual(first.headers['X-Cache'], 'MISS')
+        self.assertEqual(second.headers['X-Cache'], 'HIT')
+        self.assertEqual(json.loads(first.data)["sha256"], json.loads(second.data)["sha256"])
+        
+        # Same inputs under another name: the stored PDF is copied
+        payload["output_name"] = "cache_prov_copy.pdf"
+        copy = self.app.post('/provenance', data=json.dumps(payload), content_type='application/json')
+        self.assertEqual(copy.headers['X-Cache'], 'HIT')
+        self.assertTrue(os.path.exists(os.path.join(self.test_output_dir, 'cache_prov_copy.pdf')))
+        
+        # A tampered artifact fails verification and is re-rendered
+        with open(os.path.join(self.test_output_dir, 'cache_prov.pdf'), 'ab') as f:
+            f.write(b'%tampered')
+        payload["output_name"] = "cache_prov.pdf"
+        rerender = self.app.post('/provenance', data=json.dumps(payload), content_type='application/json')
+        self.assertEqual(rerender.headers['X-Cache'], 'MISS')
+        
+        stats = json.loads(self.app.get('/provenance/cache').data)
+        self.assertGreaterEqual(stats["hits"], 2)
+        self.assertGreaterEqual(stats["stale"], 1)
+        self.assertIn("hit_rate", stats)
+
+    def test_provenance_profiles(self):
+        photo = data_url(make_photo((1200, 900), "PNG"), "png")
+        logs = [{"date": "2025-11-10", "segment_id": "profile-seg", "photo_base64": photo}]
+        
+        sizes = {}
+        for profile in ("archival", "standard", "compact"):
+            payload = {"shift_logs": logs, "output_name": f"profile_{profile}.pdf", "profile": profile}
+            response = self.app.post('/provenance', data=json.dumps(payload), content_type='application/json')
+            self.assertEqual(response.status_code, 200)
+            data = json.loads(response.data)
+            self.assertEqual(data["profile"], profile)
+            self.assertEqual(data["size_bytes"], os.path.getsize(os.path.join(self.test_output_dir, payload["output_name"])))
+            sizes[profile] = data["size_bytes"]
+        self.assertLess(sizes["compact"], sizes["standard"])
+        self.assertLess(sizes["standard"], sizes["archival"])
+        
+        bad = self.app.post('/provenance', data=json.dumps({"shift_logs": logs, "profile": "tiny"}), content_type='application/json')
+        self.assertEqual(bad.status_code, 400)
+
+    def test_provenance_cumulative(self):
+        logs = [{"date": f"2025-11-{day:02d}", "segment_id": "cum-seg", "shift_output_blocks": 1.0} for day in range(1, 4)]
+        payload = {"shift_logs": logs, "output_name": "cumulative.pdf", "project": {"project_id": "PROJ-API"}, "cumulative": True}
+        self.app.post('/provenance', data=json.dumps(payload), content_type='application/json')
+        
+        payload["shift_logs"] = logs + [{"date": "2025-11-04", "segment_id": "cum-seg", "shift_output_blocks": 2.0}]
+        response = self.app.post('/provenance', data=json.dumps(payload), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        timings = json.loads(response.data)["timings"]
+        self.assertEqual(timings["days"], 4)
+        self.assertEqual(timings["days_rendered"], 1)
+
+    def test_provenance_batch(self):
+        logs = [{"date": f"2025-11-{day:02d}", "segment_id": "batch-seg", "shift_output_blocks": 2.0} for day in (10, 10, 11)]
+        payload = {"shift_logs": logs, "group_by": ["date"], "zip": True, "workers": 1}
+        
+        response = self.app.post('/provenance/batch', data=json.dumps(payload), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        manifest = json.loads(response.data)
+        self.assertEqual(manifest["total"], 2)
+        self.assertTrue(manifest["reports"][0]["pdf_path"].endswith("provenance_2025-11-10.pdf"))
+        self.assertTrue(manifest["zip"]["zip_path"].endswith("provenance_batch.zip"))
+        
+        # Progress lines, then the manifest
+        stream = self.app.post('/provenance/batch?format=ndjson', data=json.dumps(payload), content_type='application/json')
+        lines = [json.loads(line) for line in stream.data.decode().splitlines()]
+        self.assertEqual([line.get("done") for line in lines[:-1]], [1, 2])
+        self.assertEqual(lines[-1]["manifest"]["total"], 2)
+        
+        bad = self.app.post('/provenance/batch', data=json.dumps({"reports": []}), content_type='application/json')
+        self.assertEqual(bad.status_code, 400)
+        for workers in (0, -2, "4", 1.5, True):
+            bad = self.app.post('/provenance/batch', json=dict(payload, workers=workers))
+            self.assertEqual(bad.status_code, 400, workers)
+
+    def test_provenance_ndjson_body(self):
+        lines = [{"project": {"project_id": "PROJ-001", "project_title": "Streamed"}}]
+        lines += [{"date": f"2025-11-{day:02d}", "segment_id": "stream-seg", "shift_output_blocks": 1.0} for day in range(1, 6)]
+        body = "".join(json.dumps(line) + "\n" for line in lines)
+        
+        response = self.app.post('/provenance?output_name=streamed.pdf', data=body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertTrue(data["pdf_path"].endswith("streamed.pdf"))
+        self.assertEqual(len(data["sha256"]), 64)
+        
+        empty = self.app.post('/provenance', data=json.dumps(lines[0]) + "\n", content_type='application/x-ndjson')
+        self.assertEqual(empty.status_code, 400)
+
+    def test_provenance_multipart_upload(self):
+        raw = make_photo((640, 480))
+        log = {"date": "2025-11-12", "segment_id": "upload-seg", "shift_output_blocks": 1.0}
+
+        # Same photo as a multipart file part and as base64 inside JSON
+        payload = {"shift_logs": [dict(log, photo_part="photo_0")], "output_name": "multipart.pdf"}
+        response = self.app.post('/provenance', data={"payload": json.dumps(payload), "photo_0": (io.BytesIO(raw), "photo_0.jpg")},
+                                 content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 200)
+        uploaded = json.loads(response.data)
+
+        photo = data_url(raw)
+        payload = {"shift_logs": [dict(log, photo_base64=photo)], "output_name": "base64.pdf"}
+        response = self.app.post('/provenance', data=json.dumps(payload), content_type='application/json')
+        self.assertEqual(uploaded["size_bytes"], json.loads(response.data)["size_bytes"])
+
+        missing = self.app.post('/provenance', data={"payload": json.dumps({"shift_logs": [dict(log, photo_part="photo_9")]})},
+                                content_type='multipart/form-data')
+        self.assertEqual(missing.status_code, 400)
+        
+        # Bodies and form fields over the configured limits are refused
+        limits = app.config['MAX_CONTENT_LENGTH'], app.config['MAX_FORM_MEMORY_SIZE']
+        app.config['MAX_CONTENT_LENGTH'], app.config['MAX_FORM_MEMORY_SIZE'] = len(raw) // 2, 64
+        try:
+            too_large = self.app.post('/provenance', data={"payload": json.dumps(payload), "photo_0": (io.BytesIO(raw), "photo_0.jpg")},
+                                      content_type='multipart/form-data')
+            self.assertEqual(too_large.status_code, 413)
+            app.config['MAX_CONTENT_LENGTH'] = limits[0]
+            long_field = self.app.post('/provenance', data={"payload": json.dumps(dict(payload, note="x" * 100))},
+                                       content_type='multipart/form-data')
+            self.assertEqual(long_field.status_code, 413)
+        finally:
+            app.config['MAX_CONTENT_LENGTH'], app.config['MAX_FORM_MEMORY_SIZE'] = limits
+
+    def test_blob_upload_and_reference(self):
+        photo = make_photo((320, 240))
+        digest = hashlib.sha256(photo).hexdigest()
+        log = {"date": "2025-11-13", "segment_id": "blob-seg", "photo_sha256": digest}
+        
+        missing = self.app.post('/blobs/missing', data=json.dumps({"sha256": [digest]}), content_type='application/json')
+        self.assertEqual(json.loads(missing.data)["missing"], [digest])
+        self.assertEqual(self.app.head(f'/blobs/{digest}').status_code, 404)
+        rejected = self.app.post('/provenance', data=json.dumps({"shift_logs": [log]}), content_type='application/json')
+        self.assertEqual(rejected.status_code, 400)
+        self.assertEqual(json.loads(rejected.data)["missing"], [digest])
+        
+        self.assertEqual(self.app.put(f'/blobs/{digest}', data=photo).status_code, 201)
+        self.assertEqual(self.app.put(f'/blobs/{digest}', data=photo).status_code, 200)
+        self.assertEqual(self.app.put(f'/blobs/{"0" * 64}', data=photo).status_code, 400)
+        self.assertEqual(self.app.get(f'/blobs/{digest}').data, photo)
+        
+        response = self.app.post('/provenance', data=json.dumps({"shift_logs": [log], "output_name": "blob.pdf"}), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)["timings"]["photo_errors"], 0)
+
+    def test_metrics_endpoint(self):
+        raw = make_photo((900, 600))
+        photo = data_url(raw)
+        logs = [{"date": "2025-11-14", "segment_id": "metrics-seg", "photo_base64": photo}, {"date": "2025-11-14", "segment_id": "metrics-seg", "photo_base64": "data:image/jpeg;base64,AAAA"}]
+        self.assertEqual(self.app.post('/provenance', data=json.dumps({"shift_logs": logs, "output_name": "metrics.pdf"}), content_type='application/json').status_code, 200)
+        
+        response = self.app.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        text = response.data.decode()
+        for stage in ("json_parse", "photo_decode", "photo_resize", "layout", "pdf_output", "hash"):
+            self.assertIn(f'veritas_stage_duration_seconds_count{{stage="{stage}"}}', text)
+        self.assertIn('veritas_http_request_duration_seconds_count{method="POST",endpoint="generate_provenance",status="200"}', text)
+        self.assertIn('veritas_cache_hit_ratio{cache="pdf"}', text)
+        
+        samples = dict(line.rsplit(" ", 1) for line in text.splitlines() if line and not line.startswith("#"))
+        self.assertGreaterEqual(float(samples["veritas_photos_total"]), 2)
+        self.assertGreaterEqual(float(samples["veritas_photo_errors_total"]), 1)
+        self.assertGreater(float(samples["veritas_photo_bytes_total"]), len(raw))
+
+    def test_provenance_job_queue(self):
+        db_dir = tempfile.mkdtemp()
+        default_queue = app_module.JOB_QUEUE
+        app_module.JOB_QUEUE = JobQueue(os.path.join(db_dir, 'jobs.sqlite3'), app_module._run_provenance_job, workers=1)
+        try:
+            payload = {
+                "shift_logs": [{"date": "2025-11-10", "segment_id": "job-seg", "shift_output_blocks": 4.0}],
+                "output_name": "job_prov.pdf"
+            }
+            submitted = self.app.post('/provenance/jobs', data=json.dumps(payload), content_type='application/json')
+            self.assertEqual(submitted.status_code, 202)
+            job_id = json.loads(submitted.data)["job_id"]
+            
+            deadline = time.time() + 10
+            while True:
+                status = json.loads(self.app.get(f'/provenance/jobs/{job_id}').data)
+                if status["status"] in ("done", "failed") or time.time() > deadline:
+                    break
+                time.sleep(0.02)
+            self.assertEqual(status["status"], "done")
+            self.assertTrue(status["pdf_path"].endswith("job_prov.pdf"))
+            self.assertEqual(len(status["sha256"]), 64)
+            
+            self.assertEqual(self.app.get('/provenance/jobs/unknown').status_code, 404)
+        finally:
+            app_module.JOB_QUEUE.stop()
+            app_module.JOB_QUEUE = default_queue
+            shutil.rmtree(db_dir)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,166 @@
+import sys
+import os
+import json
+import time
+import socket
+import argparse
+import tempfile
+import statistics
+import subprocess
+import threading
+import itertools
+import urllib.request
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from tools.generate_field_log_corpus import photo_data_url
+
+SERVE_PATH = os.path.join(os.path.dirname(__file__), '..', 'api', 'serve.py')
+OUTPUT_DIR = os.path.join(os.path.dirname(__file__), '..', 'api', 'output')
+
+# Request shapes from engine/api/tests, scaled up so each request does real
+# work. A counter makes every body unique, so the result caches never answer.
+def simulate_request(n):
+    segments = [{"segment_id": f"load-{i:03d}", "length_m": 50 + (i % 40) * 25, "width_m": 7} for i in range(40)]
+    return '/simulate', {"segments": segments, "days": 120, "seed": n}
+
+_photos = {}
+
+def provenance_request(n):
+    if not _photos:
+        _photos.update({i: photo_data_url(1280, 960, "png", i) for i in range(4)})
+    logs = [{"date": f"2025-11-{day:02d}", "segment_id": "load-seg", "shift_output_blocks": 1.0,
+             "weather": f"request {n}", "photo_base64": _photos[day % 4]} for day in range(1, 5)]
+    return '/provenance', {"shift_logs": logs, "output_name": f"load_{n % 64}.pdf"}
+
+REQUESTS = {"simulate": simulate_request, "provenance": provenance_request}
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(cpu_workers, threads, job_db):
+    port = free_port()
+    env = dict(os.environ, VERITAS_JOB_DB=job_db)
+    process = subprocess.Popen(
+        [sys.executable, SERVE_PATH, "--port", str(port), "--threads", str(threads), "--cpu-workers", str(cpu_workers)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(base_url + "/simulate/cache", timeout=1).read()
+            return process, base_url
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("Server did not start")
+
+def post(base_url, path, payload):
+    body = json.dumps(payload).encode("utf-8")
+    request = urllib.request.Request(base_url + path, data=body, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=300) as response:
+        response.read()
+        return response.status
+
+def run_load(base_url, kinds, concurrency, duration):
+    """
+    Sends requests from `concurrency` client threads for `duration` seconds,
+    while one more thread times a cheap GET to see whether heavy requests
+    stall the rest. Returns (completed, errors, latencies, probe latencies)
+    in seconds.
+    """
+    counter = itertools.count()
+    latencies = []
+    probes = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.time() + duration
+    # Build bodies up front so client-side JSON work does not skew timings
+    bodies = [REQUESTS[kind](n) for n, kind in zip(range(256), itertools.cycle(kinds))]
+
+    def client():
+        while time.time() < stop_at:
+            n = next(counter)
+            path, payload = bodies[n % len(bodies)]
+            payload = dict(payload, seed=n) if path == '/simulate' else payload
+            started = time.perf_counter()
+            try:
+                ok = post(base_url, path, payload) == 200
+            except OSError:
+                ok = False
+            with lock:
+                if ok:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors[0] += 1
+
+    def probe():
+        while time.time() < stop_at:
+            started = time.perf_counter()
+            urllib.request.urlopen(base_url + "/provenance/cache", timeout=300).read()
+            probes.append(time.perf_counter() - started)
+            time.sleep(0.1)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)] + [threading.Thread(target=probe)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(latencies), errors[0], latencies, probes
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Load test for the Veritas Engine API production server")
+    parser.add_argument("--cpu-workers", default=",".join(str(n) for n in sorted({1, 2, 4, cores}) if n <= cores),
+                        help="Comma-separated CPU worker counts to compare")
+    parser.add_argument("--mix", default="simulate,provenance", help="Comma-separated request kinds: " + ", ".join(REQUESTS))
+    parser.add_argument("--concurrency", type=int, default=2 * cores, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds of load per worker count")
+    parser.add_argument("--output", help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    kinds = args.mix.split(",")
+    for kind in kinds:
+        if kind not in REQUESTS:
+            parser.error(f"Unknown request kind '{kind}'")
+
+    results = {}
+    job_db = os.path.join(tempfile.mkdtemp(prefix="veritas_load_"), "jobs.sqlite3")
+    print(f"{'cpu_workers':>11} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'probe ms':>9} {'speedup':>8}")
+    for workers in [int(n) for n in args.cpu_workers.split(",")]:
+        process, base_url = start_server(workers, max(16, args.concurrency), job_db)
+        try:
+            run_load(base_url, kinds, args.concurrency, min(3.0, args.duration))  # warm-up
+            completed, errors, latencies, probes = run_load(base_url, kinds, args.concurrency, args.duration)
+        finally:
+            process.terminate()
+            process.wait()
+        latencies.sort()
+        result = {
+            "requests": completed,
+            "errors": errors,
+            "requests_per_s": round(completed / args.duration, 2),
+            "p50_ms": round(1000 * statistics.median(latencies), 1) if latencies else None,
+            "p95_ms": round(1000 * latencies[int(0.95 * (len(latencies) - 1))], 1) if latencies else None,
+            # Median latency of GET /provenance/cache under load
+            "probe_ms": round(1000 * statistics.median(probes), 1) if probes else None
+        }
+        first = next(iter(results.values()), result)
+        result["speedup"] = round(result["requests_per_s"] / first["requests_per_s"], 2) if first["requests_per_s"] else None
+        results[workers] = result
+        print(f"{workers:>11} {completed:>9} {errors:>7} {result['requests_per_s']:>8} {result['p50_ms']:>8} {result['p95_ms']:>8} {result['probe_ms']:>9} {result['speedup']:>8}")
+
+    for name in os.listdir(OUTPUT_DIR):
+        if name.startswith("load_"):
+            os.remove(os.path.join(OUTPUT_DIR, name))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"cpu_count": cores, "mix": kinds, "concurrency": args.concurrency, "results": results}, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,517 @@
+import io
+import sys
+import os
+import json
+import hashlib
+import time
+import shutil
+import argparse
+import platform
+import statistics
+import tempfile
+import tracemalloc
+import datetime
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from werkzeug.datastructures import FileStorage
+from werkzeug.test import encode_multipart
+
+from engine.generator.generator import simulate, simulate_summary
+from engine.provenance.batch import render_batch
+from engine.provenance.cumulative import save_cumulative_pdf, PAGE_CACHE
+from engine.provenance.provenance import create_provenance_pdf, save_provenance_pdf, save_provenance_pdf_stream, iter_ndjson_logs, hash_file, prepare_photo, decode_photo, PHOTO_WORKERS, PHOTO_CACHE, PDF_PROFILES
+from engine.api.app import app, read_provenance_body, OUTPUT_DIR, PDF_CACHE
+from engine.blobs.blobs import BLOB_STORE
+from engine.api.encoding import JSON_ENCODERS, json_provider_class, content_encodings, compress
+from engine.metrics.metrics import Registry
+from tools.generate_field_log_corpus import photo_data_url
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# Scratch space for generated PDFs. main() creates it for the run and
+# removes it when the run finishes, so importing this module (or --list)
+# leaves nothing behind.
+WORK_DIR = None
+
+# Registered benchmark cases: name -> (setup, repeat). setup() returns the
+# callable to time and an optional dict of extra metrics to record.
+CASES = {}
+
+def benchmark(name, repeat=5):
+    def register(setup):
+        CASES[name] = (setup, repeat)
+        return setup
+    return register
+
+def make_segments(count):
+    # Lengths vary so segments finish on different days
+    return [{"segment_id": f"bench-{i:05d}", "length_m": 50 + (i % 40) * 25, "width_m": 7} for i in range(count)]
+
+_photo_cache = {}
+
+def make_logs(count, photo_size=None, variants=10):
+    """
+    Simulated shift logs with synthetic JPEGs if photo_size is given,
+    cycling through `variants` distinct photos.
+    """
+    logs = simulate(make_segments(max(count, 1)), days=1, seed=42)[:count]
+    if photo_size:
+        for i, log in enumerate(logs):
+            key = (photo_size, i % variants)
+            if key not in _photo_cache:
+                _photo_cache[key] = photo_data_url(photo_size[0], photo_size[1], "jpeg", i % variants)
+            log["photo_base64"] = _photo_cache[key]
+    return logs
+
+# --- simulate ---
+
+for _segments, _days in [(10, 30), (100, 365), (1000, 365)]:
+    for _engine in ('python', 'numpy'):
+        def _setup(segments=_segments, days=_days, engine=_engine):
+            segs = make_segments(segments)
+            return (lambda: simulate(segs, days=days, seed=42, engine=engine)), {}
+        benchmark(f"simulate[{_engine},{_segments}x{_days}]", repeat=3)(_setup)
+
+        def _setup_summary(segments=_segments, days=_days, engine=_engine):
+            segs = make_segments(segments)
+            return (lambda: simulate_summary(segs, days=days, seed=42, engine=engine)), {}
+        benchmark(f"simulate_summary[{_engine},{_segments}x{_days}]", repeat=3)(_setup_summary)
+
+# --- create_provenance_pdf ---
+
+PHOTO_SIZES = {"nophoto": None, "640x480": (640, 480), "1920x1440": (1920, 1440)}
+
+for _count in (0, 10, 100):
+    for _label, _size in PHOTO_SIZES.items():
+        if _count == 0 and _size:
+            continue
+        def _setup_pdf(count=_count, size=_size, label=_label):
+            logs = make_logs(count, size)
+            output_path = os.path.join(WORK_DIR, f"bench_{count}_{label}.pdf")
+            extra = {}
+            def run():
+                # Cold photo cache, so each run measures the full pipeline
+                PHOTO_CACHE.clear()
+                create_provenance_pdf(logs, output_path)
+                extra["pdf_bytes"] = os.path.getsize(output_path)
+            return run, extra
+        benchmark(f"create_provenance_pdf[{_count} logs,{_label}]", repeat=3 if _count < 100 else 1)(_setup_pdf)
+
+# Prepare-stage concurrency on a 60-entry report
+for _workers in sorted({1, PHOTO_WORKERS}):
+    def _setup_workers(workers=_workers):
+        logs = make_logs(60, (1920, 1440))
+        output_path = os.path.join(WORK_DIR, f"bench_workers_{workers}.pdf")
+        stats = {}
+        def run():
+            PHOTO_CACHE.clear()
+            create_provenance_pdf(logs, output_path, workers=workers, stats=stats)
+        return run, {
+            "prepare_s": lambda: stats["prepare_s"], "layout_s": lambda: stats["layout_s"]}
+    benchmark(f"create_provenance_pdf[60 logs,1920x1440,workers={_workers}]", repeat=1)(_setup_workers)
+
+# Re-rendering with the same photos (daily, weekly and corrected reports)
+@benchmark("create_provenance_pdf[60 logs,1920x1440,warm photo cache]", repeat=3)
+def _setup_warm_cache():
+    logs = make_logs(60, (1920, 1440))
+    output_path = os.path.join(WORK_DIR, "bench_warm.pdf")
+    stats = {}
+    def run():
+        create_provenance_pdf(logs, output_path, stats=stats)
+    return run, {"photo_cache_hits": lambda: stats["photo_cache_hits"],
+                 "unique_photos": lambda: stats["unique_photos"],
+                 "pdf_bytes": lambda: os.path.getsize(output_path)}
+
+# Output size and render time per profile, with JPEG and PNG field photos
+for _profile in PDF_PROFILES:
+    for _format in ("jpeg", "png"):
+        def _setup_profile(profile=_profile, image_format=_format):
+            logs = make_logs(20)
+            for i, log in enumerate(logs):
+                log["photo_base64"] = photo_data_url(1920, 1440, image_format, i % 10)
+            output_path = os.path.join(WORK_DIR, f"bench_profile_{profile}_{image_format}.pdf")
+            stats = {}
+            def run():
+                PHOTO_CACHE.clear()
+                save_provenance_pdf(logs, output_path, stats=stats, profile=profile)
+            return run, {"pdf_bytes": lambda: stats["pdf_bytes"]}
+        benchmark(f"save_provenance_pdf[20 logs,1920x1440 {_format},profile={_profile}]", repeat=1)(_setup_profile)
+
+# Nightly cumulative report: every day re-rendered vs only the new day
+for _days in (30, 90):
+    for _mode in ("full", "incremental"):
+        def _setup_cumulative(days=_days, mode=_mode):
+            day_logs = make_logs(3, (1920, 1440), variants=3)
+            logs = []
+            for day in range(days):
+                date = (datetime.date(2025, 1, 1) + datetime.timedelta(days=day)).isoformat()
+                logs += [dict(log, date=date) for log in day_logs]
+            output_path = os.path.join(WORK_DIR, f"bench_cumulative_{days}_{mode}.pdf")
+            stats = {}
+            # Earlier nights' pages are in the cache; the last day is new
+            PAGE_CACHE.clear()
+            save_cumulative_pdf(logs[:-3], output_path)
+            runs = iter(range(1000000))
+            def run():
+                if mode == "full":
+                    PAGE_CACHE.clear()
+                # A fresh last day each run, so exactly that day misses the cache
+                logs[-3:] = [dict(log, weather=f"run {next(runs)}") for log in logs[-3:]]
+                save_cumulative_pdf(logs, output_path, stats=stats)
+            return run, {"days_rendered": lambda: stats["days_rendered"], "pdf_bytes": lambda: stats["pdf_bytes"]}
+        benchmark(f"save_cumulative_pdf[{_days} days,3 logs/day,{_mode}]", repeat=3 if _mode == "incremental" else 1)(_setup_cumulative)
+
+# Month-end batch: many small reports across a process pool
+for _workers in sorted({1, os.cpu_count() or 1}):
+    def _setup_batch(workers=_workers):
+        logs = make_logs(10, (640, 480))
+        reports = [{"output_name": f"batch_{i:03d}.pdf", "shift_logs": logs, "project": {"notes": f"report {i}"}} for i in range(40)]
+        output_dir = os.path.join(WORK_DIR, f"batch_{workers}")
+        def run():
+            PHOTO_CACHE.clear()
+            render_batch(reports, output_dir, workers=workers)
+        return run, {"reports": 40}
+    benchmark(f"render_batch[40 reports,10 logs,640x480,workers={_workers}]", repeat=1)(_setup_batch)
+
+def traced_peak_mb(fn):
+    # Peak Python heap during one untimed run
+    tracemalloc.start()
+    try:
+        fn()
+        return round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+    finally:
+        tracemalloc.stop()
+
+# Long report read from NDJSON: whole list in memory vs streamed windows
+for _mode in ("list", "stream"):
+    def _setup_ndjson(mode=_mode):
+        path = os.path.join(WORK_DIR, "bench_long.ndjson")
+        if not os.path.exists(path):
+            with open(path, "w") as f:
+                for log in make_logs(120, (1920, 1440), variants=40):
+                    f.write(json.dumps(log) + "\n")
+        output_path = os.path.join(WORK_DIR, f"bench_{mode}.pdf")
+        if mode == "list":
+            run = lambda: save_provenance_pdf([json.loads(line) for line in open(path)], output_path)
+        else:
+            run = lambda: save_provenance_pdf_stream(iter_ndjson_logs(path), output_path)
+        return run, {"input_mb": round(os.path.getsize(path) / (1024 * 1024), 1), "peak_mb": lambda: traced_peak_mb(run)}
+    benchmark(f"ndjson_report[120 logs,1920x1440,{_mode}]", repeat=1)(_setup_ndjson)
+
+# --- photo pipeline ---
+
+for _label, _size in PHOTO_SIZES.items():
+    if not _size:
+        continue
+    def _setup_photo(size=_size):
+        photos = [photo_data_url(size[0], size[1], "jpeg", i) for i in range(10)]
+        before = set(os.listdir(tempfile.gettempdir()))
+        def run():
+            PHOTO_CACHE.clear()
+            for photo in photos:
+                prepare_photo(photo)
+        # Files left behind (or churned) in the temp directory during the run
+        def churn():
+            return len(set(os.listdir(tempfile.gettempdir())) ^ before)
+        return run, {"photos": 10, "temp_files": churn}
+    benchmark(f"prepare_photo[10 photos,{_label}]", repeat=5)(_setup_photo)
+
+# --- hash_file ---
+
+@benchmark("hash_file[large pdf]", repeat=5)
+def _setup_hash():
+    output_path = os.path.join(WORK_DIR, "bench_hash.pdf")
+    create_provenance_pdf(make_logs(100, (640, 480), variants=100), output_path)
+    return (lambda: hash_file(output_path)), {"file_bytes": os.path.getsize(output_path)}
+
+# Write-then-rehash against hashing the rendered bytes before the write
+@benchmark("create_provenance_pdf+hash_file[100 logs,640x480 unique]", repeat=3)
+def _setup_write_then_hash():
+    logs = make_logs(100, (640, 480), variants=100)
+    output_path = os.path.join(WORK_DIR, "bench_two_pass.pdf")
+    return (lambda: hash_file(create_provenance_pdf(logs, output_path))), {}
+
+@benchmark("save_provenance_pdf[100 logs,640x480 unique]", repeat=3)
+def _setup_single_pass():
+    logs = make_logs(100, (640, 480), variants=100)
+    output_path = os.path.join(WORK_DIR, "bench_single_pass.pdf")
+    return (lambda: save_provenance_pdf(logs, output_path)), {}
+
+# --- Flask endpoints ---
+
+def _api_client():
+    app.testing = True
+    return app.test_client()
+
+@benchmark("api/simulate[20 requests]", repeat=3)
+def _setup_api_simulate():
+    client = _api_client()
+    payload = json.dumps({"segments": make_segments(50), "days": 120, "seed": 7})
+    def run():
+        for i in range(20):
+            # Vary the seed so the result cache does not short-circuit the work
+            body = payload.replace('"seed": 7', f'"seed": {7 + i + int(time.time() * 1000)}')
+            assert client.post('/simulate', data=body, content_type='application/json').status_code == 200
+    return run, {"requests": 20}
+
+@benchmark("api/provenance[10 requests,10 logs,640x480]", repeat=3)
+def _setup_api_provenance():
+    client = _api_client()
+    payload = {"shift_logs": make_logs(10, (640, 480))}
+    def run():
+        for i in range(10):
+            # Render every time; repeat requests are measured separately
+            PDF_CACHE.clear()
+            PHOTO_CACHE.clear()
+            payload["output_name"] = f"bench_api_{i}.pdf"
+            assert client.post('/provenance', data=json.dumps(payload), content_type='application/json').status_code == 200
+    return run, {"requests": 10}
+
+@benchmark("api/provenance[10 repeat requests,10 logs,640x480]", repeat=3)
+def _setup_api_provenance_repeat():
+    client = _api_client()
+    body = json.dumps({"shift_logs": make_logs(10, (640, 480)), "output_name": "bench_api_repeat.pdf"})
+    def run():
+        for _ in range(10):
+            response = client.post('/provenance', data=body, content_type='application/json')
+            assert response.status_code == 200
+    return run, {"requests": 10}
+
+# Re-generating a report whose photos are already on the server: photos
+# re-sent as base64 each time, against referenced by blob hash
+for _mode in ("base64", "blob"):
+    def _setup_api_blobs(mode=_mode):
+        client = _api_client()
+        logs = make_logs(10, (1920, 1440), variants=10)
+        if mode == "blob":
+            # Keep benchmark photos out of the real store
+            BLOB_STORE.root = os.path.join(WORK_DIR, "blobs")
+            for log in logs:
+                log["photo_sha256"] = BLOB_STORE.put(decode_photo(log.pop("photo_base64"))[0])[0]
+        def run():
+            for i in range(10):
+                # Render every time, so only the request itself differs
+                PDF_CACHE.clear()
+                body = json.dumps({"shift_logs": logs, "output_name": f"bench_api_{mode}.pdf"})
+                assert client.post('/provenance', data=body, content_type='application/json').status_code == 200
+        body_mb = len(json.dumps({"shift_logs": logs})) / (1024 * 1024)
+        return run, {"requests": 10, "body_mb": round(body_mb, 3)}
+    benchmark(f"api/provenance[10 requests,10 logs,1920x1440,{_mode}]", repeat=3)(_setup_api_blobs)
+
+# Request parsing only (no rendering): photos as base64 inside JSON, then
+# decoded, against raw multipart file parts
+for _mode in ("base64", "multipart"):
+    def _setup_upload(mode=_mode):
+        logs = make_logs(40, (1920, 1440), variants=40)
+        if mode == "base64":
+            body = json.dumps({"shift_logs": logs}).encode("utf-8")
+            content_type = "application/json"
+        else:
+            values = {}
+            for i, log in enumerate(logs):
+                values[f"photo_{i}"] = FileStorage(io.BytesIO(decode_photo(log.pop("photo_base64"))[0]), f"photo_{i}.jpg")
+                log["photo_part"] = f"photo_{i}"
+            values["payload"] = json.dumps({"shift_logs": logs})
+            boundary, body = encode_multipart(values)
+            content_type = f"multipart/form-data; boundary={boundary}"
+        def run():
+            with app.test_request_context('/provenance', method='POST', data=body, content_type=content_type):
+                data = read_provenance_body()
+                photos = [log.get("photo_data") or decode_photo(log["photo_base64"])[0] for log in data["shift_logs"]]
+                assert len(photos) == 40
+        return run, {"body_mb": round(len(body) / (1024 * 1024), 1), "peak_mb": lambda: traced_peak_mb(run)}
+    benchmark(f"api/provenance parse[40 logs,1920x1440,{_mode}]", repeat=5)(_setup_upload)
+
+# --- API response encoding ---
+
+_response_payloads = {}
+
+def response_payload(name):
+    """
+    Large response bodies: a /simulate logs result and a /provenance/batch
+    manifest for 5000 reports.
+    """
+    if name not in _response_payloads:
+        if name == "simulate 1000x365":
+            logs = simulate(make_segments(1000), days=365, seed=42)
+            _response_payloads[name] = {"logs": logs, "summary": {"total_days": 365, "total_logs": len(logs)}}
+        else:
+            reports = [{"output_name": f"provenance_2025-11-{i % 30 + 1:02d}_seg-{i:04d}.pdf", "sha256": hashlib.sha256(str(i).encode()).hexdigest(),
+                        "size_bytes": 48211 + i, "pdf_path": f"http://127.0.0.1:5000/output/provenance_2025-11-{i % 30 + 1:02d}_seg-{i:04d}.pdf"} for i in range(5000)]
+            _response_payloads[name] = {"reports": reports, "total": 5000, "failed": 0}
+    return _response_payloads[name]
+
+_json_encoders = []
+for _name in JSON_ENCODERS:
+    try:
+        json_provider_class(_name)
+        _json_encoders.append(_name)
+    except ValueError:
+        pass  # optional encoder not installed
+
+for _payload in ("simulate 1000x365", "manifest 5000 reports"):
+    # Serialization, as jsonify does it
+    for _encoder in _json_encoders:
+        def _setup_encode(payload=_payload, encoder=_encoder):
+            provider = json_provider_class(encoder)(app)
+            obj = response_payload(payload)
+            run = lambda: provider.response(obj).get_data()
+            return run, {"body_mb": round(len(run()) / (1024 * 1024), 2)}
+        benchmark(f"json_encode[{_payload},{_encoder}]", repeat=3)(_setup_encode)
+    # Bytes on the wire per negotiated encoding
+    for _encoding in ["identity"] + content_encodings():
+        def _setup_compress(payload=_payload, encoding=_encoding):
+            body = app.json.response(response_payload(payload)).get_data()
+            wire_bytes = len(compress(body, encoding))
+            return (lambda: compress(body, encoding)), {"wire_mb": round(wire_bytes / (1024 * 1024), 2), "ratio": round(len(body) / wire_bytes, 1)}
+        benchmark(f"compress[{_payload},{_encoding}]", repeat=3)(_setup_compress)
+
+# Cached /simulate responses end to end (serialize + compress), stock
+# encoder and no compression first
+for _encoder, _encoding in [("stdlib", "identity")] + [(_json_encoders[-1], _e) for _e in ["identity"] + content_encodings()]:
+    def _setup_api_encoded(encoder=_encoder, encoding=_encoding):
+        client = _api_client()
+        body = json.dumps({"segments": make_segments(1000), "days": 365, "seed": 42})
+        headers = {"Accept-Encoding": encoding}
+        def run():
+            default_json, app.json = app.json, json_provider_class(encoder)(app)
+            try:
+                response = client.post('/simulate', data=body, content_type='application/json', headers=headers)
+            finally:
+                app.json = default_json
+            assert response.status_code == 200
+            return len(response.data)
+        return run, {"wire_mb": lambda: round(run() / (1024 * 1024), 2)}
+    benchmark(f"api/simulate[1000x365 cached,{_encoder},{_encoding}]", repeat=3)(_setup_api_encoded)
+
+# --- metrics ---
+
+@benchmark("metrics[100k stage observations]", repeat=5)
+def _setup_metrics_observe():
+    # About 2 us per observation; a request records a handful
+    stage = Registry().histogram("bench_stage_seconds", "Stages", ("stage",))
+    stages = ("json_parse", "simulate", "layout", "pdf_output")
+    def run():
+        for i in range(100000):
+            stage.observe(0.003, stage=stages[i & 3])
+    return run, {}
+
+@benchmark("api/metrics[scrape after 20 simulate requests]", repeat=3)
+def _setup_api_metrics():
+    client = _api_client()
+    for _ in range(20):
+        client.post('/simulate', json={"segments": make_segments(10), "days": 5, "seed": 7})
+    def run():
+        assert client.get('/metrics').status_code == 200
+    return run, {}
+
+# --- runner ---
+
+def run_case(name):
+    setup, repeat = CASES[name]
+    fn, extra = setup()
+    fn()  # warm-up
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    result = {"median_s": round(statistics.median(timings), 6), "min_s": round(min(timings), 6)}
+    if "requests" in extra:
+        result["requests_per_s"] = round(extra["requests"] / result["median_s"], 2)
+    if "reports" in extra:
+        result["reports_per_s"] = round(extra["reports"] / result["median_s"], 2)
+    if "photos" in extra:
+        result["ms_per_photo"] = round(1000 * result["median_s"] / extra["photos"], 3)
+    # Callables are measured after the timed runs
+    result.update({k: v() if callable(v) else v for k, v in extra.items() if k not in ("requests", "reports", "photos")})
+    return result
+
+def compare(results, baseline, threshold):
+    """
+    Returns the cases whose median time regressed by more than `threshold`
+    (a fraction) against the baseline.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        ratio = result["median_s"] / base["median_s"] if base["median_s"] else 1.0
+        if ratio > 1.0 + threshold:
+            regressions.append((name, base["median_s"], result["median_s"], ratio))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Veritas Engine benchmark suite")
+    parser.add_argument("--filter", default="", help="Only run cases whose name contains this text")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline results file")
+    parser.add_argument("--save-baseline", action="store_true", help="Write these results as the new baseline")
+    parser.add_argument("--output", help="Also write results to this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown before flagging (0.25 = 25%%)")
+    parser.add_argument("--list", action="store_true", help="List benchmark cases and exit")
+    args = parser.parse_args()
+
+    names = [name for name in CASES if args.filter in name]
+    if args.list:
+        print("\n".join(names))
+        return 0
+
+    global WORK_DIR
+    results = {}
+    WORK_DIR = tempfile.mkdtemp(prefix="veritas_bench_")
+    try:
+        for name in names:
+            result = run_case(name)
+            results[name] = result
+            extras = "  ".join(f"{k}={v}" for k, v in result.items() if k not in ("median_s", "min_s"))
+            print(f"{name:<62} {result['median_s']:>10.4f} s  {extras}")
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+        WORK_DIR = None
+        for name in os.listdir(OUTPUT_DIR):
+            if name.startswith("bench_api_"):
+                os.remove(os.path.join(OUTPUT_DIR, name))
+
+    report = {
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    status = 0
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            status = 1
+            print(f"\nREGRESSIONS (> {args.threshold:.0%} slower than {args.baseline}):")
+            for name, before, after, ratio in regressions:
+                print(f"  {name}: {before:.4f} s -> {after:.4f} s ({ratio:.2f}x)")
+        else:
+            print(f"\nNo regressions against {args.baseline}")
+
+    if args.save_baseline:
+        # Merge so a filtered run only refreshes its own cases
+        merged = report
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                merged = json.load(f)
+            merged.update({k: v for k, v in report.items() if k != "results"})
+            merged.setdefault("results", {}).update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(merged, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+import os
+import re
+import hashlib
+import tempfile
+from typing import Iterable, List, Optional, Tuple
+
+_DIGEST = re.compile(r"[0-9a-f]{64}")
+
+class BlobNotFoundError(KeyError):
+    """Raised when a shift log references a photo blob that is not stored."""
+
+    def __str__(self) -> str:
+        return f"Photo blob {self.args[0]} has not been uploaded"
+
+class BlobStore:
+    """
+    Content-addressed store for photo bytes on local disk.
+
+    Each blob is saved once, under the hex SHA-256 of its content, so a
+    photo uploaded for one report can be referenced by hash from any later
+    report without being sent again. Blobs are immutable and never evicted;
+    the directory is created on first write.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, digest: str) -> str:
+        """
+        File path of a blob.
+
+        Raises:
+            ValueError: If digest is not a lowercase hex SHA-256.
+        """
+        if not isinstance(digest, str) or not _DIGEST.fullmatch(digest):
+            raise ValueError(f"Invalid SHA-256 '{digest}'")
+        # Two-character fan-out keeps directories small
+        return os.path.join(self.root, digest[:2], digest)
+
+    def has(self, digest: str) -> bool:
+        return os.path.exists(self.path(digest))
+
+    def missing(self, digests: Iterable[str]) -> List[str]:
+        """
+        The digests (deduplicated, in first-seen order) that are not stored,
+        i.e. the blobs a client still has to upload.
+        """
+        return [digest for digest in dict.fromkeys(digests) if not self.has(digest)]
+
+    def get(self, digest: str) -> Optional[bytes]:
+        """
+        Contents of a blob, or None if it is not stored.
+        """
+        try:
+            with open(self.path(digest), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, data: bytes, digest: Optional[str] = None) -> Tuple[str, bool]:
+        """
+        Stores data under its SHA-256.
+
+        Args:
+            data: Blob contents.
+            digest: Expected SHA-256, checked against the data if given.
+
+        Returns:
+            (digest, created), where created is False if the blob was
+            already stored.
+
+        Raises:
+            ValueError: If digest is malformed or does not match the data.
+        """
+        actual = hashlib.sha256(data).hexdigest()
+        if digest is not None and digest != actual:
+            self.path(digest)  # report a malformed digest as such
+            raise ValueError(f"Content hashes to {actual}, not {digest}")
+        path = self.path(actual)
+        if os.path.exists(path):
+            return actual, False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename so readers never see partial blobs
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return actual, True
+
+# Shared store for the API and the provenance renderer. Set
+# VERITAS_BLOB_DIR to keep it outside the source tree.
+BLOB_STORE = BlobStore(os.environ.get("VERITAS_BLOB_DIR") or os.path.join(os.path.dirname(__file__), "store"))
@@ -0,0 +1,44 @@
+import unittest
+import sys
+import os
+import shutil
+import hashlib
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from engine.blobs.blobs import BlobStore
+
+class TestBlobsBasic(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = os.path.join(os.path.dirname(__file__), 'test_output')
+        self.store = BlobStore(self.test_dir)
+
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_put_get_and_missing(self):
+        data = b"\xff\xd8 photo bytes"
+        digest = hashlib.sha256(data).hexdigest()
+        other = hashlib.sha256(b"other").hexdigest()
+        self.assertEqual(self.store.missing([digest, other, digest]), [digest, other])
+        self.assertIsNone(self.store.get(digest))
+
+        self.assertEqual(self.store.put(data, digest), (digest, True))
+        self.assertEqual(self.store.put(data), (digest, False))
+        self.assertTrue(self.store.has(digest))
+        self.assertEqual(self.store.get(digest), data)
+        self.assertEqual(self.store.missing([digest, other]), [other])
+        # Stored once, under its own hash, with no temp files left behind
+        self.assertEqual(os.listdir(os.path.join(self.test_dir, digest[:2])), [digest])
+
+    def test_rejects_bad_digests(self):
+        with self.assertRaises(ValueError):
+            self.store.put(b"data", hashlib.sha256(b"different").hexdigest())
+        with self.assertRaises(ValueError):
+            self.store.has("../../etc/passwd")
+        self.assertFalse(os.path.exists(self.test_dir))
+
+if __name__ == '__main__':
+    unittest.main()
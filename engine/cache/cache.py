@@ -0,0 +1,182 @@
+import os
+import json
+import pickle
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+def canonical_hash(obj: Any) -> str:
+    """
+    SHA-256 of a JSON-serializable object in canonical form (sorted keys,
+    no insignificant whitespace), so equal payloads hash equally regardless
+    of key order.
+    """
+    canonical = json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+class LRUCache:
+    """
+    Thread-safe in-memory LRU cache with an optional on-disk tier.
+
+    Keys are strings (usually hex digests). The memory tier is bounded by
+    entry count and, if `sizeof` is given, by total size. Values evicted
+    from memory stay available on disk when a `disk_dir` is configured; the
+    disk tier is bounded by `max_disk_bytes`, evicting least recently used
+    files first, and survives process restarts.
+    """
+
+    def __init__(self, max_entries: int = 128, max_bytes: Optional[int] = None, sizeof: Optional[Callable[[Any], int]] = None, disk_dir: Optional[str] = None, max_disk_bytes: Optional[int] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda value: 0)
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._disk_bytes = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._disk_bytes = sum(os.path.getsize(path) for path in self._disk_files())
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        value = self._disk_get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self.disk_hits += 1
+            self._memory_put(key, value)
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._memory_put(key, value)
+        self._disk_put(key, value)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "memory_bytes": self._bytes,
+                "disk_bytes": self._disk_bytes
+            }
+
+    def clear(self) -> None:
+        """
+        Empties the memory tier and resets counters; the disk tier is kept.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
+            self.hits = self.disk_hits = self.misses = 0
+
+    # Memory tier (caller holds the lock)
+
+    def _memory_put(self, key: str, value: Any) -> None:
+        if key in self._entries:
+            self._bytes -= self._sizes[key]
+        size = self.sizeof(value)
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        self._sizes[key] = size
+        self._bytes += size
+
+        while self._entries and (len(self._entries) > self.max_entries or
+                                 (self.max_bytes is not None and self._bytes > self.max_bytes)):
+            old_key, _ = self._entries.popitem(last=False)
+            self._bytes -= self._sizes.pop(old_key)
+
+    # Disk tier
+
+    def _disk_path(self, key: str) -> str:
+        # Two-character fan-out keeps directories small
+        return os.path.join(self.disk_dir, key[:2], f"{key}.pkl")
+
+    def _disk_files(self):
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                if name.endswith(".pkl"):
+                    yield os.path.join(root, name)
+
+    def _disk_get(self, key: str) -> Any:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            # mtime doubles as the last-used time for disk eviction
+            os.utime(path)
+            return value
+        except FileNotFoundError:
+            return None
+        except (OSError, pickle.UnpicklingError, EOFError):
+            # Corrupt or unreadable entry: treat as a miss
+            return None
+
+    def _disk_put(self, key: str, value: Any) -> None:
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename so readers never see partial entries
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        with self._lock:
+            self._disk_bytes += os.path.getsize(path) - old_size
+            over_limit = self.max_disk_bytes is not None and self._disk_bytes > self.max_disk_bytes
+        if over_limit:
+            self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        files = []
+        for path in self._disk_files():
+            try:
+                stat = os.stat(path)
+                files.append((stat.st_mtime, stat.st_size, path))
+            except FileNotFoundError:
+                continue
+        files.sort()
+
+        with self._lock:
+            self._disk_bytes = sum(size for _, size, _ in files)
+            for _, size, path in files:
+                if self._disk_bytes <= self.max_disk_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    self._disk_bytes -= size
+                except FileNotFoundError:
+                    pass
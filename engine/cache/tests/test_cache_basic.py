@@ -0,0 +1,65 @@
+import unittest
+import sys
+import os
+import shutil
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from engine.cache.cache import LRUCache, canonical_hash
+
+class TestCacheBasic(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = os.path.join(os.path.dirname(__file__), 'test_output')
+        
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_canonical_hash_ignores_key_order(self):
+        self.assertEqual(canonical_hash({"a": 1, "b": [1, 2]}), canonical_hash({"b": [1, 2], "a": 1}))
+        self.assertNotEqual(canonical_hash({"a": 1}), canonical_hash({"a": 2}))
+
+    def test_lru_eviction_and_counters(self):
+        cache = LRUCache(max_entries=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")          # "b" is now least recently used
+        cache.put("c", 3)
+        
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+        
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 3)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["entries"], 2)
+
+    def test_byte_limit(self):
+        cache = LRUCache(max_entries=100, max_bytes=10, sizeof=len)
+        cache.put("a", b"123456")
+        cache.put("b", b"123456")
+        
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["memory_bytes"], 6)
+
+    def test_disk_tier_survives_restart(self):
+        cache = LRUCache(max_entries=1, disk_dir=self.test_dir)
+        cache.put("k1", {"logs": [1, 2, 3]})
+        
+        # A fresh instance (e.g. after an API restart) finds it on disk
+        restarted = LRUCache(max_entries=1, disk_dir=self.test_dir)
+        self.assertEqual(restarted.get("k1"), {"logs": [1, 2, 3]})
+        self.assertEqual(restarted.stats()["disk_hits"], 1)
+
+    def test_disk_size_limit(self):
+        cache = LRUCache(max_entries=1, disk_dir=self.test_dir, max_disk_bytes=3000)
+        for i in range(5):
+            cache.put(f"key{i}", b"x" * 1000)
+        
+        self.assertLessEqual(cache.stats()["disk_bytes"], 3000)
+        self.assertEqual(cache.get("key4"), b"x" * 1000)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import os
+import math
+import datetime
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import List, Dict, Any, Optional
+
+from engine.generator.generator import simulate_summary, ENGINES
+
+PERCENTILES = (50, 80, 95)
+
+def _run_chunk(segments, days, seeds, block_length_m, crew_size, engine) -> List[List[int]]:
+    """
+    Worker entry point: runs a chunk of seeds and returns per-segment
+    histograms of completion day (index 0 counts runs that never completed).
+    """
+    counts = [[0] * (days + 1) for _ in segments]
+    for seed in seeds:
+        summary = simulate_summary(segments, days=days, seed=seed, block_length_m=block_length_m, crew_size=crew_size, engine=engine)
+        for i, seg_summary in enumerate(summary):
+            counts[i][seg_summary['completion_day'] or 0] += 1
+    return counts
+
+def _percentile_day(counts: List[int], runs: int, pct: float) -> Optional[int]:
+    # Nearest-rank percentile; runs that never completed rank last
+    rank = max(1, math.ceil(pct / 100.0 * runs))
+    seen = 0
+    for day in range(1, len(counts)):
+        seen += counts[day]
+        if seen >= rank:
+            return day
+    return None
+
+def simulate_ensemble(segments: List[Dict[str, Any]], days: int = 10, runs: int = 1000, seed: int = 42, block_length_m: float = 4.5, crew_size: int = 8, engine: str = 'python', workers: Optional[int] = None, executor: Optional[Executor] = None) -> List[Dict[str, Any]]:
+    """
+    Monte Carlo ensemble: runs `runs` independent trajectories (seeds
+    seed .. seed + runs - 1) and aggregates completion dates per segment.
+
+    Only histograms are kept, so memory is O(segments x days) regardless of
+    the number of runs.
+
+    Args:
+        segments: List of segment dictionaries (must have 'segment_id' and 'length_m').
+        days: Simulation horizon in days.
+        runs: Number of trajectories.
+        seed: First seed of the ensemble.
+        block_length_m: Length of a single block in meters.
+        crew_size: Number of crew members.
+        engine: Simulation engine ('python' or 'numpy').
+        workers: Process pool size. Defaults to all cores; 1 runs inline.
+        executor: Existing pool to run the chunks on instead of starting
+            one (e.g. the API's shared CPU pool); workers is then its size.
+
+    Returns:
+        One entry per segment with a completion-day histogram and
+        P50/P80/P95 completion days and dates. A percentile is None when
+        that share of runs did not finish within the horizon.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown simulation engine '{engine}' (expected one of {', '.join(ENGINES)})")
+    if runs < 1:
+        raise ValueError("runs must be at least 1")
+
+    workers = workers or os.cpu_count() or 1
+    seeds = list(range(seed, seed + runs))
+
+    if runs == 1 or (workers == 1 and executor is None):
+        counts = _run_chunk(segments, days, seeds, block_length_m, crew_size, engine)
+    else:
+        # A few chunks per worker keeps cores busy without per-seed IPC
+        chunk_count = min(runs, workers * 4)
+        chunks = [seeds[i::chunk_count] for i in range(chunk_count)]
+        counts = [[0] * (days + 1) for _ in segments]
+        pool = executor or ProcessPoolExecutor(max_workers=workers)
+        try:
+            futures = [pool.submit(_run_chunk, segments, days, chunk, block_length_m, crew_size, engine) for chunk in chunks]
+            for future in futures:
+                for seg_counts, chunk_counts in zip(counts, future.result()):
+                    for day, n in enumerate(chunk_counts):
+                        seg_counts[day] += n
+        finally:
+            if executor is None:
+                pool.shutdown()
+
+    start_date = datetime.date.today()
+    results = []
+    for seg, seg_counts in zip(segments, counts):
+        percentiles = {}
+        for pct in PERCENTILES:
+            day = _percentile_day(seg_counts, runs, pct)
+            percentiles[f"p{pct}"] = {
+                "day": day,
+                "date": (start_date + datetime.timedelta(days=day - 1)).isoformat() if day else None
+            }
+        results.append({
+            "segment_id": seg['segment_id'],
+            "runs": runs,
+            "completed_runs": runs - seg_counts[0],
+            # histogram[d - 1] = number of runs completing on day d
+            "histogram": seg_counts[1:],
+            "percentiles": percentiles
+        })
+
+    return results
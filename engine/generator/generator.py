@@ -1,89 +1,367 @@
+import json
+import zlib
+import base64
 import random
+import hashlib
 import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple, Union
 
-def simulate(segments: List[Dict[str, Any]], days: int = 10, seed: int = 42, block_length_m: float = 4.5, crew_size: int = 8) -> List[Dict[str, Any]]:
+from engine.cache.cache import canonical_hash
+
+ENGINES = ('python', 'numpy')
+SNAPSHOT_VERSION = 1
+
+def stream_seed(seed: int, *keys: Any) -> int:
+    """
+    Derives an independent 128-bit seed for one random stream.
+
+    Streams are keyed by name rather than position, e.g.
+    stream_seed(42, 'segment', 'seg-A'), so a segment draws the same numbers
+    regardless of segment order or which worker simulates it.
+    """
+    material = ":".join(str(part) for part in (seed,) + keys).encode("utf-8")
+    return int.from_bytes(hashlib.sha256(material).digest()[:16], "big")
+
+def _draw_weather(rng: random.Random):
+    """
+    Simple weather simulation: returns (weather, productivity factor).
+    """
+    weather = rng.choice(['clear', 'clear', 'clear', 'cloudy', 'rain'])
+    if weather == 'rain':
+        return weather, 0.5
+    if weather == 'cloudy':
+        return weather, 0.9
+    return weather, 1.0
+
+class Simulation:
+    """
+    Resumable simulation state for a portfolio of segments.
+
+    Holds per-segment progress and random streams plus the current day, so a
+    run can be advanced in several steps (or snapshotted and restored later)
+    with results identical to a single run over the whole horizon.
+    """
+
+    def __init__(self, segments: List[Dict[str, Any]], seed: int = 42, block_length_m: float = 4.5, crew_size: int = 8, engine: str = 'python', start_date: Optional[datetime.date] = None):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown simulation engine '{engine}' (expected one of {', '.join(ENGINES)})")
+
+        self.seed = seed
+        self.block_length_m = block_length_m
+        self.crew_size = crew_size
+        self.engine = engine
+        self.start_date = start_date or datetime.date.today()
+        self.day = 0
+
+        # Per-segment state, indexed like `segments`
+        self.segment_ids = [seg['segment_id'] for seg in segments]
+        self.totals = [seg['length_m'] / block_length_m for seg in segments]
+        self.cumulative = [0.0] * len(segments)
+        self.completion_day: List[Optional[int]] = [None] * len(segments)
+        self.shifts = [0] * len(segments)
+        self.rain_days = [0] * len(segments)
+
+        # Weather is shared by the whole portfolio; each segment has its own stream
+        if engine == 'numpy':
+            # Imported lazily so numpy stays an optional dependency
+            from engine.generator.vectorized import new_generator
+            self.weather_rng = new_generator(stream_seed(seed, 'weather'))
+            self.rngs = [new_generator(stream_seed(seed, 'segment', seg_id)) for seg_id in self.segment_ids]
+        else:
+            self.weather_rng = random.Random(stream_seed(seed, 'weather'))
+            self.rngs = [random.Random(stream_seed(seed, 'segment', seg_id)) for seg_id in self.segment_ids]
+
+    def advance(self, days: int) -> Iterator[Dict[str, Any]]:
+        """
+        Simulates the next `days` days, yielding shift_log entries day by day.
+
+        The generator must be consumed to the end before the state is
+        snapshotted or advanced again.
+        """
+        if self.engine == 'numpy':
+            from engine.generator.vectorized import advance_numpy
+            return advance_numpy(self, days, emit=True)
+        return self._advance_python(days, emit=True)
+
+    def skip(self, days: int) -> None:
+        """
+        Simulates the next `days` days updating state only; no log entries
+        are built or rounded.
+        """
+        if self.engine == 'numpy':
+            from engine.generator.vectorized import advance_numpy
+            steps = advance_numpy(self, days, emit=False)
+        else:
+            steps = self._advance_python(days, emit=False)
+        for _ in steps:
+            pass
+
+    def _advance_python(self, days: int, emit: bool) -> Iterator[Dict[str, Any]]:
+        # Base productivity: 0.1 blocks per person per day (calibration point)
+        # So 8 people = 0.8 blocks/day base
+        base_productivity = 0.1 * self.crew_size
+        crew_size = self.crew_size
+        totals, cumulative, rngs = self.totals, self.cumulative, self.rngs
+        completion_day, shifts, rain_days = self.completion_day, self.shifts, self.rain_days
+        active = [i for i, done in enumerate(completion_day) if done is None]
+
+        for _ in range(days):
+            day = self.day
+            self.day += 1
+            date_str = (self.start_date + datetime.timedelta(days=day)).isoformat()
+
+            # Productivity factor based on weather
+            weather, weather_factor = _draw_weather(self.weather_rng)
+            still_active = []
+
+            for i in active:
+                shifts[i] += 1
+                if weather == 'rain':
+                    rain_days[i] += 1
+
+                # Calculate potential output for this shift
+                # Add some random variance (+/- 20%)
+                variance = rngs[i].uniform(0.8, 1.2)
+                daily_potential = base_productivity * weather_factor * variance
+
+                # Cap at remaining blocks
+                remaining = totals[i] - cumulative[i]
+
+                if daily_potential >= remaining:
+                    shift_output = remaining
+                    cumulative[i] = totals[i]
+                    completion_day[i] = day + 1
+                    # Completed segments never draw again
+                    rngs[i] = None
+                    remaining_after = 0.0
+                else:
+                    shift_output = daily_potential
+                    cumulative[i] += shift_output
+                    remaining_after = totals[i] - cumulative[i]
+                    still_active.append(i)
+
+                if emit:
+                    # Create log entry
+                    yield {
+                        "date": date_str,
+                        "segment_id": self.segment_ids[i],
+                        "shift_output_blocks": round(shift_output, 4),
+                        "cumulative_blocks": round(cumulative[i], 4),
+                        "remaining_blocks": round(remaining_after, 4),
+                        "crew_size": crew_size,
+                        "weather": weather
+                    }
+
+            active = still_active
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """
+        Per-segment state as returned by simulate_summary().
+        """
+        results = []
+        for i, seg_id in enumerate(self.segment_ids):
+            done = self.completion_day[i]
+            results.append({
+                "segment_id": seg_id,
+                "completion_day": done,
+                "completion_date": (self.start_date + datetime.timedelta(days=done - 1)).isoformat() if done else None,
+                "shifts": self.shifts[i],
+                "cumulative_blocks": self.cumulative[i],
+                "remaining_blocks": 0.0 if done else self.totals[i] - self.cumulative[i],
+                "blocks_total": self.totals[i],
+                "rain_days": self.rain_days[i]
+            })
+        return results
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        JSON-serializable copy of the full state, including RNG states.
+        Restore it with Simulation.from_snapshot().
+        """
+        def rng_state(rng):
+            if rng is None:
+                return None
+            if self.engine == 'numpy':
+                return rng.bit_generator.state
+            version, internal, gauss_next = rng.getstate()
+            return [version, list(internal), gauss_next]
+
+        return {
+            "version": SNAPSHOT_VERSION,
+            "engine": self.engine,
+            "seed": self.seed,
+            "block_length_m": self.block_length_m,
+            "crew_size": self.crew_size,
+            "start_date": self.start_date.isoformat(),
+            "day": self.day,
+            "weather_rng": rng_state(self.weather_rng),
+            "segments": [{
+                "segment_id": seg_id,
+                "blocks_total": self.totals[i],
+                "cumulative_blocks": self.cumulative[i],
+                "completion_day": self.completion_day[i],
+                "shifts": self.shifts[i],
+                "rain_days": self.rain_days[i],
+                "rng": rng_state(self.rngs[i])
+            } for i, seg_id in enumerate(self.segment_ids)]
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Dict[str, Any]) -> 'Simulation':
+        """
+        Rebuilds a Simulation from snapshot(); advancing it continues the
+        original run exactly.
+        """
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported simulation snapshot version {snapshot.get('version')}")
+
+        segs = snapshot["segments"]
+        sim = cls([], seed=snapshot["seed"], block_length_m=snapshot["block_length_m"],
+                  crew_size=snapshot["crew_size"], engine=snapshot["engine"],
+                  start_date=datetime.date.fromisoformat(snapshot["start_date"]))
+        sim.day = snapshot["day"]
+        sim.segment_ids = [s["segment_id"] for s in segs]
+        sim.totals = [s["blocks_total"] for s in segs]
+        sim.cumulative = [s["cumulative_blocks"] for s in segs]
+        sim.completion_day = [s["completion_day"] for s in segs]
+        sim.shifts = [s["shifts"] for s in segs]
+        sim.rain_days = [s["rain_days"] for s in segs]
+
+        if sim.engine == 'numpy':
+            from engine.generator.vectorized import generator_from_state as restore
+        else:
+            def restore(state):
+                rng = random.Random()
+                rng.setstate((state[0], tuple(state[1]), state[2]))
+                return rng
+        sim.weather_rng = restore(snapshot["weather_rng"])
+        sim.rngs = [restore(s["rng"]) if s["rng"] is not None else None for s in segs]
+        return sim
+
+def encode_snapshot(snapshot: Dict[str, Any]) -> str:
+    """
+    Packs a snapshot into an opaque, URL-safe token for API clients.
+    """
+    raw = json.dumps(snapshot, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(zlib.compress(raw)).decode("ascii")
+
+def decode_snapshot(token: str) -> Dict[str, Any]:
+    """
+    Inverse of encode_snapshot. Raises ValueError on a malformed token.
+    """
+    try:
+        return json.loads(zlib.decompress(base64.urlsafe_b64decode(token.encode("ascii"))))
+    except (ValueError, zlib.error) as e:
+        raise ValueError(f"Invalid simulation state: {e}")
+
+def simulation_cache_key(segments: List[Dict[str, Any]], days: int, seed: int, block_length_m: float = 4.5, crew_size: int = 8, engine: str = 'python', mode: str = 'logs', **extra: Any) -> str:
+    """
+    Canonical hash identifying one simulation result, for use with
+    engine.cache.LRUCache. Includes today's date because logs are dated
+    from the day the simulation runs. Mode-specific parameters (e.g. runs
+    for an ensemble) go in `extra`.
+    """
+    return canonical_hash({
+        "segments": segments,
+        "days": days,
+        "seed": seed,
+        "block_length_m": block_length_m,
+        "crew_size": crew_size,
+        "engine": engine,
+        "mode": mode,
+        "start_date": datetime.date.today().isoformat(),
+        "extra": extra
+    })
+
+def simulate(segments: List[Dict[str, Any]], days: int = 10, seed: int = 42, block_length_m: float = 4.5, crew_size: int = 8, engine: str = 'python', return_state: bool = False) -> Union[List[Dict[str, Any]], Tuple[List[Dict[str, Any]], Dict[str, Any]]]:
     """
     Simulates construction progress for a list of segments.
-    
+
     Args:
         segments: List of segment dictionaries (must have 'segment_id' and 'length_m').
         days: Number of days to simulate.
         seed: Random seed for reproducibility.
         block_length_m: Length of a single block in meters.
         crew_size: Number of crew members.
-        
+        engine: 'python' (reference loop) or 'numpy' (vectorized, requires numpy).
+        return_state: Also return a snapshot that resume_simulation() can continue from.
+
     Returns:
-        List of shift_log entries matching the schema.
-    """
-    random.seed(seed)
-    
-    logs = []
-    start_date = datetime.date.today()
-    
-    # Initialize state for each segment
-    segment_states = {}
-    for seg in segments:
-        total_blocks = seg['length_m'] / block_length_m
-        segment_states[seg['segment_id']] = {
-            'cumulative_blocks': 0.0,
-            'blocks_total': total_blocks,
-            'completed': False
-        }
-        
-    for day in range(days):
-        current_date = start_date + datetime.timedelta(days=day)
-        date_str = current_date.isoformat()
-        
-        # Simple weather simulation
-        weather = random.choice(['clear', 'clear', 'clear', 'cloudy', 'rain'])
-        
-        # Productivity factor based on weather
-        weather_factor = 1.0
-        if weather == 'rain':
-            weather_factor = 0.5
-        elif weather == 'cloudy':
-            weather_factor = 0.9
-            
-        # Base productivity: 0.1 blocks per person per day (calibration point)
-        # So 8 people = 0.8 blocks/day base
-        base_productivity = 0.1 * crew_size
-        
-        for seg in segments:
-            seg_id = seg['segment_id']
-            state = segment_states[seg_id]
-            
-            if state['completed']:
-                continue
-                
-            # Calculate potential output for this shift
-            # Add some random variance (+/- 20%)
-            variance = random.uniform(0.8, 1.2)
-            daily_potential = base_productivity * weather_factor * variance
-            
-            # Cap at remaining blocks
-            remaining = state['blocks_total'] - state['cumulative_blocks']
-            
-            if daily_potential >= remaining:
-                shift_output = remaining
-                state['cumulative_blocks'] = state['blocks_total']
-                state['completed'] = True
-                remaining_after = 0.0
-            else:
-                shift_output = daily_potential
-                state['cumulative_blocks'] += shift_output
-                remaining_after = state['blocks_total'] - state['cumulative_blocks']
-                
-            # Create log entry
-            log_entry = {
-                "date": date_str,
-                "segment_id": seg_id,
-                "shift_output_blocks": round(shift_output, 4),
-                "cumulative_blocks": round(state['cumulative_blocks'], 4),
-                "remaining_blocks": round(remaining_after, 4),
-                "crew_size": crew_size,
-                "weather": weather
-            }
-            logs.append(log_entry)
-            
+        List of shift_log entries matching the schema, or (logs, snapshot)
+        when return_state is True.
+    """
+    sim = Simulation(segments, seed=seed, block_length_m=block_length_m, crew_size=crew_size, engine=engine)
+    logs = list(sim.advance(days))
+    if return_state:
+        return logs, sim.snapshot()
     return logs
+
+def iter_simulate(segments: List[Dict[str, Any]], days: int = 10, seed: int = 42, block_length_m: float = 4.5, crew_size: int = 8, engine: str = 'python') -> Iterator[Dict[str, Any]]:
+    """
+    Lazy variant of simulate(): yields shift_log entries day by day.
+
+    With the python engine only per-segment state is held, so memory is
+    O(segments) regardless of the horizon. No global random state is used:
+    weather and every segment draw from their own streams derived from
+    `seed` (see stream_seed), so simulations can be interleaved or run on
+    other threads, and a segment's trajectory does not depend on which
+    other segments are simulated alongside it.
+
+    Yields:
+        shift_log entries in the same order as simulate().
+    """
+    sim = Simulation(segments, seed=seed, block_length_m=block_length_m, crew_size=crew_size, engine=engine)
+    yield from sim.advance(days)
+
+def simulate_summary(segments: List[Dict[str, Any]], days: int = 10, seed: int = 42, block_length_m: float = 4.5, crew_size: int = 8, engine: str = 'python', return_state: bool = False) -> Union[List[Dict[str, Any]], Tuple[List[Dict[str, Any]], Dict[str, Any]]]:
+    """
+    Summary-only simulation: tracks per-segment state and never builds or
+    rounds per-shift log entries.
+
+    Draws the same random streams as simulate() with the same engine, so
+    the figures match the logs simulate() would have produced.
+
+    Args:
+        segments: List of segment dictionaries (must have 'segment_id' and 'length_m').
+        days: Number of days to simulate.
+        seed: Random seed for reproducibility.
+        block_length_m: Length of a single block in meters.
+        crew_size: Number of crew members.
+        engine: 'python' or 'numpy'.
+        return_state: Also return a snapshot that resume_simulation() can continue from.
+
+    Returns:
+        One entry per segment with 'completion_day' (1-based, None if not
+        completed within `days`), 'completion_date', 'shifts' (number of logs
+        simulate() would emit), 'cumulative_blocks', 'remaining_blocks',
+        'blocks_total' and 'rain_days' (rainy shifts worked). With
+        return_state, a (summaries, snapshot) tuple.
+    """
+    sim = Simulation(segments, seed=seed, block_length_m=block_length_m, crew_size=crew_size, engine=engine)
+    sim.skip(days)
+    if return_state:
+        return sim.summary(), sim.snapshot()
+    return sim.summary()
+
+def resume_simulation(snapshot: Dict[str, Any], days: int, summary: bool = False) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Continues a run from a snapshot for `days` more days.
+
+    Only the new days are simulated, and the result is identical to what a
+    from-scratch run over the longer horizon produces for those days.
+
+    Args:
+        snapshot: State returned by simulate(..., return_state=True) or a previous resume.
+        days: Additional days to simulate.
+        summary: Return per-segment summaries (covering the whole run so far)
+            instead of the new shift logs.
+
+    Returns:
+        (new logs or summaries, updated snapshot)
+    """
+    sim = Simulation.from_snapshot(snapshot)
+    if summary:
+        sim.skip(days)
+        return sim.summary(), sim.snapshot()
+    logs = list(sim.advance(days))
+    return logs, sim.snapshot()
@@ -0,0 +1,124 @@
+import os
+import math
+import datetime
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Sequence
+
+from engine.generator.generator import Simulation, simulate_summary, ENGINES
+
+SWEEP_COLUMNS = ["crew_size", "block_length_m", "completion_day", "completion_date",
+                 "mean_completion_day", "segments_completed", "blocks_total", "crew_days"]
+
+def _row(crew_size: int, block_length_m: float, days: int, blocks_total: float, completion_days: List[Optional[int]]) -> List[Any]:
+    """
+    One table row from per-segment completion days (None = not completed).
+    """
+    completed = [d for d in completion_days if d is not None]
+    project_day = max(completed) if completed and len(completed) == len(completion_days) else None
+    start_date = datetime.date.today()
+    # A segment works every day until it completes (or the horizon ends)
+    shifts = sum(d if d is not None else days for d in completion_days)
+    return [
+        crew_size,
+        block_length_m,
+        project_day,
+        (start_date + datetime.timedelta(days=project_day - 1)).isoformat() if project_day else None,
+        round(sum(completed) / len(completed), 4) if completed else None,
+        len(completed),
+        round(blocks_total, 4),
+        crew_size * shifts
+    ]
+
+def _summary_row(segments, days, seed, crew_size, block_length_m, engine) -> List[Any]:
+    # Worker entry point for the python engine
+    summary = simulate_summary(segments, days=days, seed=seed, block_length_m=block_length_m, crew_size=crew_size, engine=engine)
+    return _row(crew_size, block_length_m, days, sum(s['blocks_total'] for s in summary), [s['completion_day'] for s in summary])
+
+def _sweep_numpy(segments, days, seed, crew_sizes, block_lengths) -> List[List[Any]]:
+    import numpy as np
+    from engine.generator.vectorized import draw
+
+    # Weather and variance do not depend on crew size or block length, so
+    # one draw serves the whole grid (common random numbers)
+    sim = Simulation(segments, seed=seed, engine='numpy')
+    _, factors, variance = draw(sim, days)
+    lengths = np.array([seg['length_m'] for seg in segments], dtype=float)
+
+    rows = []
+    for crew_size in crew_sizes:
+        # Same expression as the numpy engine, so results match simulate_summary exactly
+        raw_cumulative = np.cumsum(0.1 * crew_size * factors[:, None] * variance, axis=0)
+        for block_length_m in block_lengths:
+            totals = lengths / block_length_m
+            # Output is strictly increasing, so the days still short of the
+            # total are exactly the days before completion
+            short_days = (raw_cumulative < totals).sum(axis=0).tolist()
+            completion_days = [d + 1 if d < days else None for d in short_days]
+            rows.append(_row(crew_size, block_length_m, days, float(totals.sum()), completion_days))
+    return rows
+
+def simulate_sweep(segments: List[Dict[str, Any]], days: int = 10, seed: int = 42, crew_sizes: Sequence[int] = (8,), block_lengths: Sequence[float] = (4.5,), engine: Optional[str] = None, workers: Optional[int] = None, executor: Optional[Executor] = None) -> Dict[str, Any]:
+    """
+    Evaluates every (crew_size, block_length_m) combination and returns a
+    compact table of completion metrics.
+
+    With the numpy engine the whole grid is computed from a single draw of
+    weather and variance. With the python engine each combination runs
+    simulate_summary on a process pool. Either way each row matches what
+    simulate_summary reports for that combination and engine.
+
+    Args:
+        segments: List of segment dictionaries (must have 'segment_id' and 'length_m').
+        days: Number of days to simulate.
+        seed: Random seed for reproducibility.
+        crew_sizes: Crew sizes to evaluate.
+        block_lengths: Block lengths in meters to evaluate.
+        engine: 'numpy' or 'python'. Defaults to numpy when it is installed.
+        workers: Process pool size for the python engine. Defaults to all cores.
+        executor: Existing pool to run python combinations on instead of
+            starting one (e.g. the API's shared CPU pool).
+
+    Returns:
+        {"columns": SWEEP_COLUMNS, "rows": [...], "engine": ...} with one
+        row per combination, crew size major, and the engine that produced
+        it. completion_day is the day the last segment completes, or None
+        if any segment is unfinished.
+
+    Raises:
+        ValueError: If the engine is unknown or a grid value is not a
+            positive number (crew sizes must be integers).
+    """
+    if engine is None:
+        try:
+            import numpy
+            engine = 'numpy'
+        except ImportError:
+            engine = 'python'
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown simulation engine '{engine}' (expected one of {', '.join(ENGINES)})")
+    if not crew_sizes or not block_lengths:
+        raise ValueError("crew_sizes and block_lengths must not be empty")
+    # Checked here, before any worker starts, so bad input is a ValueError
+    # rather than a TypeError from inside the pool
+    if not all(isinstance(c, int) and not isinstance(c, bool) and c > 0 for c in crew_sizes):
+        raise ValueError("crew_sizes must be positive integers")
+    if not all(isinstance(b, (int, float)) and not isinstance(b, bool) and math.isfinite(b) and b > 0 for b in block_lengths):
+        raise ValueError("block_lengths must be positive numbers")
+
+    if engine == 'numpy' and days > 0 and segments:
+        rows = _sweep_numpy(segments, days, seed, crew_sizes, block_lengths)
+    else:
+        combos = [(c, b) for c in crew_sizes for b in block_lengths]
+        workers = min(workers or os.cpu_count() or 1, len(combos))
+        if workers == 1 and executor is None:
+            rows = [_summary_row(segments, days, seed, c, b, engine) for c, b in combos]
+        else:
+            pool = executor or ProcessPoolExecutor(max_workers=workers)
+            try:
+                futures = [pool.submit(_summary_row, segments, days, seed, c, b, engine) for c, b in combos]
+                rows = [future.result() for future in futures]
+            finally:
+                if executor is None:
+                    pool.shutdown()
+
+    return {"columns": SWEEP_COLUMNS, "rows": rows, "engine": engine}
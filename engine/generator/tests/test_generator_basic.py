@@ -5,7 +5,16 @@ import os
 # Add project root to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
 
-from engine.generator.generator import simulate
+from engine.generator.generator import simulate, iter_simulate, simulate_summary, resume_simulation, encode_snapshot, decode_snapshot
+from engine.generator.ensemble import simulate_ensemble
+from engine.generator.sharded import simulate_sharded
+from engine.generator.sweep import simulate_sweep
+
+try:
+    import numpy
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
 
 class TestGeneratorBasic(unittest.TestCase):
     def test_simple_completion(self):
@@ -35,5 +44,128 @@ class TestGeneratorBasic(unittest.TestCase):
             self.assertLessEqual(log['cumulative_blocks'], 2.0001, 
                                  "Should never exceed total blocks")
 
+    @unittest.skipUnless(HAS_NUMPY, "numpy not installed")
+    def test_numpy_engine_matches_python_engine(self):
+        segments = [{"segment_id": f"seg-{i}", "length_m": 9.0 + i, "width_m": 5.0} for i in range(20)]
+        
+        py_logs = simulate(segments, days=15, seed=7, engine='python')
+        np_logs = simulate(segments, days=15, seed=7, engine='numpy')
+        
+        # Same schema and same day-major ordering
+        self.assertEqual(set(py_logs[0].keys()), set(np_logs[0].keys()))
+        self.assertEqual(np_logs[0]['segment_id'], "seg-0")
+        
+        # Every segment completes exactly at its total
+        for seg in segments:
+            seg_logs = [l for l in np_logs if l['segment_id'] == seg['segment_id']]
+            self.assertAlmostEqual(seg_logs[-1]['cumulative_blocks'], seg['length_m'] / 4.5, places=3)
+            self.assertEqual(seg_logs[-1]['remaining_blocks'], 0.0)
+        
+        # Statistically equivalent: similar number of shifts to finish, averaged over seeds
+        py_total = sum(len(simulate(segments, days=15, seed=s, engine='python')) for s in range(30))
+        np_total = sum(len(simulate(segments, days=15, seed=s, engine='numpy')) for s in range(30))
+        self.assertAlmostEqual(np_total / py_total, 1.0, delta=0.1)
+
+    def test_segment_streams_are_order_independent(self):
+        segments = [{"segment_id": f"seg-{i}", "length_m": 20.0 + i} for i in range(6)]
+        engines = ['python', 'numpy'] if HAS_NUMPY else ['python']
+        
+        for engine in engines:
+            full = simulate(segments, days=30, seed=11, engine=engine)
+            alone = simulate([segments[3]], days=30, seed=11, engine=engine)
+            self.assertEqual([l for l in full if l['segment_id'] == "seg-3"], alone)
+            
+            reversed_logs = simulate(list(reversed(segments)), days=30, seed=11, engine=engine)
+            key = lambda l: (l['date'], l['segment_id'])
+            self.assertEqual(sorted(full, key=key), sorted(reversed_logs, key=key))
+
+    def test_sharded_matches_single_process(self):
+        segments = [{"segment_id": f"seg-{i}", "length_m": 10.0 + 3 * i} for i in range(7)]
+        
+        self.assertEqual(simulate_sharded(segments, days=20, seed=4, workers=3),
+                         simulate(segments, days=20, seed=4))
+        self.assertEqual(simulate_sharded(segments, days=20, seed=4, workers=3, summary=True),
+                         simulate_summary(segments, days=20, seed=4))
+
+    def test_resume_matches_full_run(self):
+        segments = [{"segment_id": f"seg-{i}", "length_m": 30.0 + 7 * i} for i in range(5)]
+        engines = ['python', 'numpy'] if HAS_NUMPY else ['python']
+        
+        for engine in engines:
+            full = simulate(segments, days=60, seed=9, engine=engine)
+            first, state = simulate(segments, days=25, seed=9, engine=engine, return_state=True)
+            
+            # Round-trip through the opaque token the API hands out
+            state = decode_snapshot(encode_snapshot(state))
+            second, state = resume_simulation(state, days=35)
+            self.assertEqual(first + second, full, f"{engine} resume should match a from-scratch run")
+            
+            summary, _ = resume_simulation(simulate(segments, days=25, seed=9, engine=engine, return_state=True)[1], days=35, summary=True)
+            self.assertEqual(summary, simulate_summary(segments, days=60, seed=9, engine=engine))
+
+    def test_sweep_matches_summary(self):
+        segments = [{"segment_id": f"seg-{i}", "length_m": 20.0 + 9 * i} for i in range(4)]
+        engines = ['python', 'numpy'] if HAS_NUMPY else ['python']
+        
+        for engine in engines:
+            table = simulate_sweep(segments, days=40, seed=2, crew_sizes=[4, 8], block_lengths=[3.0, 4.5], engine=engine, workers=1)
+            self.assertEqual(len(table["rows"]), 4)
+            
+            for row in table["rows"]:
+                row = dict(zip(table["columns"], row))
+                summary = simulate_summary(segments, days=40, seed=2, crew_size=row["crew_size"],
+                                           block_length_m=row["block_length_m"], engine=engine)
+                days = [s['completion_day'] for s in summary]
+                self.assertEqual(row["segments_completed"], sum(d is not None for d in days))
+                self.assertEqual(row["completion_day"], max(days) if None not in days else None)
+                self.assertEqual(row["crew_days"], row["crew_size"] * sum(s['shifts'] for s in summary))
+
+    def test_iter_simulate_is_lazy(self):
+        segments = [{"segment_id": "lazy", "length_m": 900.0}]
+        stream = iter_simulate(segments, days=100, seed=5)
+        
+        first = next(stream)
+        self.assertEqual(first, simulate(segments, days=100, seed=5)[0])
+        self.assertEqual(len(list(stream)), 99)
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            simulate([{"segment_id": "s", "length_m": 9.0}], engine='fortran')
+
+    def test_summary_matches_simulate(self):
+        segments = [{"segment_id": "a", "length_m": 9.0}, {"segment_id": "b", "length_m": 40.0}]
+        engines = ['python', 'numpy'] if HAS_NUMPY else ['python']
+        
+        for engine in engines:
+            logs = simulate(segments, days=10, seed=3, engine=engine)
+            summary = simulate_summary(segments, days=10, seed=3, engine=engine)
+            
+            for seg, seg_summary in zip(segments, summary):
+                seg_logs = [l for l in logs if l['segment_id'] == seg['segment_id']]
+                last = seg_logs[-1]
+                
+                self.assertEqual(seg_summary['shifts'], len(seg_logs))
+                self.assertEqual(seg_summary['rain_days'], sum(1 for l in seg_logs if l['weather'] == 'rain'))
+                self.assertAlmostEqual(seg_summary['cumulative_blocks'], last['cumulative_blocks'], places=4)
+                if last['remaining_blocks'] == 0.0:
+                    self.assertEqual(seg_summary['completion_day'], len(seg_logs))
+                    self.assertEqual(seg_summary['completion_date'], last['date'])
+                else:
+                    self.assertIsNone(seg_summary['completion_day'])
+
+    def test_ensemble_percentiles(self):
+        segments = [{"segment_id": "ens-seg", "length_m": 18.0}]
+        
+        inline = simulate_ensemble(segments, days=20, runs=200, seed=1, workers=1)
+        pooled = simulate_ensemble(segments, days=20, runs=200, seed=1, workers=2)
+        self.assertEqual(inline, pooled, "Pool fan-out must not change the aggregate")
+        
+        result = inline[0]
+        self.assertEqual(result['runs'], 200)
+        self.assertEqual(sum(result['histogram']), result['completed_runs'])
+        p = result['percentiles']
+        self.assertLessEqual(p['p50']['day'], p['p80']['day'])
+        self.assertLessEqual(p['p80']['day'], p['p95']['day'])
+
 if __name__ == '__main__':
     unittest.main()
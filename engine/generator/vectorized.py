@@ -0,0 +1,120 @@
+import datetime
+from typing import Dict, Any, Iterator
+
+import numpy as np
+
+# Same distribution as random.choice(['clear', 'clear', 'clear', 'cloudy', 'rain'])
+WEATHER_CHOICES = ['clear', 'clear', 'clear', 'cloudy', 'rain']
+WEATHER_FACTORS = {'clear': 1.0, 'cloudy': 0.9, 'rain': 0.5}
+
+def new_generator(seed: int) -> np.random.Generator:
+    return np.random.Generator(np.random.PCG64(seed))
+
+def generator_from_state(state: Dict[str, Any]) -> np.random.Generator:
+    bit_generator = np.random.PCG64()
+    bit_generator.state = state
+    return np.random.Generator(bit_generator)
+
+def draw(sim, days: int):
+    """
+    Draws the next `days` days from a Simulation's streams and returns
+    (weather index per day, weather factor per day, days x segments variance).
+    """
+    # One weather draw per day, shared by all segments
+    weather_idx = (sim.weather_rng.random(days) * len(WEATHER_CHOICES)).astype(np.intp)
+    factors = np.array([WEATHER_FACTORS[w] for w in WEATHER_CHOICES])[weather_idx]
+
+    # One call per segment stream, covering the whole horizon. The streams
+    # stay separate so a segment's draws do not depend on the portfolio.
+    variance = np.empty((days, len(sim.rngs)))
+    for i, rng in enumerate(sim.rngs):
+        variance[:, i] = rng.uniform(0.8, 1.2, size=days)
+
+    return weather_idx, factors, variance
+
+def advance_numpy(sim, days: int, emit: bool = True) -> Iterator[Dict[str, Any]]:
+    """
+    NumPy engine for generator.Simulation.advance/skip.
+
+    Weather and variance for the next `days` days are drawn as arrays and
+    progress is computed as a cumulative sum across the whole days x segments
+    matrix, capped at each segment's total. Every segment draws one variance
+    per day for the full horizon, even after completing, so the streams stay
+    aligned and resuming reproduces a single long run exactly. The random
+    numbers differ from the Python engine, so for a fixed seed the output is
+    statistically equivalent rather than identical.
+
+    Yields:
+        shift_log entries (only when `emit` is True), in the same day-major
+        order as the Python engine. The state is updated before the first
+        entry is yielded.
+    """
+    if days <= 0:
+        return
+    first_day = sim.day
+    sim.day += days
+    if not sim.segment_ids:
+        # Keep the weather stream aligned with a run that has segments
+        sim.weather_rng.random(days)
+        return
+
+    totals = np.array(sim.totals)
+    previous_cumulative = np.array(sim.cumulative)
+    previously_done = np.array([d is not None for d in sim.completion_day])
+
+    weather_idx, factors, variance = draw(sim, days)
+    rainy = np.array([w == 'rain' for w in WEATHER_CHOICES])[weather_idx]
+
+    # Base productivity: 0.1 blocks per person per day (calibration point)
+    potential = 0.1 * sim.crew_size * factors[:, None] * variance
+
+    # Seeding the first row (rather than adding afterwards) keeps the float
+    # summation order identical to one uninterrupted cumulative sum
+    potential[0] += previous_cumulative
+    raw_cumulative = np.cumsum(potential, axis=0)
+
+    # Capped cumulative sum: a segment stops at its total and is then inactive
+    done = raw_cumulative >= totals
+    cumulative = np.minimum(raw_cumulative, totals)
+    active = np.empty_like(done)
+    active[0] = ~previously_done
+    active[1:] = ~done[:-1]
+
+    newly_done = done[-1] & ~previously_done
+    first_done = np.argmax(done, axis=0)
+    for i in np.nonzero(newly_done)[0].tolist():
+        sim.completion_day[i] = first_day + int(first_done[i]) + 1
+    sim.cumulative = cumulative[-1].tolist()
+    sim.shifts = (np.array(sim.shifts) + active.sum(axis=0)).tolist()
+    sim.rain_days = (np.array(sim.rain_days) + (active & rainy[:, None]).sum(axis=0)).tolist()
+
+    if not emit:
+        return
+
+    previous = np.empty_like(cumulative)
+    previous[0] = np.minimum(previous_cumulative, totals)
+    previous[1:] = cumulative[:-1]
+    shift_output = np.round(cumulative - previous, 4)
+    remaining = np.round(np.where(done, 0.0, totals - cumulative), 4)
+    cumulative = np.round(cumulative, 4)
+
+    # np.nonzero walks the matrix row-major, i.e. day by day
+    day_idx, seg_idx = np.nonzero(active)
+    date_strs = [(sim.start_date + datetime.timedelta(days=first_day + d)).isoformat() for d in range(days)]
+    weather_list = np.array(WEATHER_CHOICES)[weather_idx].tolist()
+    seg_ids = sim.segment_ids
+    crew_size = sim.crew_size
+
+    for d, s, out, cum, rem in zip(day_idx.tolist(), seg_idx.tolist(),
+                                   shift_output[day_idx, seg_idx].tolist(),
+                                   cumulative[day_idx, seg_idx].tolist(),
+                                   remaining[day_idx, seg_idx].tolist()):
+        yield {
+            "date": date_strs[d],
+            "segment_id": seg_ids[s],
+            "shift_output_blocks": out,
+            "cumulative_blocks": cum,
+            "remaining_blocks": rem,
+            "crew_size": crew_size,
+            "weather": weather_list[d]
+        }
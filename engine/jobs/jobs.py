@@ -0,0 +1,232 @@
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+JOB_STATUSES = ("queued", "running", "done", "failed")
+
+# Idle workers also re-check the database this often, to pick up jobs
+# submitted by another process sharing the file
+POLL_INTERVAL_S = 5.0
+
+# A running job is leased to the queue that claimed it. The owner renews
+# the lease while the job runs; once it expires (the owner crashed or was
+# killed), any queue sharing the file may run the job again.
+LEASE_S = 30.0
+
+# Runs a job may start before it is failed instead of re-run, so a payload
+# that crashes its worker cannot loop forever
+MAX_ATTEMPTS = 3
+
+# Statuses a claim may take over: queued, or running under an expired lease
+_CLAIMABLE = "(status = 'queued' OR (status = 'running' AND (lease_expires IS NULL OR lease_expires < ?)))"
+
+class QueueFullError(Exception):
+    """Raised by JobQueue.submit when max_queued jobs are already waiting."""
+
+class JobQueue:
+    """
+    Durable background job queue backed by a SQLite file.
+
+    Jobs are JSON payloads processed in submission order by a bounded pool
+    of worker threads that call `handler(payload)`; the handler's JSON
+    result (or its error) is stored with the job. Because every state
+    change is written to SQLite, queued jobs survive a restart.
+
+    Running jobs hold a lease (owner and expiry) that a heartbeat thread
+    renews every lease_s / 3 seconds. Jobs whose lease expired, because
+    the process running them died, are run again by whichever queue
+    sharing the file claims them next, up to max_attempts runs in all.
+    """
+
+    def __init__(self, db_path: str, handler: Callable[[Dict[str, Any]], Dict[str, Any]], workers: int = 2, max_queued: Optional[int] = None,
+                 lease_s: float = LEASE_S, max_attempts: int = MAX_ATTEMPTS):
+        self.db_path = db_path
+        self.handler = handler
+        self.workers = workers
+        self.max_queued = max_queued
+        self.lease_s = lease_s
+        self.max_attempts = max_attempts
+        self.owner: Optional[str] = None
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+        self._heartbeat_stop = threading.Event()
+
+    # Storage (caller holds the lock)
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    payload TEXT,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    owner TEXT,
+                    lease_expires REAL
+                )""")
+            # Databases created before leases were added
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, column_type in (("owner", "TEXT"), ("lease_expires", "REAL")):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            self._conn = conn
+        return self._conn
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        while True:
+            now = time.time()
+            row = self._db().execute(
+                f"SELECT job_id, payload, attempts FROM jobs WHERE {_CLAIMABLE} ORDER BY created_at, rowid LIMIT 1", (now,)).fetchone()
+            if row is None:
+                return None
+            if row["attempts"] >= self.max_attempts:
+                # Every earlier run was interrupted; give up rather than crash again
+                self._db().execute(
+                    f"UPDATE jobs SET status = 'failed', error = ?, payload = NULL, owner = NULL, lease_expires = NULL, finished_at = ? WHERE job_id = ? AND {_CLAIMABLE}",
+                    (f"Interrupted {row['attempts']} times; not retried", now, row["job_id"], now))
+                continue
+            # Conditional update, so another process sharing the file cannot claim it too
+            claimed = self._db().execute(
+                f"UPDATE jobs SET status = 'running', started_at = ?, attempts = attempts + 1, owner = ?, lease_expires = ? WHERE job_id = ? AND {_CLAIMABLE}",
+                (now, self.owner, now + self.lease_s, row["job_id"], now)).rowcount
+            if claimed:
+                return row
+
+    # Public API
+
+    def start(self) -> None:
+        """
+        Starts the worker threads and the lease heartbeat (idempotent).
+        Jobs left running by a process that has stopped are picked up once
+        their lease expires.
+        """
+        with self._lock:
+            if self._threads:
+                return
+            self._db()
+            # Unique per start, so a restarted queue never renews an old lease
+            self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+            self._stopping = False
+            self._heartbeat_stop.clear()
+            self._threads = [threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True) for i in range(self.workers)]
+            self._threads.append(threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stops the workers after their current job and closes the database.
+        Jobs still queued stay queued for the next start().
+        """
+        with self._lock:
+            self._stopping = True
+            self._wakeup.notify_all()
+            self._heartbeat_stop.set()
+            threads, self._threads = self._threads, []
+        for thread in threads:
+            thread.join(timeout)
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def submit(self, payload: Dict[str, Any]) -> str:
+        """
+        Queues a job and returns its id.
+
+        Raises:
+            QueueFullError: If max_queued jobs are already waiting.
+        """
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            db = self._db()
+            if self.max_queued is not None:
+                queued = db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+                if queued >= self.max_queued:
+                    raise QueueFullError(f"{queued} jobs already queued")
+            db.execute("INSERT INTO jobs (job_id, status, payload, created_at) VALUES (?, 'queued', ?, ?)",
+                       (job_id, json.dumps(payload), time.time()))
+            self._wakeup.notify()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns a job's status record, or None if the id is unknown. The
+        record has job_id, status, attempts and timestamps, plus `result`
+        when done or `error` when failed.
+        """
+        with self._lock:
+            row = self._db().execute(
+                "SELECT job_id, status, result, error, attempts, created_at, started_at, finished_at FROM jobs WHERE job_id = ?",
+                (job_id,)).fetchone()
+            if row is not None and row["status"] == "queued":
+                position = self._db().execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created_at <= ?", (row["created_at"],)).fetchone()[0]
+        if row is None:
+            return None
+
+        job = {key: row[key] for key in ("job_id", "status", "attempts", "created_at", "started_at", "finished_at")}
+        if row["status"] == "queued":
+            job["queue_position"] = position
+        if row["result"] is not None:
+            job["result"] = json.loads(row["result"])
+        if row["error"] is not None:
+            job["error"] = row["error"]
+        return job
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counts = dict(self._db().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {status: counts.get(status, 0) for status in JOB_STATUSES}
+
+    # Workers
+
+    def _heartbeat(self) -> None:
+        while not self._heartbeat_stop.wait(self.lease_s / 3):
+            with self._lock:
+                self._db().execute("UPDATE jobs SET lease_expires = ? WHERE owner = ? AND status = 'running'",
+                                   (time.time() + self.lease_s, self.owner))
+
+    def _work(self) -> None:
+        while True:
+            with self._lock:
+                row = None
+                while not self._stopping:
+                    row = self._claim()
+                    if row is not None:
+                        break
+                    self._wakeup.wait(POLL_INTERVAL_S)
+                if row is None:
+                    return
+
+            try:
+                result, error, status = json.dumps(self.handler(json.loads(row["payload"]))), None, "done"
+            except Exception as e:
+                result, error, status = None, str(e), "failed"
+
+            with self._lock:
+                # Payloads can be large (photos); drop them once the job is
+                # finished. Skipped if the lease was lost and the job taken over.
+                self._db().execute(
+                    "UPDATE jobs SET status = ?, result = ?, error = ?, payload = NULL, owner = NULL, lease_expires = NULL, finished_at = ? "
+                    "WHERE job_id = ? AND owner = ? AND status = 'running'",
+                    (status, result, error, time.time(), row["job_id"], self.owner))
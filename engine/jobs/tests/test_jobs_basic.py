@@ -0,0 +1,113 @@
+import unittest
+import sys
+import os
+import time
+import shutil
+import sqlite3
+import threading
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from engine.jobs.jobs import JobQueue, QueueFullError
+
+def wait_for(queue, job_id, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+class TestJobsBasic(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = os.path.join(os.path.dirname(__file__), 'test_output')
+        self.db_path = os.path.join(self.test_dir, 'jobs.sqlite3')
+        
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_jobs_run_and_report_results(self):
+        def handler(payload):
+            if payload.get("fail"):
+                raise ValueError("bad payload")
+            return {"doubled": payload["n"] * 2}
+        
+        queue = JobQueue(self.db_path, handler, workers=2)
+        queue.start()
+        try:
+            ok = queue.submit({"n": 21})
+            bad = queue.submit({"fail": True})
+            self.assertEqual(wait_for(queue, ok)["result"], {"doubled": 42})
+            failed = wait_for(queue, bad)
+            self.assertEqual(failed["status"], "failed")
+            self.assertEqual(failed["error"], "bad payload")
+            self.assertIsNone(queue.get("no-such-job"))
+            self.assertEqual(queue.stats()["done"], 1)
+        finally:
+            queue.stop()
+
+    def test_jobs_survive_restart(self):
+        # First process queues two jobs and dies with one of them mid-run
+        queue = JobQueue(self.db_path, lambda payload: payload, workers=1, max_queued=2)
+        interrupted = queue.submit({"n": 1})
+        waiting = queue.submit({"n": 2})
+        self.assertEqual(queue.get(waiting)["queue_position"], 2)
+        with self.assertRaises(QueueFullError):
+            queue.submit({"n": 3})
+        queue.stop()
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("UPDATE jobs SET status = 'running', attempts = 1 WHERE job_id = ?", (interrupted,))
+        
+        restarted = JobQueue(self.db_path, lambda payload: {"n": payload["n"], "resumed": True}, workers=1)
+        restarted.start()
+        try:
+            for job_id, n in ((interrupted, 1), (waiting, 2)):
+                job = wait_for(restarted, job_id)
+                self.assertEqual(job["status"], "done")
+                self.assertEqual(job["result"], {"n": n, "resumed": True})
+            self.assertEqual(restarted.get(interrupted)["attempts"], 2)
+        finally:
+            restarted.stop()
+
+    def test_leases_prevent_double_runs_and_attempts_are_capped(self):
+        release = threading.Event()
+        first = JobQueue(self.db_path, lambda payload: release.wait(10) and {"run_by": "first"}, workers=1, lease_s=0.3)
+        first.start()
+        second_payloads = []
+        second = JobQueue(self.db_path, lambda payload: second_payloads.append(payload) or {"run_by": "second"}, workers=1, lease_s=0.3)
+        try:
+            long_job = first.submit({"n": 1})
+            deadline = time.time() + 5
+            while first.get(long_job)["status"] != "running" and time.time() < deadline:
+                time.sleep(0.01)
+            # Another process starting up leaves a job with a live lease alone,
+            # even after several lease periods
+            second.start()
+            time.sleep(1.0)
+            other_job = second.submit({"n": 2})
+            self.assertEqual(wait_for(second, other_job)["result"], {"run_by": "second"})
+            self.assertEqual(second_payloads, [{"n": 2}])
+            release.set()
+            self.assertEqual(wait_for(first, long_job)["result"], {"run_by": "first"})
+        finally:
+            release.set()
+            first.stop()
+            second.stop()
+        
+        # A job whose lease expired after max_attempts runs is failed, not run again
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("INSERT INTO jobs (job_id, status, payload, attempts, created_at, owner, lease_expires) VALUES ('crashy', 'running', '{}', 3, 0, 'gone:1:x', 0)")
+        restarted = JobQueue(self.db_path, lambda payload: self.fail("crashing job re-run"), workers=1, max_attempts=3)
+        restarted.start()
+        try:
+            job = wait_for(restarted, 'crashy')
+            self.assertEqual(job["status"], "failed")
+            self.assertIn("Interrupted 3 times", job["error"])
+        finally:
+            restarted.stop()
+
+if __name__ == '__main__':
+    unittest.main()
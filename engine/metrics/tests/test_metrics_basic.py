@@ -0,0 +1,49 @@
+import unittest
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from engine.metrics.metrics import Registry
+
+class TestMetricsBasic(unittest.TestCase):
+    def test_counters_and_histograms_render_as_prometheus_text(self):
+        registry = Registry()
+        requests = registry.counter("test_requests_total", "Requests", ("route",))
+        latency = registry.histogram("test_latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+        requests.inc(route="/a")
+        requests.inc(2, route='/b "quoted"')
+        for value in (0.05, 0.1, 0.5, 3.0):
+            latency.observe(value, route="/a")
+
+        text = registry.render()
+        self.assertIn("# TYPE test_requests_total counter\n", text)
+        self.assertIn('test_requests_total{route="/a"} 1.0\n', text)
+        self.assertIn('test_requests_total{route="/b \\"quoted\\""} 2.0\n', text)
+        # Buckets are cumulative and include their upper bound
+        self.assertIn('test_latency_seconds_bucket{route="/a",le="0.1"} 2.0\n', text)
+        self.assertIn('test_latency_seconds_bucket{route="/a",le="1.0"} 3.0\n', text)
+        self.assertIn('test_latency_seconds_bucket{route="/a",le="+Inf"} 4.0\n', text)
+        self.assertIn('test_latency_seconds_sum{route="/a"} 3.65\n', text)
+        self.assertIn('test_latency_seconds_count{route="/a"} 4.0\n', text)
+
+    def test_timer_collectors_and_label_checks(self):
+        registry = Registry()
+        stage = registry.histogram("test_stage_seconds", "Stages", ("stage",))
+        with self.assertRaises(RuntimeError):
+            with stage.time(stage="fails"):
+                raise RuntimeError("boom")
+        self.assertEqual(stage.count(stage="fails"), 1)
+
+        size = registry.gauge("test_size", "Size")
+        registry.on_collect(lambda: size.set(42))
+        self.assertIn("test_size 42.0\n", registry.render())
+
+        with self.assertRaises(ValueError):
+            stage.observe(1.0)
+        with self.assertRaises(ValueError):
+            registry.counter("test_stage_seconds", "Same name, other type")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+import os
+import json
+import zipfile
+import tempfile
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional, Callable, Iterator, Sequence
+
+from engine.provenance.provenance import save_provenance_pdf, hash_file, get_profile
+
+def reports_from_logs(shift_logs: List[Dict[str, Any]], group_by: Sequence[str] = ("date",), projects: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """
+    Splits a flat list of shift logs into one report spec per group, e.g.
+    per day or per day and segment for month-end statements.
+
+    Args:
+        shift_logs: List of shift_log entries.
+        group_by: Log fields to group on, in file-name order.
+        projects: Optional project records; each report gets the project
+            matching its logs' project_id.
+
+    Returns:
+        Report specs ({"output_name", "shift_logs", "project"}) sorted by
+        group, with logs in their original order within each group.
+    """
+    by_project = {p.get('project_id'): p for p in projects or []}
+    groups: Dict[tuple, List[Dict[str, Any]]] = {}
+    for log in shift_logs:
+        groups.setdefault(tuple(str(log.get(field, 'NA')) for field in group_by), []).append(log)
+
+    reports = []
+    for values in sorted(groups):
+        logs = groups[values]
+        reports.append({
+            "output_name": "provenance_" + "_".join(values) + ".pdf",
+            "shift_logs": logs,
+            "project": by_project.get(logs[0].get('project_id'))
+        })
+    return reports
+
+def validate_reports(reports: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Checks report specs and fills in default output names.
+
+    Raises:
+        ValueError: If there are no reports, a report has no shift_logs or
+            an unknown profile, or an output_name is a path or used twice.
+    """
+    if not reports:
+        raise ValueError("No reports provided")
+    specs = []
+    seen = set()
+    for i, report in enumerate(reports):
+        if not report.get('shift_logs'):
+            raise ValueError(f"Report {i} has no shift_logs")
+        output_name = report.get('output_name') or f"report_{i + 1:04d}.pdf"
+        if os.path.basename(output_name) != output_name:
+            raise ValueError(f"Report {i}: output_name must be a plain file name")
+        if output_name in seen:
+            raise ValueError(f"Duplicate output_name '{output_name}'")
+        seen.add(output_name)
+        try:
+            get_profile(report.get('profile'))
+        except ValueError as e:
+            raise ValueError(f"Report {i}: {e}")
+        specs.append({"output_name": output_name, "shift_logs": report['shift_logs'], "project": report.get('project'), "profile": report.get('profile')})
+    return specs
+
+def _render_report(index: int, spec: Dict[str, Any], output_dir: str) -> Dict[str, Any]:
+    """
+    Worker entry point: renders one report. Failures are recorded in the
+    manifest entry instead of aborting the batch.
+    """
+    output_path = os.path.join(output_dir, spec['output_name'])
+    entry = {"index": index, "output_name": spec['output_name']}
+    try:
+        # One photo thread per process; the batch is already parallel
+        entry["sha256"] = save_provenance_pdf(spec['shift_logs'], output_path, project=spec.get('project'), workers=1, profile=spec.get('profile'))
+        entry["size_bytes"] = os.path.getsize(output_path)
+    except Exception as e:
+        entry["error"] = str(e)
+    return entry
+
+def iter_render_batch(reports: List[Dict[str, Any]], output_dir: str, workers: Optional[int] = None, executor: Optional[Executor] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Renders reports on a process pool, yielding each manifest entry as soon
+    as its PDF is written (completion order; `index` is the input position).
+
+    Args:
+        reports: Report specs with 'shift_logs' and optional 'output_name',
+            'project' and 'profile'.
+        output_dir: Directory the PDFs are written to.
+        workers: Process pool size. Defaults to all cores; 1 runs inline.
+        executor: Existing pool to render on instead of starting one (e.g.
+            the API's shared CPU pool); workers is then ignored.
+    """
+    specs = validate_reports(reports)
+    os.makedirs(output_dir, exist_ok=True)
+    workers = min(workers or os.cpu_count() or 1, len(specs))
+
+    if workers == 1 and executor is None:
+        for i, spec in enumerate(specs):
+            yield _render_report(i, spec, output_dir)
+        return
+
+    pool = executor or ProcessPoolExecutor(max_workers=workers)
+    futures = []
+    try:
+        futures = [pool.submit(_render_report, i, spec, output_dir) for i, spec in enumerate(specs)]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        # A consumer that stops early leaves no queued reports behind
+        for future in futures:
+            future.cancel()
+        if executor is None:
+            pool.shutdown()
+
+def write_batch_zip(manifest: Dict[str, Any], output_dir: str, zip_path: str) -> str:
+    """
+    Bundles the rendered PDFs and a manifest.json into one zip, written
+    atomically. Returns the zip's SHA-256.
+    """
+    directory = os.path.dirname(zip_path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=".zip")
+    os.close(fd)
+    try:
+        # PDFs are already compressed; storing them keeps zipping cheap
+        with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_STORED) as archive:
+            for entry in manifest['reports']:
+                if 'sha256' in entry:
+                    archive.write(os.path.join(output_dir, entry['output_name']), arcname=entry['output_name'])
+            archive.writestr("manifest.json", json.dumps(manifest, indent=2))
+        os.replace(tmp_path, zip_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return hash_file(zip_path)
+
+def build_manifest(entries: List[Dict[str, Any]], output_dir: str, zip_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Manifest for rendered entries (in input order), writing the zip if
+    zip_path is given.
+    """
+    manifest: Dict[str, Any] = {
+        "reports": entries,
+        "total": len(entries),
+        "failed": sum(1 for entry in entries if 'error' in entry)
+    }
+    if zip_path:
+        manifest["zip"] = {"path": zip_path, "sha256": write_batch_zip(manifest, output_dir, zip_path)}
+    return manifest
+
+def render_batch(reports: List[Dict[str, Any]], output_dir: str, workers: Optional[int] = None, zip_path: Optional[str] = None, progress: Optional[Callable[[int, int, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """
+    Renders many provenance reports across a process pool.
+
+    Args:
+        reports: Report specs with 'shift_logs' and optional 'output_name',
+            'project' and 'profile' (see reports_from_logs).
+        output_dir: Directory the PDFs are written to.
+        workers: Process pool size. Defaults to all cores; 1 runs inline.
+        zip_path: If given, also bundle the PDFs and manifest into this zip.
+        progress: Optional callback(done, total, entry) after each report.
+
+    Returns:
+        Manifest: {"reports": [...], "total", "failed"} with one entry per
+        report in input order ({"output_name", "sha256", "size_bytes"}, or
+        {"output_name", "error"}), plus {"zip": {"path", "sha256"}} when
+        zip_path is given.
+    """
+    entries: List[Optional[Dict[str, Any]]] = [None] * len(reports)
+    for done, entry in enumerate(iter_render_batch(reports, output_dir, workers), 1):
+        entries[entry.pop('index')] = entry
+        if progress:
+            progress(done, len(reports), entry)
+    return build_manifest(entries, output_dir, zip_path)
@@ -0,0 +1,146 @@
+import os
+import time
+import hashlib
+from typing import List, Dict, Any, Optional, Tuple
+from fpdf import FPDF
+
+from engine.cache.cache import LRUCache, canonical_hash
+from engine.provenance.provenance import start_document, layout_log, prepare_photos, get_profile, hashable_logs, write_atomic, DEFAULT_PROFILE
+from engine.provenance.merge import merge_pdfs
+
+# Rendered day fragments: standalone PDFs holding one day's pages, keyed by
+# project, date, the day's logs and the output profile. Set
+# VERITAS_PAGE_CACHE_DIR to keep a disk tier across restarts.
+PAGE_CACHE = LRUCache(
+    max_entries=int(os.environ.get("VERITAS_PAGE_CACHE_ENTRIES", 4096)),
+    max_bytes=int(os.environ.get("VERITAS_PAGE_CACHE_MB", 256)) * 1024 * 1024,
+    sizeof=len,
+    disk_dir=os.environ.get("VERITAS_PAGE_CACHE_DIR") or None,
+    max_disk_bytes=int(os.environ.get("VERITAS_PAGE_CACHE_DISK_MB", 2048)) * 1024 * 1024
+)
+
+def group_by_day(shift_logs: List[Dict[str, Any]]) -> List[Tuple[str, List[Dict[str, Any]]]]:
+    """
+    Splits logs into (date, logs) pairs in date order, keeping the original
+    log order within each day.
+    """
+    days: Dict[str, List[Dict[str, Any]]] = {}
+    for log in shift_logs:
+        days.setdefault(str(log.get('date', 'N/A')), []).append(log)
+    return sorted(days.items())
+
+def day_cache_key(project: Optional[Dict[str, Any]], date: str, day_logs: List[Dict[str, Any]], profile: Optional[str] = None) -> str:
+    """
+    PAGE_CACHE key for one day's pages. Day pages do not show project
+    details, so only the project_id is part of the key.
+    """
+    return canonical_hash({
+        "project_id": (project or {}).get('project_id'),
+        "date": date,
+        "shift_logs": hashable_logs(day_logs),
+        "profile": get_profile(profile)
+    })
+
+def render_cover(project: Optional[Dict[str, Any]], days: List[Tuple[str, List[Dict[str, Any]]]]) -> bytes:
+    """
+    Title page of a cumulative report: project header, covered period and
+    one line per day. Text only, so it is rendered fresh every time.
+    """
+    pdf = start_document(project)
+    pdf.set_font("Arial", "B", 12)
+    pdf.cell(0, 8, "Cumulative Report", ln=True)
+    pdf.set_font("Arial", "", 12)
+    if days:
+        total = sum(len(day_logs) for _, day_logs in days)
+        pdf.cell(0, 8, f"Period: {days[0][0]} to {days[-1][0]} ({len(days)} days, {total} shift logs)", ln=True)
+    pdf.ln(2)
+    pdf.set_font("Arial", "", 10)
+    for date, day_logs in days:
+        pdf.cell(0, 6, f"{date}: {len(day_logs)} shift log(s)", ln=True)
+    return bytes(pdf.output())
+
+def render_day(date: str, day_logs: List[Dict[str, Any]], workers: Optional[int] = None, profile: Optional[str] = None, stats: Optional[Dict[str, Any]] = None) -> bytes:
+    """
+    Renders one day's logs as a standalone PDF fragment starting on a new
+    page, laid out like save_provenance_pdf. stats receives the
+    prepare_photos stats plus photos and photo_errors.
+    """
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", "B", 14)
+    pdf.cell(0, 10, f"Work Accomplished on {date}", ln=True)
+    pdf.ln(3)
+    photo_stats: Dict[str, Any] = {}
+    prepared = prepare_photos(day_logs, workers, stats=photo_stats, profile=profile)
+    photo_errors = 0
+    for log, image in zip(day_logs, prepared):
+        photo_errors += layout_log(pdf, log, image)
+    if stats is not None:
+        stats.update(photo_stats, photos=sum(1 for image in prepared if image is not None), photo_errors=photo_errors)
+    return bytes(pdf.output())
+
+def save_cumulative_pdf(shift_logs: List[Dict[str, Any]], output_path: str, project: Dict[str, Any] = None, workers: Optional[int] = None, stats: Optional[Dict[str, Any]] = None, profile: Optional[str] = None) -> str:
+    """
+    Creates a cumulative multi-day Statement of Work Accomplished and
+    returns its SHA-256.
+
+    Each day starts on a new page. Days are rendered once and kept in
+    PAGE_CACHE; the report is assembled by merging the cached day pages
+    behind a freshly rendered cover page. Regenerating a growing project
+    report therefore only renders new or changed days.
+
+    Args:
+        shift_logs: List of shift_log entries spanning any number of days.
+        output_path: Path where the PDF should be saved.
+        project: Optional dictionary containing project metadata.
+        workers: Photo prepare pool size. Defaults to PHOTO_WORKERS.
+        stats: Optional dict that receives days, days_rendered,
+            page_cache_hits, render_s, merge_s, the profile and pdf_bytes,
+            plus photo stats for the rendered days (photos, photo_errors,
+            unique_photos, photo_cache_hits, photo_bytes, decode_s,
+            resize_s).
+        profile: Output profile name. Defaults to DEFAULT_PROFILE.
+
+    Returns:
+        Hex string of the SHA-256 hash of the written PDF.
+
+    Raises:
+        ValueError: If the profile is unknown.
+    """
+    get_profile(profile) # fail before any work on an unknown profile
+    started = time.perf_counter()
+    days = group_by_day(shift_logs)
+
+    fragments = [render_cover(project, days)]
+    rendered = 0
+    # Photo stats summed over the days that were rendered
+    totals = dict.fromkeys(("photos", "photo_errors", "unique_photos", "photo_cache_hits", "photo_bytes", "decode_s", "resize_s"), 0)
+    for date, day_logs in days:
+        key = day_cache_key(project, date, day_logs, profile)
+        fragment = PAGE_CACHE.get(key)
+        if fragment is None:
+            day_stats: Dict[str, Any] = {}
+            fragment = render_day(date, day_logs, workers, profile, stats=day_stats)
+            PAGE_CACHE.put(key, fragment)
+            rendered += 1
+            for name in totals:
+                totals[name] += day_stats[name]
+        fragments.append(fragment)
+    rendered_at = time.perf_counter()
+
+    data = merge_pdfs(fragments)
+    file_hash = hashlib.sha256(data).hexdigest()
+    write_atomic(output_path, data)
+
+    if stats is not None:
+        stats.update({
+            "days": len(days),
+            "days_rendered": rendered,
+            "page_cache_hits": len(days) - rendered,
+            "render_s": round(rendered_at - started, 6),
+            "merge_s": round(time.perf_counter() - rendered_at, 6),
+            **{name: round(value, 6) if name.endswith("_s") else value for name, value in totals.items()},
+            "profile": profile or DEFAULT_PROFILE,
+            "pdf_bytes": len(data)
+        })
+    return file_hash
@@ -0,0 +1,284 @@
+import re
+import hashlib
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Merging of PDFs written by FPDF, used to assemble cumulative reports from
+# cached day pages and long streamed reports from per-window documents.
+
+_REF = re.compile(rb"(?<![\d.])(\d+) 0 R\b")
+_STREAM = re.compile(rb"\s*stream\r?\n")
+
+def _read_objects(data: bytes) -> Tuple[Dict[int, Tuple[bytes, Optional[bytes]]], bytes]:
+    """
+    Parses a PDF with a classic cross-reference table (as written by FPDF)
+    into {number: (dictionary, stream data or None)} plus its trailer.
+    """
+    xref_at = int(data[data.rindex(b"startxref") + 9:].split()[0])
+    if not data.startswith(b"xref", xref_at):
+        raise ValueError("Unsupported PDF: no classic cross-reference table")
+    trailer_at = data.index(b"trailer", xref_at)
+    lines = data[xref_at + 4:trailer_at].split(b"\n")
+
+    offsets: Dict[int, int] = {}
+    number = 0
+    for line in lines:
+        fields = line.split()
+        if len(fields) == 2:
+            number = int(fields[0])
+        elif len(fields) == 3:
+            if fields[2] == b"n":
+                offsets[number] = int(fields[0])
+            number += 1
+
+    objects: Dict[int, Tuple[bytes, Optional[bytes]]] = {}
+    bounds = sorted(offsets.values()) + [xref_at]
+    next_offset = dict(zip(bounds, bounds[1:]))
+    for number, start in offsets.items():
+        chunk = data[start:next_offset[start]]
+        body = chunk[chunk.index(b"obj") + 3:chunk.rindex(b"endobj")].strip()
+        # A stream keyword counts only right after the object's dictionary,
+        # not inside it (e.g. in a link URI)
+        keyword = _STREAM.match(body, _dictionary_end(body, 0)) if body.startswith(b"<<") else None
+        if keyword is None:
+            objects[number] = (body, None)
+            continue
+        dictionary = body[:keyword.start()].strip()
+        length = int(re.search(rb"/Length (\d+)", dictionary).group(1))
+        objects[number] = (dictionary, body[keyword.end():keyword.end() + length])
+    return objects, data[trailer_at:]
+
+def _ref(dictionary: bytes, key: bytes) -> Optional[int]:
+    match = re.search(rb"/" + key + rb" (\d+) 0 R", dictionary)
+    return int(match.group(1)) if match else None
+
+def _string_end(data: bytes, start: int) -> int:
+    """
+    Index just past the literal string opening at data[start] ("("),
+    honouring balanced parentheses and backslash escapes.
+    """
+    depth = 0
+    i = start
+    while i < len(data):
+        char = data[i]
+        if char == 0x5C:  # backslash escapes the next byte
+            i += 2
+            continue
+        if char == 0x28:
+            depth += 1
+        elif char == 0x29:
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    raise ValueError("Unsupported PDF: unterminated string literal")
+
+def _dictionary_end(data: bytes, start: int) -> int:
+    """
+    Index just past the ">>" closing the dictionary opening at data[start],
+    skipping nested dictionaries and string literals.
+    """
+    depth = 0
+    i = start
+    while i < len(data):
+        if data[i] == 0x28:
+            i = _string_end(data, i)
+            continue
+        if data.startswith(b"<<", i):
+            depth += 1
+            i += 2
+            continue
+        if data.startswith(b">>", i):
+            depth -= 1
+            i += 2
+            if depth == 0:
+                return i
+            continue
+        i += 1
+    raise ValueError("Unsupported PDF: unterminated dictionary")
+
+def _replace_refs(dictionary: bytes, replace: Callable[[int], bytes]) -> bytes:
+    """
+    Rewrites each indirect reference ("N 0 R") in an object's dictionary
+    to replace(N), leaving string literals (e.g. link URIs) untouched.
+    """
+    def substitute(match: "re.Match[bytes]") -> bytes:
+        return replace(int(match.group(1)))
+
+    if b"(" not in dictionary:
+        return _REF.sub(substitute, dictionary)
+    parts = []
+    position = 0
+    start = dictionary.find(b"(")
+    while start != -1:
+        end = _string_end(dictionary, start)
+        parts.append(_REF.sub(substitute, dictionary[position:start]))
+        parts.append(dictionary[start:end])
+        position = end
+        start = dictionary.find(b"(", end)
+    parts.append(_REF.sub(substitute, dictionary[position:]))
+    return b"".join(parts)
+
+def _renumber_refs(dictionary: bytes, renumber: Dict[int, int]) -> bytes:
+    """
+    Rewrites the indirect references in an object's dictionary through
+    renumber.
+
+    Raises:
+        ValueError: If a reference names an object the fragment lacks.
+    """
+    def replace(number: int) -> bytes:
+        if number not in renumber:
+            raise ValueError(f"Unsupported PDF: reference to missing object {number}")
+        return b"%d 0 R" % renumber[number]
+
+    return _replace_refs(dictionary, replace)
+
+def _stream_keys(objects: Dict[int, Tuple[bytes, Optional[bytes]]]) -> Dict[int, Optional[bytes]]:
+    """
+    Content digests of a fragment's stream objects (images, soft masks,
+    page contents), with references resolved to the digests of the
+    streams they name, so equal streams from different fragments get equal
+    keys. Streams that refer to anything else get None.
+    """
+    keys: Dict[int, Optional[bytes]] = {}
+
+    def key(number: int) -> Optional[bytes]:
+        if number not in keys:
+            keys[number] = None  # also what a reference cycle resolves to
+            dictionary, stream = objects.get(number, (b"", None))
+            if stream is not None:
+                resolved = []
+
+                def replace(ref: int) -> bytes:
+                    ref_key = key(ref)
+                    resolved.append(ref_key is not None)
+                    return (ref_key or b"").hex().encode() + b" R"
+
+                canonical = _replace_refs(dictionary, replace)
+                if all(resolved):
+                    keys[number] = hashlib.sha256(canonical + b"\nstream\n" + stream).digest()
+        return keys[number]
+
+    for number in objects:
+        key(number)
+    return keys
+
+def _object(number: int, dictionary: bytes, stream: Optional[bytes]) -> bytes:
+    if stream is None:
+        return b"%d 0 obj\n%s\nendobj\n" % (number, dictionary)
+    return b"%d 0 obj\n%s\nstream\n%s\nendstream\nendobj\n" % (number, dictionary, stream)
+
+def iter_merged_pdf(fragments: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Concatenates the pages of PDFs written by FPDF into one document,
+    yielded in chunks (one per fragment, then the trailer).
+
+    Objects are copied verbatim (streams are not re-encoded) and renumbered.
+    Streams identical to one already copied, with the same references
+    (e.g. a photo shown on several days), are written only once.
+    Each fragment's catalog, page tree root and info dictionary are dropped
+    in favour of new ones, written after the last fragment; the info
+    dictionary is taken from the first fragment. References are rewritten
+    outside string literals only, so text such as a link URI containing
+    "7 0 R" is left as is. The header carries the first fragment's PDF
+    version; if a later fragment needs a newer one, the catalog declares it
+    (/Version).
+
+    Fragments are read one at a time, so a lazy iterable is merged in the
+    memory of its largest fragment.
+
+    Raises:
+        ValueError: If there are no fragments, or one is not a flat
+            single-table PDF as FPDF writes (including references to
+            objects it does not contain).
+    """
+    # 1: page tree root, 2: catalog, 3: info; fragment objects follow
+    offsets: Dict[int, int] = {}
+    kids: List[int] = []
+    info = b"<<\n>>"
+    position = 0
+    version = latest = None
+    next_number = 4
+    # Content key of each stream written so far -> its object number
+    written: Dict[bytes, int] = {}
+    for fragment in fragments:
+        fragment_version = fragment[5:8]
+        out = bytearray()
+        if version is None:
+            version = latest = fragment_version
+            out += b"%PDF-" + version + b"\n%\xe9\xeb\xf1\xbf\n"
+        latest = max(latest, fragment_version)
+
+        objects, trailer = _read_objects(fragment)
+        root = _ref(trailer, b"Root")
+        info_number = _ref(trailer, b"Info")
+        pages = _ref(objects[root][0], b"Pages")
+        page_tree = objects[pages][0]
+        media_box = re.search(rb"/MediaBox \[[^\]]*\]", page_tree)
+        kids_at = page_tree.index(b"/Kids")
+        page_numbers = [int(n) for n in _REF.findall(page_tree[kids_at:page_tree.index(b"]", kids_at)])]
+
+        renumber = {pages: 1, root: 2, info_number: 3}
+        keys = _stream_keys(objects)
+        copied = []
+        for number in sorted(objects):
+            if number in renumber:
+                continue
+            key = keys[number]
+            if key in written:
+                # Same stream as one already in the output (e.g. a photo
+                # repeated on another day); point at that copy
+                renumber[number] = written[key]
+                continue
+            renumber[number] = next_number
+            if key is not None:
+                written[key] = next_number
+            next_number += 1
+            copied.append(number)
+        if not kids and info_number in objects:
+            info = objects[info_number][0]
+
+        for number in copied:
+            dictionary, stream = objects[number]
+            if number in page_numbers:
+                if b"/Type /Pages" in dictionary:
+                    raise ValueError("Unsupported PDF: nested page tree")
+                if media_box and b"/MediaBox" not in dictionary:
+                    # Inherited from the dropped page tree root
+                    dictionary = dictionary.replace(b"<<", b"<<\n" + media_box.group(0), 1)
+            offsets[renumber[number]] = position + len(out)
+            out += _object(renumber[number], _renumber_refs(dictionary, renumber), stream)
+        kids.extend(renumber[n] for n in page_numbers)
+        del fragment, objects
+        position += len(out)
+        yield bytes(out)
+
+    if version is None:
+        raise ValueError("No PDFs to merge")
+    catalog_version = b"/Version /" + latest + b"\n" if latest > version else b""
+    header = [
+        b"<<\n/Count %d\n/Kids [%s]\n/Type /Pages\n>>" % (len(kids), b"\n".join(b"%d 0 R" % n for n in kids)),
+        b"<<\n/OpenAction [%d 0 R /FitH null]\n/PageLayout /OneColumn\n/Pages 1 0 R\n/Type /Catalog\n%s>>" % (kids[0], catalog_version),
+        info
+    ]
+    out = bytearray()
+    for number, dictionary in enumerate(header, 1):
+        offsets[number] = position + len(out)
+        out += _object(number, dictionary, None)
+
+    xref_at = position + len(out)
+    size = len(offsets) + 1
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % size
+    out += b"".join(b"%010d 00000 n \n" % offsets[number] for number in range(1, size))
+    out += b"trailer\n<<\n/Size %d\n/Root 2 0 R\n/Info 3 0 R\n>>\nstartxref\n%d\n%%%%EOF\n" % (size, xref_at)
+    yield bytes(out)
+
+def merge_pdfs(fragments: List[bytes]) -> bytes:
+    """
+    Concatenates the pages of PDFs written by FPDF into one document held
+    in memory; see iter_merged_pdf.
+
+    Raises:
+        ValueError: If a fragment is not a flat single-table PDF as FPDF writes.
+    """
+    return b"".join(iter_merged_pdf(fragments))
@@ -1,10 +1,77 @@
+import gc
 import hashlib
+import io
 import os
+import json
+import itertools
+import time
 import base64
+import logging
 import tempfile
-from typing import List, Dict, Any
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Iterable, Iterator, List, Dict, Any, Optional, Tuple, Union
 from fpdf import FPDF
 
+from engine.cache.cache import LRUCache, canonical_hash
+from engine.blobs.blobs import BLOB_STORE, BlobNotFoundError
+from engine.provenance.merge import iter_merged_pdf
+
+logger = logging.getLogger(__name__)
+
+# Photos wider than this are downscaled before embedding (standard profile)
+MAX_PHOTO_WIDTH = 800
+JPEG_QUALITY = 60
+
+# Photos are placed this wide on the page
+PHOTO_WIDTH_MM = 100
+
+# Output profiles. `dpi` is the pixel density photos are prepared for at
+# PHOTO_WIDTH_MM; wider photos are downscaled to it. `png_to_jpeg` re-encodes
+# PNG photos as JPEG (FPDF stores PNGs as deflated raw pixels). With
+# `strip_metadata` every photo is re-encoded without EXIF/ICC data; otherwise
+# photos that need no resizing are embedded byte for byte. Resized photos
+# carry their EXIF/ICC data (camera GPS, device) over only with
+# `keep_metadata`.
+PDF_PROFILES: Dict[str, Dict[str, Any]] = {
+    "archival": {"dpi": 300, "jpeg_quality": 90, "png_to_jpeg": False, "strip_metadata": False, "keep_metadata": True},
+    # 800 px across 100 mm
+    "standard": {"dpi": MAX_PHOTO_WIDTH * 25.4 / PHOTO_WIDTH_MM, "jpeg_quality": JPEG_QUALITY, "png_to_jpeg": False, "strip_metadata": False, "keep_metadata": False},
+    "compact": {"dpi": 120, "jpeg_quality": 45, "png_to_jpeg": True, "strip_metadata": True, "keep_metadata": False}
+}
+DEFAULT_PROFILE = "standard"
+
+# Default size of the photo prepare pool. Pillow releases the GIL while
+# decoding and resizing, so threads use all cores without pickling photos.
+PHOTO_WORKERS = int(os.environ.get("VERITAS_PHOTO_WORKERS", min(8, os.cpu_count() or 1)))
+
+# Prepared (resized and re-encoded) photos, keyed by the SHA-256 of the raw
+# upload plus the prepare parameters. Set VERITAS_PHOTO_CACHE_DIR to keep a
+# disk tier across restarts.
+PHOTO_CACHE = LRUCache(
+    max_entries=int(os.environ.get("VERITAS_PHOTO_CACHE_ENTRIES", 4096)),
+    max_bytes=int(os.environ.get("VERITAS_PHOTO_CACHE_MB", 128)) * 1024 * 1024,
+    sizeof=len,
+    disk_dir=os.environ.get("VERITAS_PHOTO_CACHE_DIR") or None,
+    max_disk_bytes=int(os.environ.get("VERITAS_PHOTO_CACHE_DISK_MB", 1024)) * 1024 * 1024
+)
+
+def get_profile(name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Settings for an output profile name (None for DEFAULT_PROFILE).
+    
+    Raises:
+        ValueError: If the profile is unknown.
+    """
+    name = name or DEFAULT_PROFILE
+    if name not in PDF_PROFILES:
+        raise ValueError(f"Unknown profile '{name}'; expected one of {', '.join(PDF_PROFILES)}")
+    return PDF_PROFILES[name]
+
+def photo_width_px(profile: Dict[str, Any]) -> int:
+    """Pixel width photos are prepared for under a profile's settings."""
+    return round(profile["dpi"] * PHOTO_WIDTH_MM / 25.4)
+
 def hash_file(path: str) -> str:
     """
     Calculates the SHA-256 hash of a file.
@@ -22,17 +89,259 @@ def hash_file(path: str) -> str:
             sha256_hash.update(byte_block)
     return sha256_hash.hexdigest()
 
-def create_provenance_pdf(shift_logs: List[Dict[str, Any]], output_path: str, project: Dict[str, Any] = None) -> str:
+def hashable_logs(shift_logs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
-    Creates a PDF Statement of Work Accomplished from shift logs.
+    Shallow copies of shift logs with each photo_base64 (or raw photo_data)
+    replaced by its SHA-256, for building cache keys. Digesting the payload
+    is far cheaper than JSON-encoding megabytes of base64 and identifies it
+    just as well.
+    """
+    logs = []
+    for log in shift_logs:
+        photo_base64 = log.get('photo_base64')
+        if isinstance(photo_base64, str):
+            log = dict(log, photo_base64={"sha256": hashlib.sha256(photo_base64.encode("utf-8")).hexdigest()})
+        if isinstance(log.get('photo_data'), bytes):
+            log = dict(log, photo_data={"sha256": hashlib.sha256(log['photo_data']).hexdigest()})
+        logs.append(log)
+    return logs
+
+def provenance_cache_key(shift_logs: List[Dict[str, Any]], project: Optional[Dict[str, Any]] = None, profile: Optional[str] = None, **extra: Any) -> str:
+    """
+    Canonical hash identifying one provenance report, for use with
+    engine.cache.LRUCache. Covers the inputs and every setting that changes
+    the rendered document; request options that do not (e.g. the output
+    file name) are left out. Additional render options go in `extra`.
+    """
+    return canonical_hash({
+        "shift_logs": hashable_logs(shift_logs),
+        "project": project,
+        "profile": get_profile(profile),
+        "extra": extra
+    })
+
+def write_atomic(path: str, data: Union[bytes, Iterable[bytes]]) -> None:
+    """
+    Writes data (bytes, or an iterable of chunks written as they arrive) to
+    path via a temp file in the same directory and a rename, so readers
+    never see a partially written file.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=os.path.splitext(path)[1])
+    try:
+        with os.fdopen(fd, "wb") as f:
+            if isinstance(data, (bytes, bytearray, memoryview)):
+                f.write(data)
+            else:
+                for chunk in data:
+                    f.write(chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def decode_photo(photo_base64: str) -> Tuple[bytes, str]:
+    """
+    Decodes a photo_base64 value (data URL or bare base64).
     
     Args:
-        shift_logs: List of shift_log entries (usually for a single day/segment).
-        output_path: Path where the PDF should be saved.
-        project: Optional dictionary containing project metadata.
+        photo_base64: Photo as sent by the PWA.
         
     Returns:
-        Path to the created PDF.
+        (raw image bytes, PIL format to re-encode in). The format follows the
+        data URL's MIME type and defaults to JPEG.
+    """
+    image_format = "JPEG" # default
+    if ',' in photo_base64:
+        header, encoded = photo_base64.split(',', 1)
+        if "image/png" in header:
+            image_format = "PNG"
+    else:
+        encoded = photo_base64
+    return base64.b64decode(encoded), image_format
+
+def photo_format(image_data: bytes) -> str:
+    """
+    PIL format to re-encode raw photo bytes in: PNG if they carry the PNG
+    signature, JPEG otherwise.
+    """
+    return "PNG" if bytes(image_data[:8]) == b"\x89PNG\r\n\x1a\n" else "JPEG"
+
+def photo_cache_key(image_data: bytes, image_format: str, profile: Optional[str] = None, sha256: Optional[str] = None) -> str:
+    """
+    PHOTO_CACHE key: the raw photo's SHA-256 plus every parameter that
+    affects the prepared bytes. Pass sha256 if it is already known.
+    """
+    return canonical_hash({
+        "sha256": sha256 or hashlib.sha256(image_data).hexdigest(),
+        "format": image_format,
+        "profile": get_profile(profile)
+    })
+
+def _resize_photo(image_data: bytes, image_format: str, profile: Dict[str, Any]) -> bytes:
+    # OPTIMIZATION: Resize image if it's too large using PIL (if available)
+    try:
+        from PIL import Image
+        with Image.open(io.BytesIO(image_data)) as img:
+            max_width = photo_width_px(profile)
+            to_jpeg = profile["png_to_jpeg"] and image_format == "PNG"
+            if img.width <= max_width and not to_jpeg and not profile["strip_metadata"]:
+                return image_data
+            
+            metadata = {}
+            if profile["keep_metadata"]:
+                metadata = {k: img.info[k] for k in ("exif", "icc_profile") if img.info.get(k)}
+            if img.width > max_width:
+                new_height = int(img.height * max_width / img.width)
+                img = img.resize((max_width, new_height), Image.Resampling.LANCZOS)
+            
+            output_format = "JPEG" if to_jpeg else image_format
+            if to_jpeg and img.mode not in ("RGB", "L"):
+                # JPEG has no alpha; flatten transparent areas onto white
+                rgba = img.convert("RGBA")
+                img = Image.new("RGB", rgba.size, (255, 255, 255))
+                img.paste(rgba, mask=rgba.getchannel("A"))
+            
+            # Re-encode with compression
+            buffer = io.BytesIO()
+            img.save(buffer, format=output_format, optimize=True, quality=profile["jpeg_quality"], **metadata)
+            return buffer.getvalue()
+    except ImportError:
+        pass # PIL not installed, skip optimization
+    
+    return image_data
+
+def prepare_photo_bytes(image_data: bytes, image_format: str, key: Optional[str] = None, profile: Optional[str] = None) -> Tuple[bytes, bool]:
+    """
+    Returns (prepared bytes, cache hit) for a decoded photo under an output
+    profile, consulting PHOTO_CACHE first. Only re-encoded photos are
+    cached; photos that pass through unchanged cost nothing to prepare again.
+    """
+    key = key or photo_cache_key(image_data, image_format, profile)
+    prepared = PHOTO_CACHE.get(key)
+    if prepared is not None:
+        return prepared, True
+    prepared = _resize_photo(image_data, image_format, get_profile(profile))
+    if prepared is not image_data:
+        PHOTO_CACHE.put(key, prepared)
+    return prepared, False
+
+def prepare_photo(photo_base64: str, profile: Optional[str] = None) -> io.BytesIO:
+    """
+    Decodes a photo and downscales it for embedding, entirely in memory.
+    
+    Args:
+        photo_base64: Photo as sent by the PWA.
+        profile: Output profile name (see PDF_PROFILES). Defaults to
+            DEFAULT_PROFILE.
+        
+    Returns:
+        In-memory image ready for FPDF.image(). Under the standard profile,
+        photos no wider than MAX_PHOTO_WIDTH (or all photos, if Pillow is
+        not installed) are passed through byte for byte.
+    """
+    image_data, image_format = decode_photo(photo_base64)
+    prepared, _ = prepare_photo_bytes(image_data, image_format, profile=profile)
+    return io.BytesIO(prepared)
+
+def _prepare_or_error(job: Tuple[bytes, str, str, Optional[str]]) -> Union[Tuple[bytes, bool, float], Exception]:
+    # Errors are returned rather than raised so one bad photo does not
+    # abort the batch; the layout stage reports it in place
+    started = time.perf_counter()
+    try:
+        return prepare_photo_bytes(*job) + (time.perf_counter() - started,)
+    except Exception as e:
+        return e
+
+def prepare_photos(shift_logs: List[Dict[str, Any]], workers: Optional[int] = None, stats: Optional[Dict[str, Any]] = None, profile: Optional[str] = None) -> List[Union[io.BytesIO, Exception, None]]:
+    """
+    Prepare stage: decodes and resizes every log's photo concurrently.
+    
+    A log's photo is `photo_sha256` (a photo uploaded to BLOB_STORE earlier),
+    `photo_data` (raw image bytes, e.g. from a multipart upload, used
+    without copying) or `photo_base64`.
+    Identical photos are prepared once and share the same prepared bytes,
+    which FPDF embeds once per document however often they are placed.
+    
+    Args:
+        shift_logs: List of shift_log entries.
+        workers: Thread pool size. Defaults to PHOTO_WORKERS; 1 runs serially.
+        stats: Optional dict that receives unique_photos, photo_cache_hits,
+            photo_bytes (raw size of the distinct photos), decode_s (base64
+            decoding and blob reads) and resize_s (time spent preparing
+            photos, summed over the pool's threads).
+        profile: Output profile name. Defaults to DEFAULT_PROFILE.
+        
+    Returns:
+        One entry per log, in order: the prepared image, the exception
+        raised while preparing it, or None if the log has no photo.
+    """
+    prepared: List[Union[io.BytesIO, Exception, None]] = [None] * len(shift_logs)
+    
+    # Decode and key every photo, grouping logs that carry the same photo.
+    # Repeated payloads are decoded only once.
+    by_key: Dict[str, List[int]] = {}
+    jobs: Dict[str, Tuple[bytes, str, str, Optional[str]]] = {}
+    decoded: Dict[Union[str, bytes], Union[str, Exception]] = {}
+    started = time.perf_counter()
+    for i, log in enumerate(shift_logs):
+        digest = log.get('photo_sha256')
+        photo = digest or log.get('photo_data') or log.get('photo_base64')
+        if not photo:
+            continue
+        if photo not in decoded:
+            try:
+                if digest:
+                    image_data = BLOB_STORE.get(digest)
+                    if image_data is None:
+                        raise BlobNotFoundError(digest)
+                    image_format = photo_format(image_data)
+                elif isinstance(photo, str):
+                    image_data, image_format = decode_photo(photo)
+                else:
+                    image_data, image_format = photo, photo_format(photo)
+                key = photo_cache_key(image_data, image_format, profile, sha256=digest)
+                jobs.setdefault(key, (image_data, image_format, key, profile))
+                decoded[photo] = key
+            except Exception as e:
+                decoded[photo] = e
+        key = decoded[photo]
+        if isinstance(key, Exception):
+            prepared[i] = key
+        else:
+            by_key.setdefault(key, []).append(i)
+    decode_s = time.perf_counter() - started
+    
+    workers = min(workers or PHOTO_WORKERS, len(jobs))
+    if workers <= 1:
+        results = [_prepare_or_error(job) for job in jobs.values()]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_prepare_or_error, jobs.values()))
+    
+    cache_hits = 0
+    resize_s = 0.0
+    for key, result in zip(jobs, results):
+        if not isinstance(result, Exception):
+            cache_hits += result[1]
+            resize_s += result[2]
+        for i in by_key[key]:
+            prepared[i] = result if isinstance(result, Exception) else io.BytesIO(result[0])
+    
+    if stats is not None:
+        stats["unique_photos"] = len(jobs)
+        stats["photo_cache_hits"] = cache_hits
+        stats["photo_bytes"] = sum(len(job[0]) for job in jobs.values())
+        stats["decode_s"] = round(decode_s, 6)
+        stats["resize_s"] = round(resize_s, 6)
+    return prepared
+
+def start_document(project: Optional[Dict[str, Any]]) -> FPDF:
+    """
+    New FPDF document with the title and, if given, the project header
+    on its first page.
     """
     pdf = FPDF()
     pdf.add_page()
@@ -67,98 +376,259 @@ def create_provenance_pdf(shift_logs: List[Dict[str, Any]], output_path: str, pr
     
     # Content
     pdf.set_font("Arial", "", 12)
+    return pdf
+
+def layout_log(pdf: FPDF, log: Dict[str, Any], image: Union[io.BytesIO, Exception, None]) -> bool:
+    """
+    Places one log entry and its prepared photo (see prepare_photos).
+    Returns True if the photo could not be embedded.
+    """
+    error = False
+    pdf.set_font("Arial", "B", 12)
+    pdf.cell(0, 10, f"Date: {log.get('date', 'N/A')}", ln=True)
+    pdf.cell(0, 10, f"Segment: {log.get('segment_id', 'N/A')}", ln=True)
+    pdf.ln(2)
     
-    for log in shift_logs:
-        pdf.set_font("Arial", "B", 12)
-        pdf.cell(0, 10, f"Date: {log.get('date', 'N/A')}", ln=True)
-        pdf.cell(0, 10, f"Segment: {log.get('segment_id', 'N/A')}", ln=True)
-        pdf.ln(2)
-        
-        pdf.set_font("Arial", "", 12)
-        # New universal construction tracking fields
-        pdf.cell(0, 8, f"Work Type: {log.get('work_type', 'N/A')}", ln=True)
-        if log.get('item_code'):
-            pdf.cell(0, 8, f"Item Code: {log.get('item_code')}", ln=True)
-        pdf.cell(0, 8, f"Quantity Today: {log.get('quantity_today', 'N/A')}", ln=True)
-        # Original blocks field for backwards compatibility
-        pdf.cell(0, 8, f"Blocks Completed Today: {log.get('shift_output_blocks', 0)}", ln=True)
-        pdf.cell(0, 8, f"Cumulative Blocks: {log.get('cumulative_blocks', 0)}", ln=True)
-        pdf.cell(0, 8, f"Remaining Blocks: {log.get('remaining_blocks', 0)}", ln=True)
-        pdf.cell(0, 8, f"Crew Size: {log.get('crew_size', 'N/A')}", ln=True)
-        pdf.cell(0, 8, f"Weather: {log.get('weather', 'N/A')}", ln=True)
+    pdf.set_font("Arial", "", 12)
+    # New universal construction tracking fields
+    pdf.cell(0, 8, f"Work Type: {log.get('work_type', 'N/A')}", ln=True)
+    if log.get('item_code'):
+        pdf.cell(0, 8, f"Item Code: {log.get('item_code')}", ln=True)
+    pdf.cell(0, 8, f"Quantity Today: {log.get('quantity_today', 'N/A')}", ln=True)
+    # Original blocks field for backwards compatibility
+    pdf.cell(0, 8, f"Blocks Completed Today: {log.get('shift_output_blocks', 0)}", ln=True)
+    pdf.cell(0, 8, f"Cumulative Blocks: {log.get('cumulative_blocks', 0)}", ln=True)
+    pdf.cell(0, 8, f"Remaining Blocks: {log.get('remaining_blocks', 0)}", ln=True)
+    pdf.cell(0, 8, f"Crew Size: {log.get('crew_size', 'N/A')}", ln=True)
+    pdf.cell(0, 8, f"Weather: {log.get('weather', 'N/A')}", ln=True)
+    
+    # GPS
+    lat = log.get('latitude')
+    lon = log.get('longitude')
+    if lat and lon:
+        pdf.cell(0, 8, f"GPS: ({lat}, {lon})", ln=True)
+    else:
+        pdf.cell(0, 8, f"GPS: Not Available", ln=True)
+    
+    # Photo Handling
+    if image is not None:
+        try:
+            if isinstance(image, Exception):
+                raise image
+            
+            # Insert into PDF
+            pdf.ln(5)
+            pdf.image(image, w=PHOTO_WIDTH_MM)
+            pdf.ln(2)
+            pdf.set_font("Arial", "I", 10)
+            pdf.cell(0, 6, f"Field Photo for {log.get('date', 'N/A')}", ln=True)
+            
+            pdf.set_font("Arial", "", 12) # Reset font
+            
+        except Exception as e:
+            logger.warning("Error embedding photo for %s %s: %s", log.get('segment_id', 'N/A'), log.get('date', 'N/A'), e)
+            pdf.cell(0, 8, f"[Error embedding photo: {str(e)}]", ln=True)
+            error = True
+
+    pdf.ln(5)
+    pdf.line(10, pdf.get_y(), 200, pdf.get_y())
+    pdf.ln(5)
+    return error
+
+def _layout_window(pdf: FPDF, window: List[Dict[str, Any]], workers: Optional[int], profile: Optional[str], totals: Dict[str, Any]) -> None:
+    """
+    Prepares one window's photos, places its logs in pdf and adds the
+    window's stage timings and photo counts to totals.
+    """
+    started = time.perf_counter()
+    photo_stats: Dict[str, Any] = {}
+    prepared = prepare_photos(window, workers, stats=photo_stats, profile=profile)
+    prepared_at = time.perf_counter()
+    
+    for log, image in zip(window, prepared):
+        totals["photo_errors"] += layout_log(pdf, log, image)
+    
+    totals["prepare_s"] += prepared_at - started
+    totals["layout_s"] += time.perf_counter() - prepared_at
+    totals["photos"] += sum(1 for image in prepared if image is not None)
+    for name in ("unique_photos", "photo_cache_hits", "photo_bytes", "decode_s", "resize_s"):
+        totals[name] += photo_stats[name]
+
+def _render_stats(totals: Dict[str, Any], workers: Optional[int], profile: Optional[str], pdf_bytes: int) -> Dict[str, Any]:
+    return {
+        **{name: round(value, 6) if name.endswith("_s") else value for name, value in totals.items()},
+        "photo_workers": workers or PHOTO_WORKERS,
+        "profile": profile or DEFAULT_PROFILE,
+        "pdf_bytes": pdf_bytes
+    }
+
+def _new_totals() -> Dict[str, Any]:
+    # Stage timings and photo counts accumulated over a render
+    return dict.fromkeys(("prepare_s", "decode_s", "resize_s", "layout_s", "output_s", "hash_s", "write_s",
+                          "photos", "photo_errors", "unique_photos", "photo_cache_hits", "photo_bytes"), 0)
+
+def save_provenance_pdf(shift_logs: List[Dict[str, Any]], output_path: str, project: Dict[str, Any] = None, workers: Optional[int] = None, stats: Optional[Dict[str, Any]] = None, profile: Optional[str] = None) -> str:
+    """
+    Creates a PDF Statement of Work Accomplished from shift logs and
+    returns its SHA-256.
+    
+    Generation runs in stages: photos are prepared concurrently first
+    (prepare_photos), then pages are laid out in log order, then the PDF
+    is rendered to memory, hashed and written atomically. The file is
+    never read back.
+    
+    Args:
+        shift_logs: List of shift_log entries (usually for a single day/segment).
+        output_path: Path where the PDF should be saved.
+        project: Optional dictionary containing project metadata.
+        workers: Photo prepare pool size. Defaults to PHOTO_WORKERS.
+        stats: Optional dict that receives stage timings in seconds
+            (prepare_s; decode_s and resize_s as in
+            prepare_photos; layout_s; output_s for pdf.output(); hash_s;
+            write_s), the photo count, the number of distinct photos, their
+            raw size (photo_bytes) and how many came from PHOTO_CACHE, the
+            number of photos that could not be embedded, the profile and
+            the PDF size in bytes (pdf_bytes).
+        profile: Output profile name (archival, standard or compact; see
+            PDF_PROFILES). Defaults to DEFAULT_PROFILE.
         
-        # GPS
-        lat = log.get('latitude')
-        lon = log.get('longitude')
-        if lat and lon:
-            pdf.cell(0, 8, f"GPS: ({lat}, {lon})", ln=True)
-        else:
-            pdf.cell(0, 8, f"GPS: Not Available", ln=True)
+    Returns:
+        Hex string of the SHA-256 hash of the written PDF.
         
-        # Photo Handling
-        photo_base64 = log.get('photo_base64')
-        if photo_base64:
-            try:
-                import uuid
-                
-                # Determine extension and extract data
-                extension = ".jpg" # default
-                if ',' in photo_base64:
-                    header, encoded = photo_base64.split(',', 1)
-                    if "image/png" in header:
-                        extension = ".png"
-                    elif "image/jpeg" in header:
-                        extension = ".jpg"
-                else:
-                    encoded = photo_base64
-                
-                # Decode
-                image_data = base64.b64decode(encoded)
-                
-                # Create temp file manually to avoid Windows locking issues
-                tmp_filename = f"temp_img_{uuid.uuid4()}{extension}"
-                tmp_path = os.path.join(tempfile.gettempdir(), tmp_filename)
-                
-                with open(tmp_path, "wb") as f:
-                    f.write(image_data)
-                
-                # OPTIMIZATION: Resize image if it's too large using PIL (if available)
-                try:
-                    from PIL import Image
-                    with Image.open(tmp_path) as img:
-                        # Resize to max width of 800px to speed up PDF generation
-                        if img.width > 800:
-                            ratio = 800 / img.width
-                            new_height = int(img.height * ratio)
-                            img = img.resize((800, new_height), Image.Resampling.LANCZOS)
-                            # Save back to temp path with compression
-                            img.save(tmp_path, optimize=True, quality=60)
-                except ImportError:
-                    pass # PIL not installed, skip optimization
-                
-                # Insert into PDF
-                pdf.ln(5)
-                pdf.image(tmp_path, w=100) # 100mm width
-                pdf.ln(2)
-                pdf.set_font("Arial", "I", 10)
-                pdf.cell(0, 6, f"Field Photo for {log.get('date', 'N/A')}", ln=True)
-                
-                # Cleanup
-                if os.path.exists(tmp_path):
-                    os.remove(tmp_path)
-                
-                pdf.set_font("Arial", "", 12) # Reset font
-                
-            except Exception as e:
-                print(f"Error embedding photo: {e}")
-                pdf.cell(0, 8, f"[Error embedding photo: {str(e)}]", ln=True)
+    Raises:
+        ValueError: If the profile is unknown.
+    """
+    get_profile(profile) # fail before any work on an unknown profile
+    totals = _new_totals()
+    pdf = start_document(project)
+    _layout_window(pdf, shift_logs, workers, profile, totals)
+    
+    laid_out_at = time.perf_counter()
+    data = pdf.output()
+    output_at = time.perf_counter()
+    file_hash = hashlib.sha256(data).hexdigest()
+    hashed_at = time.perf_counter()
+    write_atomic(output_path, data)
+    
+    if stats is not None:
+        totals.update(output_s=output_at - laid_out_at, hash_s=hashed_at - output_at, write_s=time.perf_counter() - hashed_at)
+        stats.update(_render_stats(totals, workers, profile, len(data)))
+    return file_hash
 
-        pdf.ln(5)
-        pdf.line(10, pdf.get_y(), 200, pdf.get_y())
-        pdf.ln(5)
+def iter_ndjson_logs(source: Union[str, IO]) -> Iterator[Dict[str, Any]]:
+    """
+    Yields shift logs one at a time from an NDJSON file path or a binary or
+    text stream, skipping blank lines.
+    """
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            yield from iter_ndjson_logs(f)
+        return
+    for line in source:
+        if line.strip():
+            yield json.loads(line)
+
+def save_provenance_pdf_stream(shift_logs: Iterable[Dict[str, Any]], output_path: str, project: Dict[str, Any] = None, workers: Optional[int] = None, window: Optional[int] = None, stats: Optional[Dict[str, Any]] = None, profile: Optional[str] = None) -> str:
+    """
+    Bounded-memory variant of save_provenance_pdf for very long reports.
+    
+    Logs are consumed incrementally (e.g. from iter_ndjson_logs) in windows
+    of `window` entries. Each window is rendered as its own PDF document
+    (prepare stage, layout stage, pdf.output()) and its objects are copied
+    straight into the output file by iter_merged_pdf, so at most two
+    windows' photos and pages are in memory at once, however long the
+    report. Every window after the first starts on a new page; a report
+    that fits in one window is identical to save_provenance_pdf's.
+    
+    Args:
+        shift_logs: Iterable of shift_log entries, read once.
+        output_path: Path where the PDF should be saved.
+        project: Optional dictionary containing project metadata.
+        workers: Photo prepare pool size. Defaults to PHOTO_WORKERS.
+        window: Logs per window. Defaults to 4 per worker.
+        stats: Optional dict that receives stage timings; see
+            save_provenance_pdf. output_s is summed over the windows, and
+            write_s includes copying the windows into the merged file.
+        profile: Output profile name. Defaults to DEFAULT_PROFILE.
+        
+    Returns:
+        Hex string of the SHA-256 hash of the written PDF.
+        
+    Raises:
+        ValueError: If the profile is unknown.
+    """
+    get_profile(profile) # fail before any work on an unknown profile
+    window = window or 4 * (workers or PHOTO_WORKERS)
+    started = time.perf_counter()
+    totals = _new_totals()
+    
+    def documents():
+        iterator = iter(shift_logs)
+        pdf = start_document(project)
+        while True:
+            chunk = list(itertools.islice(iterator, window))
+            if chunk:
+                if pdf is None:
+                    pdf = FPDF()
+                    pdf.add_page()
+                    pdf.set_font("Arial", "", 12)
+                _layout_window(pdf, chunk, workers, profile, totals)
+                del chunk
+            elif pdf is None:
+                return
+            output_started = time.perf_counter()
+            data = bytes(pdf.output())
+            totals["output_s"] += time.perf_counter() - output_started
+            # A written FPDF document stays alive through a reference cycle
+            # until the cyclic collector runs, which large buffers do not
+            # trigger. A young-generation pass usually frees it; fall back
+            # to a full one if it was already promoted.
+            document = weakref.ref(pdf)
+            pdf = None
+            gc.collect(1)
+            if document() is not None:
+                gc.collect()
+            yield data
+    
+    # A single window is written as is, so short reports match save_provenance_pdf
+    rendered = documents()
+    first = next(rendered)
+    second = next(rendered, None)
+    chunks = [first] if second is None else iter_merged_pdf(itertools.chain([first, second], rendered))
+    del first, second
     
-    # Ensure directory exists
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    def hashed(chunks):
+        nonlocal size
+        for chunk in chunks:
+            hash_started = time.perf_counter()
+            digest.update(chunk)
+            totals["hash_s"] += time.perf_counter() - hash_started
+            size += len(chunk)
+            yield chunk
+    write_atomic(output_path, hashed(chunks))
+    
+    if stats is not None:
+        staged = sum(totals[name] for name in ("prepare_s", "layout_s", "output_s", "hash_s"))
+        totals["write_s"] = time.perf_counter() - started - staged
+        stats.update(_render_stats(totals, workers, profile, size))
+    return digest.hexdigest()
+
+def create_provenance_pdf(shift_logs: List[Dict[str, Any]], output_path: str, project: Dict[str, Any] = None, workers: Optional[int] = None, stats: Optional[Dict[str, Any]] = None, profile: Optional[str] = None) -> str:
+    """
+    Creates a PDF Statement of Work Accomplished from shift logs.
     
-    pdf.output(output_path)
+    Args:
+        shift_logs: List of shift_log entries (usually for a single day/segment).
+        output_path: Path where the PDF should be saved.
+        project: Optional dictionary containing project metadata.
+        workers: Photo prepare pool size. Defaults to PHOTO_WORKERS.
+        stats: Optional dict that receives stage timings; see save_provenance_pdf.
+        profile: Output profile name. Defaults to DEFAULT_PROFILE.
+        
+    Returns:
+        Path to the created PDF.
+    """
+    save_provenance_pdf(shift_logs, output_path, project=project, workers=workers, stats=stats, profile=profile)
     return output_path
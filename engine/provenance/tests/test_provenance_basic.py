@@ -2,11 +2,24 @@ import unittest
 import sys
 import os
 import shutil
+import io
+import json
+import base64
+import tempfile
+import zipfile
+import subprocess
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 
 # Add project root to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
 
-from engine.provenance.provenance import create_provenance_pdf, hash_file
+from engine.provenance.batch import render_batch, reports_from_logs
+from engine.provenance.cumulative import save_cumulative_pdf, merge_pdfs, PAGE_CACHE
+from engine.provenance.provenance import create_provenance_pdf, save_provenance_pdf, save_provenance_pdf_stream, iter_ndjson_logs, hash_file, prepare_photo, MAX_PHOTO_WIDTH, JPEG_QUALITY, PHOTO_CACHE, PDF_PROFILES, photo_width_px
 
 class TestProvenanceBasic(unittest.TestCase):
     def setUp(self):
@@ -52,5 +65,302 @@ class TestProvenanceBasic(unittest.TestCase):
         hash1_again = hash_file(output_path)
         self.assertEqual(hash1, hash1_again, "Hash should be stable for same file")
 
+    def test_photos_prepared_in_memory(self):
+        from PIL import Image
+        
+        def data_url(width, height):
+            buffer = io.BytesIO()
+            Image.new("RGB", (width, height), (120, 90, 60)).save(buffer, format="JPEG")
+            return "data:image/jpeg;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+        
+        small, large = data_url(400, 300), data_url(1600, 1200)
+        
+        # Small photos pass through untouched; large ones are downscaled
+        self.assertEqual(prepare_photo(small).getvalue(), base64.b64decode(small.split(',', 1)[1]))
+        with Image.open(prepare_photo(large)) as img:
+            self.assertEqual((img.width, img.height), (MAX_PHOTO_WIDTH, 600))
+            self.assertEqual(img.format, "JPEG")
+        
+        logs = [{"date": "2025-11-10", "segment_id": "test-seg", "photo_base64": small},
+                {"date": "2025-11-11", "segment_id": "test-seg", "photo_base64": large}]
+        temp_images = lambda: {name for name in os.listdir(tempfile.gettempdir()) if name.startswith("temp_img_")}
+        before = temp_images()
+        output_path = os.path.join(self.test_dir, 'photos.pdf')
+        create_provenance_pdf(logs, output_path)
+        self.assertEqual(temp_images(), before, "No temp image files should be written")
+        with open(output_path, "rb") as f:
+            self.assertEqual(f.read().count(b"/Subtype /Image"), 2)
+
+    def test_output_profiles(self):
+        from PIL import Image
+        
+        exif = Image.Exif()
+        exif[0x010F] = "FieldCam" # Make
+        buffer = io.BytesIO()
+        Image.new("RGB", (600, 450), (40, 120, 80)).save(buffer, format="JPEG", quality=95, exif=exif.tobytes())
+        jpeg = "data:image/jpeg;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+        buffer = io.BytesIO()
+        Image.new("RGBA", (1600, 1200), (200, 30, 30, 128)).save(buffer, format="PNG")
+        png = "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+        
+        self.assertEqual(photo_width_px(PDF_PROFILES["standard"]), MAX_PHOTO_WIDTH)
+        
+        # Compact: PNGs become JPEGs at the compact width, metadata is stripped
+        with Image.open(prepare_photo(png, profile="compact")) as img:
+            self.assertEqual(img.format, "JPEG")
+            self.assertEqual(img.width, photo_width_px(PDF_PROFILES["compact"]))
+        with Image.open(prepare_photo(jpeg, profile="compact")) as img:
+            self.assertNotIn("exif", img.info)
+        
+        # Standard keeps PNGs as PNGs; archival keeps small photos byte for byte
+        with Image.open(prepare_photo(png)) as img:
+            self.assertEqual((img.format, img.width), ("PNG", MAX_PHOTO_WIDTH))
+        self.assertEqual(prepare_photo(jpeg, profile="archival").getvalue(), base64.b64decode(jpeg.split(',', 1)[1]))
+        
+        # Resized photos: standard is encoded exactly as before profiles existed
+        # (no EXIF), archival keeps the EXIF
+        buffer = io.BytesIO()
+        Image.effect_noise((1600, 1200), 32).convert("RGB").save(buffer, format="JPEG", quality=95, exif=exif.tobytes())
+        large = buffer.getvalue()
+        with Image.open(io.BytesIO(large)) as img:
+            baseline = io.BytesIO()
+            img.resize((MAX_PHOTO_WIDTH, 600), Image.Resampling.LANCZOS).save(baseline, format="JPEG", optimize=True, quality=JPEG_QUALITY)
+        large = "data:image/jpeg;base64," + base64.b64encode(large).decode("ascii")
+        standard = prepare_photo(large).getvalue()
+        self.assertEqual(standard, baseline.getvalue())
+        with Image.open(io.BytesIO(standard)) as img:
+            self.assertNotIn("exif", img.info)
+        with Image.open(prepare_photo(large, profile="archival")) as img:
+            self.assertEqual(img.getexif()[0x010F], "FieldCam")
+        
+        with self.assertRaises(ValueError):
+            create_provenance_pdf([{"date": "2025-11-10"}], os.path.join(self.test_dir, 'bad.pdf'), profile="tiny")
+        
+        stats = {}
+        logs = [{"date": "2025-11-10", "segment_id": "profile-seg", "photo_base64": png}]
+        create_provenance_pdf(logs, os.path.join(self.test_dir, 'compact.pdf'), stats=stats, profile="compact")
+        self.assertEqual(stats["profile"], "compact")
+        self.assertEqual(stats["pdf_bytes"], os.path.getsize(os.path.join(self.test_dir, 'compact.pdf')))
+
+    def test_parallel_prepare_stage(self):
+        from PIL import Image
+        
+        buffer = io.BytesIO()
+        Image.new("RGB", (1200, 900), (30, 60, 90)).save(buffer, format="PNG")
+        photo = "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+        logs = [{"date": f"2025-11-{day:02d}", "segment_id": "test-seg", "photo_base64": photo} for day in range(1, 7)]
+        logs.append({"date": "2025-11-07", "segment_id": "test-seg"})
+        logs.append({"date": "2025-11-08", "segment_id": "test-seg", "photo_base64": "data:image/png;base64,bm90IGFuIGltYWdl"})
+        
+        stats = {}
+        with self.assertLogs("engine.provenance.provenance", "WARNING") as logged:
+            create_provenance_pdf(logs, os.path.join(self.test_dir, 'parallel.pdf'), workers=4, stats=stats)
+        self.assertIn("2025-11-08", logged.output[0])
+        self.assertEqual(stats["photos"], 7)
+        self.assertEqual(stats["photo_errors"], 1, "A bad photo is reported, not fatal")
+        self.assertEqual(stats["photo_workers"], 4)
+        for stage in ("prepare_s", "layout_s", "output_s"):
+            self.assertGreaterEqual(stats[stage], 0)
+
+    def test_duplicate_photos_embedded_once_and_cached(self):
+        from PIL import Image
+        
+        buffer = io.BytesIO()
+        Image.new("RGB", (1000, 750), (200, 10, 10)).save(buffer, format="JPEG")
+        encoded = base64.b64encode(buffer.getvalue()).decode("ascii")
+        # Same bytes, with and without a data URL header
+        photos = ["data:image/jpeg;base64," + encoded, encoded, "data:image/jpeg;base64," + encoded]
+        logs = [{"date": "2025-11-10", "segment_id": f"seg-{i}", "photo_base64": photo} for i, photo in enumerate(photos)]
+        PHOTO_CACHE.clear()
+        
+        first = {}
+        output_path = os.path.join(self.test_dir, 'dedupe.pdf')
+        create_provenance_pdf(logs, output_path, stats=first)
+        self.assertEqual(first["photos"], 3)
+        self.assertEqual(first["unique_photos"], 1)
+        self.assertEqual(first["photo_cache_hits"], 0)
+        with open(output_path, "rb") as f:
+            self.assertEqual(f.read().count(b"/Subtype /Image"), 1, "Identical photos should be embedded once")
+        
+        # A later report with the same photo reuses the prepared image
+        second = {}
+        create_provenance_pdf(logs[:1], os.path.join(self.test_dir, 'dedupe2.pdf'), stats=second)
+        self.assertEqual(second["photo_cache_hits"], 1)
+        
+        # Also once per streamed report, though every window is its own document
+        stream_path = os.path.join(self.test_dir, 'dedupe_stream.pdf')
+        save_provenance_pdf_stream(iter(logs * 3), stream_path, window=2)
+        with open(stream_path, "rb") as f:
+            self.assertEqual(f.read().count(b"/Subtype /Image"), 1, "A photo repeated across windows should be embedded once")
+
+    def test_photos_referenced_by_blob_hash(self):
+        from PIL import Image
+        from engine.blobs.blobs import BLOB_STORE
+        
+        buffer = io.BytesIO()
+        Image.new("RGB", (1000, 750), (10, 120, 10)).save(buffer, format="JPEG")
+        root = BLOB_STORE.root
+        BLOB_STORE.root = os.path.join(self.test_dir, 'blobs')
+        try:
+            digest, _ = BLOB_STORE.put(buffer.getvalue())
+            logs = [{"date": "2025-11-10", "segment_id": "blob-seg", "photo_sha256": digest},
+                    {"date": "2025-11-11", "segment_id": "blob-seg", "photo_sha256": "0" * 64}]
+            stats = {}
+            output_path = os.path.join(self.test_dir, 'blobs.pdf')
+            create_provenance_pdf(logs, output_path, stats=stats)
+        finally:
+            BLOB_STORE.root = root
+        self.assertEqual(stats["photos"], 2)
+        self.assertEqual(stats["photo_errors"], 1, "A hash that was never uploaded is reported, not fatal")
+        with open(output_path, "rb") as f:
+            self.assertEqual(f.read().count(b"/Subtype /Image"), 1)
+
+    def test_hash_computed_while_writing(self):
+        logs = [{"date": "2025-11-10", "segment_id": "test-seg", "shift_output_blocks": 3.0}]
+        output_path = os.path.join(self.test_dir, 'nested', 'single_pass.pdf')
+        
+        digest = save_provenance_pdf(logs, output_path)
+        self.assertEqual(digest, hash_file(output_path), "In-memory hash should match the file on disk")
+        self.assertEqual(os.listdir(os.path.dirname(output_path)), ['single_pass.pdf'], "No temp files should remain")
+
+    def test_batch_render_with_manifest_and_zip(self):
+        logs = [{"date": f"2025-11-{day:02d}", "segment_id": seg, "shift_output_blocks": 1.0}
+                for day in (10, 11) for seg in ("seg-a", "seg-b")]
+        reports = reports_from_logs(logs, ("date", "segment_id"))
+        reports.append({"output_name": "broken.pdf", "shift_logs": [{"date": "2025-11-12", "photo_base64": "data:image/png;base64,AAAA"}]})
+        self.assertEqual([r["output_name"] for r in reports][:2], ["provenance_2025-11-10_seg-a.pdf", "provenance_2025-11-10_seg-b.pdf"])
+        
+        progress = []
+        zip_path = os.path.join(self.test_dir, 'batch.zip')
+        manifest = render_batch(reports, self.test_dir, workers=2, zip_path=zip_path,
+                                progress=lambda done, total, entry: progress.append((done, total)))
+        
+        self.assertEqual(manifest["total"], 5)
+        self.assertEqual(manifest["failed"], 0, "A bad photo is reported inside the PDF, not as a failure")
+        self.assertEqual(progress[-1], (5, 5))
+        for entry, report in zip(manifest["reports"], reports):
+            self.assertEqual(entry["output_name"], report["output_name"], "Manifest keeps input order")
+            self.assertEqual(entry["sha256"], hash_file(os.path.join(self.test_dir, entry["output_name"])))
+        
+        with zipfile.ZipFile(zip_path) as archive:
+            self.assertEqual(len(archive.namelist()), 6)
+            self.assertEqual(json.loads(archive.read("manifest.json"))["total"], 5)
+        self.assertEqual(manifest["zip"]["sha256"], hash_file(zip_path))
+        
+        with self.assertRaises(ValueError):
+            render_batch([{"output_name": "../escape.pdf", "shift_logs": logs}], self.test_dir)
+
+    @unittest.skipUnless(resource, "needs the resource module (Unix)")
+    def test_ndjson_stream_has_bounded_peak_memory(self):
+        from PIL import Image
+        
+        def write_logs(count):
+            # Distinct photos, so deduplication cannot hide growth
+            path = os.path.join(self.test_dir, f'logs_{count}.ndjson')
+            with open(path, 'w') as f:
+                for i in range(count):
+                    buffer = io.BytesIO()
+                    Image.effect_noise((1000, 750), 64).convert("RGB").save(buffer, format="JPEG", quality=90)
+                    photo = "data:image/jpeg;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+                    f.write(json.dumps({"date": "2025-11-10", "segment_id": f"seg-{i}", "photo_base64": photo}) + "\n")
+            return path
+        
+        def peak_rss_for(path):
+            # Fresh process per run, so ru_maxrss is this render's peak. The
+            # photo cache has its own limit and is kept small here.
+            script = (
+                "import sys, resource\n"
+                "sys.path.insert(0, sys.argv[1])\n"
+                "from engine.provenance.provenance import save_provenance_pdf_stream, iter_ndjson_logs\n"
+                "save_provenance_pdf_stream(iter_ndjson_logs(sys.argv[2]), sys.argv[2] + '.pdf', workers=2, window=4)\n"
+                "print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)\n"
+            )
+            root = os.path.join(os.path.dirname(__file__), '..', '..', '..')
+            env = dict(os.environ, VERITAS_PHOTO_CACHE_ENTRIES="4")
+            output = subprocess.run([sys.executable, "-c", script, root, path], env=env, capture_output=True, text=True, check=True).stdout
+            return int(output.split()[-1]) * 1024  # kilobytes on Linux
+        
+        short_path, long_path = write_logs(16), write_logs(64)
+        short_peak, long_peak = peak_rss_for(short_path), peak_rss_for(long_path)
+        # Four times the logs (about 45 MB of input) add about 5 MB to the
+        # peak; keeping every embedded photo until the end adds about 20 MB
+        self.assertLess(long_peak - short_peak, 10 * 1024 * 1024)
+        
+        # Windows are merged into one consistent document with every photo
+        with open(long_path + '.pdf', 'rb') as f:
+            data = f.read()
+        self.assertEqual(data.count(b"/Subtype /Image"), 64)
+        xref = data[data.rindex(b"xref"):data.rindex(b"trailer")].split(b"\n")[3:-1]
+        for number, entry in enumerate(xref, 1):
+            self.assertTrue(data.startswith(b"%d 0 obj" % number, int(entry.split()[0])))
+        
+        # A report that fits in one window is the same document as the list-based renderer's
+        stats = {}
+        save_provenance_pdf_stream(iter_ndjson_logs(short_path), os.path.join(self.test_dir, 'stream_16.pdf'), window=16, stats=stats)
+        self.assertEqual(stats["photos"], 16)
+        save_provenance_pdf(list(iter_ndjson_logs(short_path)), os.path.join(self.test_dir, 'list_16.pdf'))
+        self.assertEqual(os.path.getsize(os.path.join(self.test_dir, 'list_16.pdf')), os.path.getsize(os.path.join(self.test_dir, 'stream_16.pdf')))
+
+    def test_cumulative_report_renders_only_new_days(self):
+        from PIL import Image
+        
+        buffer = io.BytesIO()
+        Image.new("RGB", (1000, 750), (90, 90, 30)).save(buffer, format="JPEG")
+        photo = "data:image/jpeg;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+        project = {"project_id": "PROJ-CUM", "project_title": "Cumulative"}
+        logs = [{"date": f"2025-11-{day:02d}", "segment_id": f"seg-{i}", "shift_output_blocks": 1.0, "photo_base64": photo}
+                for day in range(1, 4) for i in range(2)]
+        PAGE_CACHE.clear()
+        
+        first = {}
+        output_path = os.path.join(self.test_dir, 'cumulative.pdf')
+        save_cumulative_pdf(logs, output_path, project=project, stats=first)
+        self.assertEqual((first["days"], first["days_rendered"]), (3, 3))
+        
+        # Next evening: one new day is rendered, the rest come from the cache
+        logs.append({"date": "2025-11-04", "segment_id": "seg-0", "shift_output_blocks": 2.0})
+        second = {}
+        file_hash = save_cumulative_pdf(logs, output_path, project=project, stats=second)
+        self.assertEqual((second["days"], second["days_rendered"], second["page_cache_hits"]), (4, 1, 3))
+        self.assertEqual(file_hash, hash_file(output_path))
+        
+        # A corrected day is rendered again
+        logs[2] = dict(logs[2], shift_output_blocks=1.5)
+        third = {}
+        save_cumulative_pdf(logs, output_path, project=project, stats=third)
+        self.assertEqual(third["days_rendered"], 1)
+        
+        # Cover page plus each day's pages, with consistent cross-references
+        with open(output_path, "rb") as f:
+            data = f.read()
+        pages = data.count(b"/Type /Page\n")
+        self.assertGreaterEqual(pages, 5)
+        self.assertIn(b"/Count %d\n" % pages, data)
+        self.assertEqual(data.count(b"/Subtype /Image"), 1, "The photo shown on every day is embedded once")
+        xref = data[data.rindex(b"xref"):data.rindex(b"trailer")].split(b"\n")[3:-1]
+        for number, entry in enumerate(xref, 1):
+            self.assertTrue(data.startswith(b"%d 0 obj" % number, int(entry.split()[0])))
+        self.assertIn(b"/Count %d\n" % pages, merge_pdfs([data]))
+
+        # Reference-like text inside strings is copied, not renumbered
+        from fpdf import FPDF
+        pdf = FPDF()
+        pdf.add_page()
+        pdf.set_font("Helvetica", "", 12)
+        pdf.cell(0, 10, "Site photos", link="https://example.com/?q=7 0 R&r=(9 0 R)")
+        linked = bytes(pdf.output())
+        merged = merge_pdfs([data, linked])
+        self.assertIn(b"/URI (https://example.com/?q=7 0 R&r=\\(9 0 R\\))", merged)
+        # So is the stream keyword, e.g. in a link to an "upstream" host
+        pdf = FPDF()
+        pdf.add_page()
+        pdf.set_font("Helvetica", "", 12)
+        pdf.cell(0, 10, "Supplier", link="https://upstream.example/a")
+        merged = merge_pdfs([data, bytes(pdf.output())])
+        self.assertIn(b"/URI (https://upstream.example/a)", merged)
+        # A reference to an object the fragment lacks is rejected, not guessed
+        with self.assertRaisesRegex(ValueError, "missing object 9"):
+            merge_pdfs([linked.replace(b"/F1 5 0 R", b"/F1 9 0 R")])
+
 if __name__ == '__main__':
     unittest.main()
@@ -3331,6 +3331,49 @@ This will delete from:
     }
 }
 
+// Replaces each log's photo_base64 with photo_sha256, uploading to the
+// engine's blob store only the photos it does not have yet. Sends the logs
+// unchanged if the blob endpoints are unavailable.
+async function withPhotoBlobs(logs) {
+    const photoLogs = logs.filter(log => log.photo_base64);
+    if (!photoLogs.length) return logs;
+
+    try {
+        const hashes = new Map(); // photo_base64 -> sha256
+        const blobs = new Map();  // sha256 -> photo bytes
+        for (const log of photoLogs) {
+            if (hashes.has(log.photo_base64)) continue;
+            const bytes = await (await fetch(log.photo_base64)).arrayBuffer();
+            const hashBuffer = await crypto.subtle.digest('SHA-256', bytes);
+            const hashHex = Array.from(new Uint8Array(hashBuffer)).map(b => b.toString(16).padStart(2, '0')).join('');
+            hashes.set(log.photo_base64, hashHex);
+            blobs.set(hashHex, bytes);
+        }
+
+        const { missing } = await makeAPICall('/blobs/missing', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ sha256: [...blobs.keys()] })
+        });
+        for (const hash of missing) {
+            await makeAPICall(`/blobs/${hash}`, {
+                method: 'PUT',
+                headers: { 'Content-Type': 'application/octet-stream' },
+                body: blobs.get(hash)
+            });
+        }
+
+        return logs.map(log => {
+            if (!log.photo_base64) return log;
+            const { photo_base64, ...rest } = log;
+            return { ...rest, photo_sha256: hashes.get(photo_base64) };
+        });
+    } catch (err) {
+        console.warn('Photo blob upload failed; sending photos inline', err);
+        return logs;
+    }
+}
+
 document.getElementById('fieldProvenanceBtn').addEventListener('click', async () => {
     if (!fieldLogs.length) return;
     if (!activeProject) {
@@ -3339,7 +3382,7 @@ document.getElementById('fieldProvenanceBtn').addEventListener('click', async ()
     }
 
     const payload = {
-        shift_logs: fieldLogs,
+        shift_logs: await withPhotoBlobs(fieldLogs),
         project: activeProject,
         output_name: `provenance_field_${activeProject.project_id}_${Date.now()}.pdf`
     };
@@ -3482,7 +3525,7 @@ document.getElementById('provenanceBtn').addEventListener('click', async () => {
     }
 
     const payload = {
-        shift_logs: currentLogs,
+        shift_logs: await withPhotoBlobs(currentLogs),
         project: activeProject,
         output_name: `provenance_${activeProject.project_id}_${Date.now()}.pdf`
     };
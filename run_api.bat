@@ -1,4 +1,4 @@
 @echo off
 echo Starting Veritas Engine API...
-"C:\Users\Al\AppData\Local\Programs\Python\Python311\python.exe" engine/api/app.py
+"C:\Users\Al\AppData\Local\Programs\Python\Python311\python.exe" engine/api/serve.py
 pause
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Synthetic field-log corpus generator for load and scale benchmarks
+
+Builds realistic export files of any size from the engine's simulator. The
+JSON output matches export_manifest.schema.json, and each field log matches
+shift_log.schema.json. Logs are written to disk as they are simulated, so
+the corpus is never held in memory and millions of logs are fine.
+
+Usage:
+    python tools/generate_field_log_corpus.py --segments 2000 --days 365 --output corpus.json
+    python tools/generate_field_log_corpus.py --segments 50 --days 60 --photo-every 1 \\
+        --photo-size 1600x1200 --photo-format jpeg --format ndjson --output logs.ndjson
+
+Options of note:
+- --format json writes one export manifest; --format ndjson writes one field
+  log per line (the input format for streamed provenance reports)
+- --photo-every N attaches a synthetic photo_base64 to every Nth log
+  (0 = no photos). JPEG requires Pillow; PNG falls back to a pure-Python encoder
+- --photo-variants K cycles through K distinct images, so repeated photos
+  can be exercised as well as unique ones
+"""
+
+import argparse
+import base64
+import datetime
+import io
+import json
+import os
+import random
+import struct
+import sys
+import uuid
+import zlib
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from engine.generator.generator import Simulation, ENGINES
+
+WORK_TYPES = [
+    ("PCCP", "311"),
+    ("Base Course", "208"),
+    ("Subbase Course", "200"),
+    ("Excavation", "102"),
+    ("Embankment", "104"),
+]
+
+NOTES = [
+    "Work proceeded as planned",
+    "Compacted properly, moisture content optimal",
+    "Delayed start due to late delivery of materials",
+    "Curing compound applied",
+    "Inspection by project engineer",
+]
+
+# Days simulated per step; keeps numpy-engine memory bounded as well
+CHUNK_DAYS = 30
+
+def png_bytes(width, height, seed):
+    """
+    Encodes a noisy gradient as an RGB PNG using only the standard library.
+    """
+    rng = random.Random(seed)
+    raw = bytearray()
+    for y in range(height):
+        raw.append(0)  # filter type: none
+        noise = rng.randbytes(width)
+        shade = (y * 255) // max(height - 1, 1)
+        for x in range(width):
+            n = noise[x]
+            raw += bytes((((x * 255) // max(width - 1, 1) + n // 4) & 0xFF, (shade + n // 4) & 0xFF, n))
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(bytes(raw), 6))
+            + chunk(b"IEND", b""))
+
+def photo_data_url(width, height, image_format, seed):
+    """
+    Returns a synthetic photo as a data URL, as the PWA would send it.
+    """
+    try:
+        from PIL import Image
+        noise = Image.effect_noise((width, height), 64).convert("L")
+        gradient = Image.linear_gradient("L").resize((width, height))
+        img = Image.merge("RGB", (noise, gradient, Image.eval(noise, lambda v: (v + seed * 37) % 256)))
+        buffer = io.BytesIO()
+        if image_format == "jpeg":
+            img.save(buffer, format="JPEG", quality=85)
+        else:
+            img.save(buffer, format="PNG")
+        data = buffer.getvalue()
+    except ImportError:
+        if image_format == "jpeg":
+            raise SystemExit("JPEG photos require Pillow (pip install pillow); use --photo-format png")
+        data = png_bytes(width, height, seed)
+
+    return f"data:image/{image_format};base64," + base64.b64encode(data).decode("ascii")
+
+def build_projects(count):
+    return [{
+        "project_id": f"PROJ-{i + 1:03d}",
+        "contract_id": f"CTR-2025-{i + 1:04d}",
+        "project_title": f"Synthetic Road Improvement {i + 1}",
+        "contractor_name": "Veritas Construction Inc.",
+        "owner": "DPWH Region IV-A",
+        "project_type": "PCCP Road",
+        "location": "San Juan, Batangas",
+        "start_date": datetime.date.today().isoformat()
+    } for i in range(count)]
+
+def build_segments(count, projects, rng):
+    return [{
+        "segment_id": f"SEG-{i + 1:06d}",
+        "project_id": projects[i % len(projects)]["project_id"],
+        "length_m": float(rng.randrange(40, 1000, 5)),
+        "width_m": rng.choice([5.0, 6.1, 6.7, 7.0])
+    } for i in range(count)]
+
+def iter_field_logs(segments, days, seed, block_length_m, crew_size, engine, photos, photo_every):
+    """
+    Yields enriched field logs, simulating CHUNK_DAYS days at a time.
+    """
+    rng = random.Random(seed)
+    by_id = {seg["segment_id"]: (i, seg) for i, seg in enumerate(segments)}
+    sim = Simulation(segments, seed=seed, block_length_m=block_length_m, crew_size=crew_size, engine=engine)
+    count = 0
+
+    for start in range(0, days, CHUNK_DAYS):
+        for log in sim.advance(min(CHUNK_DAYS, days - start)):
+            index, seg = by_id[log["segment_id"]]
+            work_type, item_code = WORK_TYPES[index % len(WORK_TYPES)]
+            # Walk the crew along the segment from a per-segment origin
+            progress_m = log["cumulative_blocks"] * block_length_m
+
+            log["entry_id"] = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+            log["project_id"] = seg["project_id"]
+            log["work_type"] = work_type
+            log["item_code"] = item_code
+            log["quantity_today"] = f"{log['shift_output_blocks']:.2f} blocks"
+            log["remaining_meters"] = round(log["remaining_blocks"] * block_length_m, 2)
+            log["notes"] = NOTES[rng.randrange(len(NOTES))]
+            log["latitude"] = f"{13.7 + index * 0.001:.6f}"
+            log["longitude"] = f"{121.0 + progress_m * 0.00001:.6f}"
+            if photos and photo_every and count % photo_every == 0:
+                log["photo_base64"] = photos[count // photo_every % len(photos)]
+
+            count += 1
+            yield log
+
+def write_corpus(output_path, output_format, projects, segments, logs):
+    """
+    Streams logs to disk and returns the number written.
+    """
+    count = 0
+    with open(output_path, "w", encoding="utf-8") as f:
+        if output_format == "ndjson":
+            for log in logs:
+                f.write(json.dumps(log) + "\n")
+                count += 1
+            return count
+
+        # Manifest header first, then field_logs one element at a time
+        f.write("{\n")
+        f.write(f'"exported_at": {json.dumps(datetime.datetime.now(datetime.timezone.utc).isoformat())},\n')
+        f.write('"version": "v2",\n')
+        f.write(f'"projects": {json.dumps(projects)},\n')
+        f.write(f'"segments": {json.dumps(segments)},\n')
+        f.write('"field_logs": [\n')
+        for log in logs:
+            if count:
+                f.write(",\n")
+            f.write(json.dumps(log))
+            count += 1
+        f.write("\n]\n}\n")
+    return count
+
+def parse_size(value):
+    try:
+        width, height = (int(part) for part in value.lower().split("x"))
+        return width, height
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected WIDTHxHEIGHT, e.g. 1600x1200")
+
+def main():
+    """Main corpus generation function."""
+    parser = argparse.ArgumentParser(description="Generate a synthetic Veritas field-log corpus.")
+    parser.add_argument("--output", required=True, help="Output file path")
+    parser.add_argument("--format", choices=["json", "ndjson"], default="json", help="Export manifest or one log per line")
+    parser.add_argument("--projects", type=int, default=1)
+    parser.add_argument("--segments", type=int, default=100)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--engine", choices=ENGINES, default="python")
+    parser.add_argument("--block-length-m", type=float, default=4.5)
+    parser.add_argument("--crew-size", type=int, default=8)
+    parser.add_argument("--photo-every", type=int, default=0, help="Attach a photo to every Nth log (0 = none)")
+    parser.add_argument("--photo-size", type=parse_size, default=(1280, 960), help="WIDTHxHEIGHT")
+    parser.add_argument("--photo-format", choices=["jpeg", "png"], default="jpeg")
+    parser.add_argument("--photo-variants", type=int, default=8, help="Number of distinct photos to cycle through")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    projects = build_projects(args.projects)
+    segments = build_segments(args.segments, projects, rng)
+
+    photos = []
+    if args.photo_every:
+        width, height = args.photo_size
+        print(f"Rendering {args.photo_variants} synthetic {args.photo_format.upper()} photos at {width}x{height}...")
+        photos = [photo_data_url(width, height, args.photo_format, variant) for variant in range(args.photo_variants)]
+
+    print(f"Simulating {len(segments)} segments over {args.days} days -> {args.output}")
+    logs = iter_field_logs(segments, args.days, args.seed, args.block_length_m, args.crew_size,
+                           args.engine, photos, args.photo_every)
+    count = write_corpus(args.output, args.format, projects, segments, logs)
+
+    size_mb = os.path.getsize(args.output) / (1024 * 1024)
+    print(f"Wrote {count} field logs ({size_mb:.1f} MB)")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Batch provenance renderer for month-end reporting
+
+Renders many "Statement of Work Accomplished" PDFs across a process pool and
+writes a manifest of file names and SHA-256 hashes, optionally bundled with
+the PDFs into a single zip.
+
+Input can be:
+- an export manifest (JSON with field_logs, and optionally projects), split
+  into one report per --group-by group
+- an NDJSON file with one field log per line, split the same way
+- a JSON file with {"reports": [{"output_name", "shift_logs", "project"}, ...]}
+
+Usage:
+    python tools/render_provenance_batch.py --input export.json --group-by date,segment_id \\
+        --output-dir out/month_end --zip out/month_end.zip
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from engine.provenance.batch import render_batch, reports_from_logs
+
+def load_reports(input_path, group_by):
+    """
+    Returns report specs from an export manifest, NDJSON logs or explicit
+    report list.
+    """
+    if input_path.endswith(".ndjson"):
+        with open(input_path, encoding="utf-8") as f:
+            logs = [json.loads(line) for line in f if line.strip()]
+        return reports_from_logs(logs, group_by)
+
+    with open(input_path, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict) and "reports" in data:
+        return data["reports"]
+    if isinstance(data, dict) and "field_logs" in data:
+        return reports_from_logs(data["field_logs"], group_by, projects=data.get("projects"))
+    if isinstance(data, list):
+        return reports_from_logs(data, group_by)
+    raise SystemExit(f"{input_path}: expected an export manifest, a list of logs or {{\"reports\": [...]}}")
+
+def main():
+    """Main batch rendering function."""
+    parser = argparse.ArgumentParser(description="Render many provenance PDFs on a process pool.")
+    parser.add_argument("--input", required=True, help="Export manifest, NDJSON logs or report list")
+    parser.add_argument("--output-dir", required=True, help="Directory for the PDFs")
+    parser.add_argument("--group-by", default="date", help="Comma-separated log fields, one report per group (default: date)")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: all cores)")
+    parser.add_argument("--zip", help="Also bundle the PDFs and manifest into this zip file")
+    parser.add_argument("--manifest", help="Manifest path (default: <output-dir>/manifest.json)")
+    args = parser.parse_args()
+
+    reports = load_reports(args.input, [field.strip() for field in args.group_by.split(",") if field.strip()])
+    print(f"Rendering {len(reports)} reports into {args.output_dir}")
+
+    started = time.perf_counter()
+    def progress(done, total, entry):
+        status = entry.get("sha256", "")[:12] or f"ERROR: {entry['error']}"
+        print(f"[{done}/{total}] {entry['output_name']}  {status}", flush=True)
+
+    manifest = render_batch(reports, args.output_dir, workers=args.workers, zip_path=args.zip, progress=progress)
+
+    manifest_path = args.manifest or os.path.join(args.output_dir, "manifest.json")
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    elapsed = time.perf_counter() - started
+    print(f"Rendered {manifest['total'] - manifest['failed']}/{manifest['total']} reports in {elapsed:.1f}s")
+    print(f"Manifest: {manifest_path}")
+    if args.zip:
+        print(f"Zip: {args.zip} (sha256 {manifest['zip']['sha256']})")
+    return 1 if manifest["failed"] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())